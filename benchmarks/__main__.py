@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+
+from . import bench_client, bench_events, bench_metrics, bench_server  # noqa: F401 (registers)
+from .harness import (DEFAULT_THRESHOLD, Result, compare, environment, format_rows,
+                      format_time, load_baseline, run, save_baseline, warn)
+
+"""
+python -m benchmarks             time everything, compare with baseline.json
+python -m benchmarks --save      time everything and store it as the baseline
+python -m benchmarks -k client.  only benchmarks whose name contains "client."
+"""
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Micro-benchmarks of the SDK and server hot paths")
+    parser.add_argument("-k", dest="pattern", help="only benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline file to compare with")
+    parser.add_argument("--save", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown that counts as a regression, as a fraction")
+    parser.add_argument("--strict", action="store_true",
+                        help="fail on regressions against a baseline from another machine")
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds per timing round")
+    parser.add_argument("--repeat", type=int, default=5, help="timing rounds per benchmark")
+    args = parser.parse_args(argv)
+
+    results = run(args.pattern, args.min_time, args.repeat,
+                  report=lambda r: warn(f"{r.name}: {format_time(r.best)}"))
+    if args.save:
+        if args.pattern and os.path.exists(args.baseline):
+            # keep the baselines of the benchmarks that did not run
+            stored = load_baseline(args.baseline)["results"]
+            kept = [Result(name, best, best, 0) for name, best in stored.items()
+                    if name not in {r.name for r in results}]
+            results = kept + results
+        save_baseline(args.baseline, results)
+        print(f"Saved {len(results)} baselines to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(format_rows(compare(results, {})))
+        warn(f"No baseline at {args.baseline}, run with --save to create one")
+        return 0
+    baseline = load_baseline(args.baseline)
+    rows = compare(results, baseline["results"], args.threshold)
+    print(format_rows(rows))
+    regressions = [name for name, _, _, regressed in rows if regressed]
+    if not regressions:
+        return 0
+    print(f"\n{len(regressions)} regressions beyond {args.threshold:.0%}")
+    if baseline.get("environment") != environment() and not args.strict:
+        # another machine's timings are shown for orientation only
+        warn(f"Baseline was taken on {baseline.get('environment')}; save one on this "
+             f"machine, or pass --strict to fail anyway")
+        return 0
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+from sdk.client import HiClient
+from sdk.store import ConversationStore
+
+from .harness import benchmark
+from .workloads import CONVERSATION_LENGTHS, RESPONSE_TOKENS, canned_client, history, reply_body
+
+"""
+HiClient's share of a chat turn, over a transport that answers instantly
+"""
+
+
+@contextmanager
+def tracked_client(messages: int, body: bytes) -> Iterator[HiClient]:
+    """A client whose conversation stays messages long however many turns run"""
+    store = ConversationStore()
+    store.window = messages
+    with canned_client(body, track_conversation=True, conversation_store=store) as client:
+        for message in history(messages):
+            client.conversation.add_message(message["role"], message["content"])
+        yield client
+
+
+@benchmark("client.build_payload", history=CONVERSATION_LENGTHS)
+def build_payload(history: int):
+    with tracked_client(history, reply_body(1)) as client:
+        yield lambda: client._build_payload("What should I wear today?")
+
+
+@benchmark("client.chat", tokens=RESPONSE_TOKENS)
+def chat(tokens: int):
+    """Payload, request, the chunk loop, usage and metrics for one reply"""
+    with canned_client(reply_body(tokens)) as client:
+        yield lambda: client.chat("Tell me a story")
+
+
+@benchmark("client.chat_history", history=CONVERSATION_LENGTHS)
+def chat_history(history: int):
+    """A short reply with the history sent along and the turn added to it"""
+    with tracked_client(history, reply_body(16)) as client:
+        yield lambda: client.chat("What should I wear today?")
+
+
+@benchmark("client.chat_on_token", tokens=RESPONSE_TOKENS)
+def chat_on_token(tokens: int):
+    """The chunk loop with an on_token callback registered"""
+    received = []
+
+    def run():
+        received.clear()
+        client.chat("Tell me a story")
+
+    with canned_client(reply_body(tokens)) as client:
+        client.register_callback("on_token", received.append)
+        yield run
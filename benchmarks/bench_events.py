@@ -0,0 +1,38 @@
+from sdk.events import EventBus
+
+from .harness import benchmark
+
+"""
+handing one token to the on_token subscribers, as the chunk loop does
+"""
+
+
+def noop(token: str):
+    pass
+
+
+@benchmark("events.emit", subscribers=(0, 1, 4))
+def emit(subscribers: int):
+    bus = EventBus()
+    for _ in range(subscribers):
+        bus.subscribe("on_token", noop)
+    return lambda: bus.emit("on_token", "word ")
+
+
+@benchmark("events.emit_batched", batch_size=(1, 16))
+def emit_batched(batch_size: int):
+    bus = EventBus()
+    bus.subscribe("on_token", noop, batch_size=batch_size)
+    return lambda: bus.emit("on_token", "word ")
+
+
+@benchmark("events.emit_threaded")
+def emit_threaded():
+    """Queueing for a subscriber on its own thread, dropping when it falls behind"""
+    bus = EventBus()
+    bus.subscribe("on_token", noop, threaded=True, overflow="drop_oldest")
+    try:
+        yield lambda: bus.emit("on_token", "word ")
+    finally:
+        # stops the delivery thread
+        bus.close()
@@ -0,0 +1,45 @@
+from sdk.metrics import Histogram, Metrics
+
+from .harness import benchmark
+from .workloads import RESPONSE_TOKENS
+
+"""
+metrics recorded on every chunk and request, and the summary built from them
+"""
+
+
+@benchmark("metrics.request", tokens=RESPONSE_TOKENS)
+def request(tokens: int):
+    """A request timer fed one token per chunk, then finished"""
+    metrics = Metrics()
+
+    def run():
+        timer = metrics.start_request("qwen:0.5b")
+        for _ in range(tokens):
+            timer.token()
+        metrics.end_request(timer, tokens, tokens * 0.05)
+    return run
+
+
+@benchmark("metrics.histogram_record")
+def histogram_record():
+    histogram = Histogram()
+    values = [0.001 * (i % 997 + 1) for i in range(1000)]
+
+    def run():
+        for value in values:
+            histogram.record(value)
+    return run
+
+
+@benchmark("metrics.get_metrics", models=(1, 3))
+def get_metrics(models: int):
+    """Percentiles over a busy history, overall and per model"""
+    metrics = Metrics()
+    names = ["qwen:0.5b", "qwen:1.8b", "gemma2:2b"][:models]
+    for i in range(10000):
+        timer = metrics.start_request(names[i % models])
+        for _ in range(i % 50 + 1):
+            timer.token()
+        metrics.end_request(timer, i % 50 + 1, 0.05 * (i % 50 + 1))
+    return metrics.get_metrics
@@ -0,0 +1,49 @@
+import main
+from sdk.cache import cache_key
+from sdk.protocol import token_frame
+from sdk.singleflight import flight_key
+
+from .harness import benchmark
+from .workloads import CONVERSATION_LENGTHS, RESPONSE_TOKENS, history, ollama_lines
+
+"""
+what the server does per /chat request before and while it relays a reply
+"""
+
+
+def chat_request(messages: int) -> main.ChatRequest:
+    return main.ChatRequest(message="What should I wear today?", system_prompt="Be brief",
+                            conversation_history=history(messages), model="qwen:0.5b",
+                            model_parameters={"temperature": 0.7})
+
+
+@benchmark("server.build_prompt", history=CONVERSATION_LENGTHS)
+def build_prompt(history: int):
+    request = chat_request(history)
+    return lambda: main.build_prompt(request, request.conversation_history)
+
+
+@benchmark("server.prepare_request", history=CONVERSATION_LENGTHS)
+def prepare_request(history: int):
+    """Prompt, Ollama payload, cache key and single-flight key, as stream_chat computes them"""
+    request = chat_request(history)
+
+    def prepare():
+        payload = main.build_payload(request)
+        cache_key(request.model, request.model_parameters, request.system_prompt, request.role,
+                  request.conversation_history, request.message)
+        flight_key(payload)
+    return prepare
+
+
+@benchmark("server.relay", tokens=RESPONSE_TOKENS)
+def relay(tokens: int):
+    """Decoding Ollama's lines and framing them for the client, one line per batch"""
+    lines = ollama_lines(tokens)
+
+    def run():
+        for line in lines:
+            text, _, _ = main.relay_batch([main.read_line(line)])
+            if text:
+                token_frame(text)
+    return run
@@ -0,0 +1,171 @@
+import gc
+import inspect
+import json
+import platform
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+"""
+a small timing harness for the per-request hot paths: benchmarks register
+themselves with @benchmark, are timed best-of-repeats with the loop count
+calibrated per case, and are compared against a stored baseline
+"""
+
+# a case is timed only after its setup, which returns the callable to time;
+# a setup that holds resources yields it instead and cleans up after the yield
+Setup = Callable[..., Any]
+
+BENCHMARKS: List["Case"] = []
+
+# slower than the baseline by more than this fraction counts as a regression
+DEFAULT_THRESHOLD = 0.25
+
+
+class Case:
+    __slots__ = ("name", "setup", "params")
+
+    def __init__(self, name: str, setup: Setup, params: Dict[str, Any]):
+        self.name = name
+        self.setup = setup
+        self.params = params
+
+
+def benchmark(name: str, **sweep: Iterable[Any]):
+    """Register setup as a benchmark, once per value of the (single) swept parameter
+
+    @benchmark("metrics.record", tokens=[16, 256]) registers
+    metrics.record[tokens=16] and metrics.record[tokens=256].
+    """
+    if len(sweep) > 1:
+        raise ValueError("sweep one parameter per benchmark")
+
+    def register(setup: Setup) -> Setup:
+        if not sweep:
+            BENCHMARKS.append(Case(name, setup, {}))
+        for key, values in sweep.items():
+            for value in values:
+                BENCHMARKS.append(Case(f"{name}[{key}={value}]", setup, {key: value}))
+        return setup
+    return register
+
+
+class Result:
+    __slots__ = ("name", "best", "median", "loops")
+
+    def __init__(self, name: str, best: float, median: float, loops: int):
+        self.name = name
+        # seconds per call
+        self.best = best
+        self.median = median
+        self.loops = loops
+
+
+def measure(fn: Callable[[], Any], min_time: float = 0.1, repeat: int = 5) -> Tuple[float, float, int]:
+    """(best, median) seconds per call over repeat rounds of at least min_time each"""
+    loops = 1
+    while True:
+        elapsed = _time(fn, loops)
+        if elapsed >= min_time / 10 or loops >= 1 << 24:
+            break
+        loops *= 10
+    loops = max(1, int(loops * min_time / max(elapsed, 1e-9)))
+    rounds = [_time(fn, loops) / loops for _ in range(repeat)]
+    return min(rounds), statistics.median(rounds), loops
+
+
+def _time(fn: Callable[[], Any], loops: int) -> float:
+    # a collection in the middle of a round would be charged to whatever ran then
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        return time.perf_counter() - started
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def run(pattern: Optional[str] = None, min_time: float = 0.1, repeat: int = 5,
+        report: Optional[Callable[[Result], None]] = None) -> List[Result]:
+    """Time every registered benchmark whose name contains pattern"""
+    results = []
+    for case in BENCHMARKS:
+        if pattern and pattern not in case.name:
+            continue
+        with _prepared(case) as fn:
+            best, median, loops = measure(fn, min_time, repeat)
+        result = Result(case.name, best, median, loops)
+        results.append(result)
+        if report is not None:
+            report(result)
+    return results
+
+
+@contextmanager
+def _prepared(case: Case) -> Iterator[Callable[[], Any]]:
+    made = case.setup(**case.params)
+    if not inspect.isgenerator(made):
+        yield made
+        return
+    try:
+        yield next(made)
+    finally:
+        made.close()
+
+
+def environment() -> Dict[str, str]:
+    return {"python": platform.python_version(), "implementation": platform.python_implementation(),
+            "machine": platform.machine(), "processor": platform.processor() or platform.machine()}
+
+
+def save_baseline(path: str, results: List[Result]):
+    with open(path, "w") as f:
+        json.dump({"environment": environment(),
+                   "results": {r.name: r.best for r in results}}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results: List[Result], baseline: Dict[str, float],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[str, Optional[float], float, bool]]:
+    """(name, baseline, current, regressed) per result; new benchmarks have no baseline"""
+    rows = []
+    for result in results:
+        previous = baseline.get(result.name)
+        regressed = previous is not None and result.best > previous * (1 + threshold)
+        rows.append((result.name, previous, result.best, regressed))
+    return rows
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def format_rows(rows: List[Tuple[str, Optional[float], float, bool]]) -> str:
+    width = max([len(name) for name, *_ in rows] + [9])
+    lines = [f"{'benchmark':<{width}}  {'baseline':>10}  {'current':>10}  {'change':>8}"]
+    for name, previous, current, regressed in rows:
+        if previous is None:
+            lines.append(f"{name:<{width}}  {'-':>10}  {format_time(current):>10}  {'new':>8}")
+            continue
+        change = f"{(current / previous - 1) * 100:+.1f}%"
+        flag = "  REGRESSION" if regressed else ""
+        lines.append(f"{name:<{width}}  {format_time(previous):>10}  {format_time(current):>10}"
+                     f"  {change:>8}{flag}")
+    return "\n".join(lines)
+
+
+def warn(message: str):
+    print(message, file=sys.stderr)
@@ -0,0 +1,77 @@
+import io
+import json
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+import requests
+
+from sdk.protocol import MEDIA_TYPE, token_frame, done_frame
+from sdk.utils import SDKLogger
+
+"""
+inputs shared by the benchmarks: conversations of a given length and a
+transport that answers every chat with a canned stream, so the client's
+own work is timed without a server or a network
+"""
+
+CONVERSATION_LENGTHS = (0, 16, 128, 512)
+RESPONSE_TOKENS = (16, 256, 2048)
+
+# the client logs every completed request at info level, this one only warnings
+_quiet = SDKLogger("hi_bench")
+_quiet.logger.setLevel(logging.WARNING)
+
+
+def history(messages: int) -> List[Dict[str, str]]:
+    """Alternating turns of typical chat length"""
+    return [{"role": "user" if i % 2 == 0 else "assistant",
+             "content": f"Message {i}: tell me a little more about the weather in Berlin today"}
+            for i in range(messages)]
+
+
+def reply_body(tokens: int) -> bytes:
+    """The NDJSON a hi server sends for a reply of tokens tokens"""
+    frames = [token_frame(f"word{i} ") for i in range(tokens)]
+    frames.append(done_frame({"eval_count": tokens, "eval_duration": tokens * 50_000_000}))
+    return "".join(frames).encode()
+
+
+def ollama_lines(tokens: int) -> List[str]:
+    """The lines Ollama streams to the server for a reply of tokens tokens"""
+    lines = [json.dumps({"model": "qwen:0.5b", "response": f"word{i} ", "done": False})
+             for i in range(tokens)]
+    lines.append(json.dumps({"model": "qwen:0.5b", "response": "", "done": True,
+                             "eval_count": tokens, "eval_duration": tokens * 50_000_000}))
+    return lines
+
+
+class CannedAdapter(requests.adapters.BaseAdapter):
+    """Answers every request with the same body"""
+
+    def __init__(self, body: bytes):
+        super().__init__()
+        self.body = body
+
+    def send(self, request, **kwargs) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = MEDIA_TYPE
+        response.raw = io.BytesIO(self.body)
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def canned_client(body: bytes, **kwargs: Any) -> Iterator[Any]:
+    from sdk.client import HiClient
+
+    with HiClient("http://bench", **kwargs) as client:
+        client.session.mount("http://", CannedAdapter(body))
+        client.load_model("qwen:0.5b")
+        client.logger = _quiet
+        yield client
@@ -23,20 +23,13 @@ logger.info(f"Model loaded in {load_time:.2f}s")
 client.set_system_prompt(
     "create a python program for linear regression in a machine learning context")
 
-
-def on_token(token):
-    print(token, end="", flush=True)
-    metrics.record_tokens(1)  # Count each token
-
-
-client.register_callback("on_token", on_token)
-
 # Start timing the chat request
 metrics.start_request()
 
-# Chat and stream response
-for token in client.chat("Tell me a short joke"):
-    pass  # The callback handles printing and token counting
+# Stream the response, tokens arrive as they are generated
+for token in client.stream("Tell me a short joke"):
+    print(token, end="", flush=True)
+    metrics.record_tokens(1)  # Count each token
 
 # Get final metrics
 chat_time = metrics.end_request()
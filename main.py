@@ -1,11 +1,183 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+import asyncio
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel, validator
-from typing import List, Optional, Dict, Any
-import requests
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
+import httpx
 import json
-from fastapi.responses import StreamingResponse
+import os
+import time
+from fastapi.responses import Response, StreamingResponse
+from sdk.transport import PoolConfig, build_async_client, async_client_pool_stats
+from sdk.sessions import ChatSession, SessionStore
+from sdk.history import ContextBudget, estimate_tokens, trim_history
+from sdk.cache import ResponseCache, cache_key
+from sdk.singleflight import Abort, SingleFlight, flight_key
+from sdk.jobs import JobQueue, JobStore, STATES as JOB_STATES
+from sdk.scheduler import ModelScheduler
+from sdk.exceptions import QueueFullError, DeadlineExceededError, JobRestartedError
+from sdk.residency import ModelResidency, KeepAlive, parse_keep_alive
+from sdk.utils import SDKLogger
+from sdk.prometheus import Registry, CONTENT_TYPE, THROUGHPUT_BUCKETS
+from sdk.tracing import RecordingTracer, Span, TRACE_HEADER, PARENT_SPAN_HEADER
+from sdk.protocol import (MEDIA_TYPE, DEADLINE_HEADER, DEADLINE_EXCEEDED, JOB_RESTARTED, token_frame,
+                          job_frame, done_frame, error_frame, usage_from)
 
-app = FastAPI()
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+
+logger = SDKLogger("hi_server")
+
+# a Pi only has room for a couple of generations at once
+MAX_BATCH_CONCURRENCY = 4
+
+sessions = SessionStore(max_sessions=1000, ttl=3600.0)
+
+# repeated questions are answered from here; HI_CACHE_PATH adds a SQLite tier
+response_cache = ResponseCache(max_entries=512, max_bytes=8 * 1024 * 1024, ttl=24 * 3600.0,
+                               path=os.environ.get("HI_CACHE_PATH"))
+
+single_flight = SingleFlight()
+
+# a Pi runs one generation at a time; more only queue up inside Ollama
+scheduler = ModelScheduler(
+    max_concurrency=int(os.environ.get("HI_MAX_GENERATIONS", "1")),
+    max_queue_depth=int(os.environ.get("HI_MAX_QUEUE_DEPTH", "32")))
+
+# tokens that are already waiting always go out in one frame; a window adds
+# a pause between frames so slow clients get fewer, larger frames
+DEFAULT_COALESCE_MS = int(os.environ.get("HI_COALESCE_MS", "0"))
+
+# upper bound on one /chat generation in seconds, clients can only ask for less
+MAX_GENERATION_SECONDS = float(os.environ.get("HI_MAX_GENERATION_SECONDS", "0")) or None
+
+# background jobs survive restarts in this SQLite file; a Pi keeps up with
+# one job at a time, HI_JOB_PAUSE_SECONDS lets it cool down between jobs
+JOBS_PATH = os.environ.get("HI_JOBS_PATH", "hi_jobs.db")
+JOB_WORKERS = int(os.environ.get("HI_JOB_WORKERS", "1"))
+JOB_PAUSE_SECONDS = float(os.environ.get("HI_JOB_PAUSE_SECONDS", "0"))
+
+# history beyond the model's window is dropped oldest-first before prompting
+context_budget = ContextBudget(reserve_tokens=512)
+
+# one keep-alive pool for every upstream call instead of a connection per request
+upstream_pool_config = PoolConfig(max_connections=16, max_connections_per_host=16,
+                                  connect_timeout=5.0)
+
+# scraped from /metrics; label values are reused so recording never allocates per token
+registry = Registry()
+REQUESTS = registry.counter("hi_requests_total", "Requests answered, by endpoint, model and status",
+                            ("endpoint", "model", "status"))
+IN_FLIGHT = registry.gauge("hi_requests_in_flight", "Requests currently being answered", ("endpoint",))
+REQUEST_DURATION = registry.histogram("hi_request_duration_seconds",
+                                      "Time until the last byte of the answer was sent",
+                                      ("endpoint", "model"))
+ERRORS = registry.counter("hi_errors_total", "Failed requests by error type", ("endpoint", "type"))
+UPSTREAM_CONNECT = registry.histogram("hi_upstream_connect_seconds", "TCP connect time to Ollama")
+TIME_TO_FIRST_TOKEN = registry.histogram("hi_time_to_first_token_seconds",
+                                         "Time from request to the first streamed token", ("model",))
+GENERATION_THROUGHPUT = registry.histogram("hi_generation_tokens_per_second",
+                                           "Ollama eval tokens per second of each generation",
+                                           ("model",), THROUGHPUT_BUCKETS)
+GENERATED_TOKENS = registry.counter("hi_generated_tokens_total", "Tokens generated by Ollama", ("model",))
+GENERATIONS_SAVED = registry.counter("hi_generations_saved_total",
+                                     "Requests that joined an identical running generation")
+CACHE_HITS = registry.counter("hi_cache_hits_total", "Response cache hits")
+CACHE_MISSES = registry.counter("hi_cache_misses_total", "Response cache misses")
+# filled from the component stats when scraped
+QUEUE_WAITING = registry.gauge("hi_queue_waiting", "Requests waiting for a generation slot")
+GENERATIONS_RUNNING = registry.gauge("hi_generations_running", "Generations running in Ollama")
+CANCELLATIONS = registry.counter("hi_cancellations_total",
+                                 "Requests given up before the answer was complete, by reason",
+                                 ("reason",))
+UPSTREAM_ABORTS = registry.counter("hi_upstream_aborts_total",
+                                   "Ollama generations stopped because nobody was waiting for them")
+JOBS = registry.gauge("hi_jobs", "Background jobs by status", ("status",))
+
+# spans of recent requests, looked up by the trace id the client sent
+tracer = RecordingTracer(max_spans=int(os.environ.get("HI_TRACE_SPANS", "10000")))
+
+
+def observe_request(endpoint: str, model: str, started: float, status: int,
+                    span: Optional[Span] = None):
+    IN_FLIGHT.labels(endpoint).dec()
+    REQUESTS.labels(endpoint, model, str(status)).inc()
+    REQUEST_DURATION.labels(endpoint, model).observe(time.perf_counter() - started)
+    if span is not None:
+        span.set(status=status)
+        span.finish()
+
+
+def observe_generation(model: str, done_frame: Dict[str, Any]):
+    eval_count = done_frame.get("eval_count")
+    if eval_count:
+        GENERATED_TOKENS.labels(model).inc(eval_count)
+        eval_duration = done_frame.get("eval_duration")
+        if eval_duration:
+            GENERATION_THROUGHPUT.labels(model).observe(eval_count / (eval_duration / 1e9))
+
+
+# e.g. HI_PRELOAD_MODELS="qwen:0.5b" HI_KEEP_ALIVE="qwen:0.5b=-1,gemma2:2b=5m"
+PRELOAD_MODELS = [m for m in os.environ.get("HI_PRELOAD_MODELS", "").split(",") if m]
+KEEP_ALIVE = parse_keep_alive(os.environ.get("HI_KEEP_ALIVE", ""))
+
+
+def request_deadline(request: Request) -> Optional[float]:
+    """Event loop time the request has to be answered by, None for no limit"""
+    budget = MAX_GENERATION_SECONDS
+    header = request.headers.get(DEADLINE_HEADER)
+    if header:
+        try:
+            seconds = max(float(header), 0.0) / 1000
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid {DEADLINE_HEADER} header")
+        budget = seconds if budget is None else min(budget, seconds)
+    if budget is None:
+        return None
+    return asyncio.get_running_loop().time() + budget
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def watch_disconnect(request: Request, abort: Abort):
+    """Abort the subscriber as soon as the client closes the connection"""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            abort(ClientDisconnected())
+            return
+
+
+async def preload_models(residency: ModelResidency, models: List[str]):
+    for model in models:
+        try:
+            async with scheduler.slot(model):
+                elapsed = await residency.load(model)
+            logger.info(f"Preloaded {model} in {elapsed:.2f}s")
+        except Exception as e:
+            logger.warning(f"Could not preload {model}: {str(e)}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # created inside the server's event loop, shared by all requests
+    app.state.upstream = build_async_client(upstream_pool_config,
+                                            on_connect=UPSTREAM_CONNECT.observe)
+    app.state.residency = ModelResidency(app.state.upstream, OLLAMA_URL, keep_alive=KEEP_ALIVE)
+    # warm up in the background so the server can answer right away
+    preload = asyncio.create_task(preload_models(app.state.residency, PRELOAD_MODELS))
+    app.state.jobs = JobQueue(JobStore(JOBS_PATH), lambda body: run_job(app, body),
+                              workers=JOB_WORKERS, pause=JOB_PAUSE_SECONDS)
+    await app.state.jobs.start()
+    yield
+    preload.cancel()
+    await app.state.jobs.stop()
+    app.state.jobs.store.close()
+    await app.state.upstream.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 class ChatRequest(BaseModel):
@@ -15,20 +187,27 @@ class ChatRequest(BaseModel):
     role: Optional[str] = None
     model: str = "qwen:1.8b"
     model_parameters: Optional[Dict[str, Any]] = None
+    # continue a server-side session, or open one for this conversation
+    session_id: Optional[str] = None
+    start_session: bool = False
+    # higher runs first when generations are queued
+    priority: int = 0
+    # wait this long between token frames so more tokens share one frame
+    coalesce_ms: Optional[int] = None
 
-    @validator('model')
-    def validate_model(cls, v):
-        valid_models = ["qwen:0.5b", "qwen:1.8b", "gemma2:2b"]
-        if v not in valid_models:
-            raise ValueError(
-                f"Model {v} not supported. Available models: {valid_models}")
-        return v
 
+class BatchChatRequest(BaseModel):
+    items: List[ChatRequest]
+    concurrency: int = 2
 
-@app.post("/chat")
-async def chat_w_llm(chat_request: ChatRequest):
-    ollama_url = "http://localhost:11434/api/generate"
+    @validator('concurrency')
+    def validate_concurrency(cls, v):
+        if v < 1:
+            raise ValueError("concurrency must be at least 1")
+        return min(v, MAX_BATCH_CONCURRENCY)
 
+
+def build_prompt(chat_request: ChatRequest, history: List[Dict[str, str]]) -> str:
     # Build the prompt based on available context
     prompt = ""
     if chat_request.system_prompt:
@@ -38,37 +217,517 @@ async def chat_w_llm(chat_request: ChatRequest):
     if chat_request.role:
         prompt += f"You are acting as: {chat_request.role}\n\n"
 
-    # Add conversation history
-    for msg in chat_request.conversation_history:
+    # Add conversation history, as much of it as fits the model's window
+    pinned = estimate_tokens(prompt) + estimate_tokens(chat_request.message)
+    history = trim_history(history, context_budget.limit(chat_request.model), pinned)
+    for msg in history:
         prompt += f"{msg['role']}: {msg['content']}\n"
 
     # Add current message
     prompt += f"\nUser: {chat_request.message}\n"
+    return prompt
+
+
+async def require_model(request: Request, model: str):
+    """Reject models Ollama has not pulled (checked against the cached /api/tags list)"""
+    available = await request.app.state.residency.available()
+    if model not in available:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Model {model} not supported. Available models: {available}")
+
 
+def build_payload(chat_request: ChatRequest, stream: bool = True,
+                  session: Optional[ChatSession] = None,
+                  keep_alive: Optional[KeepAlive] = None) -> Dict[str, Any]:
     payload = {
         "model": chat_request.model,
-        "prompt": prompt,
-        "stream": True  # Enable streaming
+        "stream": stream
     }
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+
+    if session is not None and session.context and session.model == chat_request.model:
+        # Ollama's context already encodes the earlier turns, so only the
+        # new message has to be sent and evaluated
+        payload["prompt"] = f"\nUser: {chat_request.message}\n"
+        payload["context"] = session.context
+    elif session is not None:
+        payload["prompt"] = build_prompt(chat_request, session.history)
+    else:
+        payload["prompt"] = build_prompt(chat_request, chat_request.conversation_history)
 
     if chat_request.model_parameters:
         payload.update(chat_request.model_parameters)
+    return payload
+
+
+def read_line(line: str) -> Optional[Dict[str, Any]]:
+    """One line of Ollama's stream as a frame, None for a blank line"""
+    return json.loads(line) if line else None
+
+
+def relay_batch(batch: List[Dict[str, Any]]) -> Tuple[str, Optional[Dict[str, Any]],
+                                                      Optional[List[int]]]:
+    """(text, usage, context) of Ollama frames that arrived together
+
+    usage and context are None until the batch ends the generation.
+    """
+    text = "".join(frame.get("response", "") for frame in batch)
+    final = batch[-1]
+    if final.get("done"):
+        return text, usage_from(final), final.get("context")
+    return text, None, None
+
+
+@app.post("/chat")
+async def chat_w_llm(chat_request: ChatRequest, request: Request):
+    started = time.perf_counter()
+    IN_FLIGHT.labels("/chat").inc()
+    # continues the client's trace when it sent one
+    span = tracer.span("server.chat", trace_id=request.headers.get(TRACE_HEADER, "")[:64] or None,
+                       parent_id=request.headers.get(PARENT_SPAN_HEADER))
+    # the client picks the name, until it is validated it would blow up the label set
+    model = "unknown"
+    try:
+        await require_model(request, chat_request.model)
+        model = chat_request.model
+        span.set(model=model)
+        return await stream_chat(chat_request, request, started, span)
+    except HTTPException as e:
+        observe_request("/chat", model, started, e.status_code, span)
+        raise
+    except BaseException:
+        # cancelled before a response was returned
+        observe_request("/chat", model, started, 499, span)
+        raise
+
+
+async def stream_chat(chat_request: ChatRequest, request: Request, started: float, span: Span):
+    """Answer /chat for a validated model; the in-flight request is observed once the stream ends"""
+    ollama_url = f"{OLLAMA_URL}/api/generate"
+
+    deadline = request_deadline(request)
+    session = None
+    if chat_request.session_id:
+        session = sessions.get(chat_request.session_id)
+        if session is None:
+            raise HTTPException(
+                status_code=404, detail="Unknown or expired session")
+    with tracer.span("prompt_build", span):
+        payload = build_payload(chat_request, session=session,
+                                keep_alive=request.app.state.residency.keep_alive_for(chat_request.model))
 
+    # session turns depend on server-side state, everything else is cacheable
+    key = None
+    if session is None and not chat_request.start_session:
+        key = cache_key(chat_request.model, chat_request.model_parameters,
+                        chat_request.system_prompt, chat_request.role,
+                        chat_request.conversation_history, chat_request.message)
+        cached = response_cache.get(key)
+        (CACHE_MISSES if cached is None else CACHE_HITS).inc()
+        if cached is not None:
+            async def replay():
+                try:
+                    yield token_frame("".join(cached))
+                    yield done_frame({"cached": True})
+                finally:
+                    observe_request("/chat", chat_request.model, started, 200, span)
+            span.set(cache="hit")
+            return StreamingResponse(replay(), media_type=MEDIA_TYPE,
+                                     headers={"X-Cache": "HIT", TRACE_HEADER: span.trace_id})
+
+    upstream: httpx.AsyncClient = request.app.state.upstream
+
+    async def open_upstream():
+        # wait for a generation slot, the scheduler keeps Ollama on one model
+        with tracer.span("queue_wait", span):
+            ticket = await scheduler.acquire(chat_request.model, chat_request.priority)
+        try:
+            with tracer.span("upstream", span) as upstream_span:
+                response = await upstream.send(
+                    upstream.build_request("POST", ollama_url, json=payload), stream=True)
+                upstream_span.set(status=response.status_code)
+                if response.is_error:
+                    await response.aclose()
+                response.raise_for_status()
+        except BaseException:
+            scheduler.release(ticket)
+            raise
+        generation_span = tracer.span("upstream_stream", span)
+
+        # Lines are only pulled from Ollama as fast as the subscribers are
+        # fed, and the request is dropped once nobody is listening.
+        async def frames():
+            complete = False
+            try:
+                async for line in response.aiter_lines():
+                    frame = read_line(line)
+                    if frame is not None:
+                        if frame.get("done"):
+                            complete = True
+                            # once per generation, however many clients share it
+                            observe_generation(chat_request.model, frame)
+                            generation_span.set(eval_count=frame.get("eval_count"))
+                        yield frame
+            finally:
+                if not complete:
+                    UPSTREAM_ABORTS.inc()
+                    generation_span.set(aborted=True)
+                generation_span.finish()
+                await response.aclose()
+                scheduler.release(ticket)
+        return frames()
+
+    # identical concurrent requests share one generation
+    joined_at = time.monotonic()
+    flight = single_flight.join(flight_key(payload), open_upstream)
+    if flight.subscribers > 1:
+        # a flight nobody is attached to is never joined, so this one was running
+        GENERATIONS_SAVED.inc()
+    # generate() leaves the flight once it runs, until then it is ours to leave
+    streaming = False
     try:
-        response = requests.post(ollama_url, json=payload, stream=True)
-        response.raise_for_status()
+        if deadline is None:
+            await flight.wait_started()
+        else:
+            try:
+                await asyncio.wait_for(flight.wait_started(),
+                                       deadline - asyncio.get_running_loop().time())
+            except asyncio.TimeoutError:
+                CANCELLATIONS.labels("deadline").inc()
+                span.set(cancelled="deadline")
+                raise HTTPException(status_code=504, detail="Deadline exceeded while queued")
+
+        headers = {"X-Cache": "MISS"} if key else {}
+        headers["X-Queue-Wait-Ms"] = str(int((time.monotonic() - joined_at) * 1000))
+        headers[TRACE_HEADER] = span.trace_id
+        if session is None and chat_request.start_session:
+            session = sessions.create(
+                chat_request.model, list(chat_request.conversation_history))
+        if session is not None:
+            headers["X-Session-Id"] = session.session_id
 
         async def generate():
-            for line in response.iter_lines():
-                if line:
-                    json_response = json.loads(line.decode())
-                    if "response" in json_response:
-                        yield json_response["response"]
+            parts = []
+            keep_parts = session is not None or key is not None
+            window = (chat_request.coalesce_ms if chat_request.coalesce_ms is not None
+                      else DEFAULT_COALESCE_MS) / 1000
+            context = None
+            usage = None
+            first_token_at = None
+            status = 200
+            # stops the wait for the next batch when the client leaves or
+            # the deadline passes, dropping the upstream request with it
+            abort = Abort()
+            watcher = asyncio.ensure_future(watch_disconnect(request, abort))
+            timeout = None
+            if deadline is not None:
+                timeout = asyncio.get_running_loop().call_at(
+                    deadline, abort, DeadlineExceededError("Deadline exceeded"))
+            try:
+                # every batch holds all upstream frames that arrived since the last one
+                async for batch in flight.batches(abort):
+                    text, final_usage, final_context = relay_batch(batch)
+                    if final_usage is not None:
+                        usage, context = final_usage, final_context
+                    if text:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                            TIME_TO_FIRST_TOKEN.labels(chat_request.model).observe(
+                                first_token_at - started)
+                        if keep_parts:
+                            parts.append(text)
+                        yield token_frame(text)
+                        if window and usage is None:
+                            await asyncio.sleep(window)
+                yield done_frame(usage or {})
+            except DeadlineExceededError as e:
+                status = 504
+                CANCELLATIONS.labels("deadline").inc()
+                span.set(cancelled="deadline")
+                yield error_frame(str(e), code=DEADLINE_EXCEEDED)
+                return
+            except ClientDisconnected:
+                status = 499
+                CANCELLATIONS.labels("client_disconnect").inc()
+                span.set(cancelled="client_disconnect")
+                return
+            except Exception as e:
+                status = 500
+                ERRORS.labels("/chat", type(e).__name__).inc()
+                # headers are gone already, tell the client in-band
+                yield error_frame(f"Error: {str(e)}")
+                return
+            except BaseException:
+                # the client went away mid-stream
+                status = 499
+                CANCELLATIONS.labels("client_disconnect").inc()
+                span.set(cancelled="client_disconnect")
+                raise
+            finally:
+                watcher.cancel()
+                if timeout is not None:
+                    timeout.cancel()
+                observe_request("/chat", chat_request.model, started, status, span)
+            # only a completed generation is stored
+            if usage is None:
+                return
+            if session is not None:
+                session.record_turn(chat_request.model, chat_request.message,
+                                    "".join(parts), context)
+            if key is not None:
+                response_cache.put(key, parts)
 
-        return StreamingResponse(generate(), media_type="text/event-stream")
+        response = StreamingResponse(generate(), media_type=MEDIA_TYPE, headers=headers)
+        streaming = True
+        return response
 
-    except requests.exceptions.ConnectionError:
+    except HTTPException:
+        raise
+    except QueueFullError as e:
+        ERRORS.labels("/chat", "queue_full").inc()
+        raise HTTPException(status_code=429, detail=str(e),
+                            headers={"Retry-After": "1"})
+    except httpx.ConnectError:
+        ERRORS.labels("/chat", "upstream_unreachable").inc()
         raise HTTPException(
             status_code=503, detail="Ollama server is not accessible")
     except Exception as e:
+        ERRORS.labels("/chat", type(e).__name__).inc()
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    finally:
+        if not streaming:
+            # the last one to give up stops the generation
+            flight.leave()
+
+
+@app.post("/chat/batch")
+async def chat_batch(batch_request: BatchChatRequest, request: Request):
+    """Run independent prompts server-side, at most `concurrency` at a time"""
+    ollama_url = f"{OLLAMA_URL}/api/generate"
+    upstream: httpx.AsyncClient = request.app.state.upstream
+    semaphore = asyncio.Semaphore(batch_request.concurrency)
+
+    residency: ModelResidency = request.app.state.residency
+    available = await residency.available()
+
+    async def run(index: int, item: ChatRequest) -> Dict[str, Any]:
+        if item.model not in available:
+            return {"index": index, "error": f"Model {item.model} not supported"}
+        async with semaphore:
+            try:
+                async with scheduler.slot(item.model, item.priority):
+                    response = await upstream.post(ollama_url, json=build_payload(
+                        item, stream=False, keep_alive=residency.keep_alive_for(item.model)))
+                response.raise_for_status()
+                result = response.json()
+                observe_generation(item.model, result)
+                return {"index": index, "response": result.get("response", ""),
+                        "usage": usage_from(result)}
+            except QueueFullError as e:
+                ERRORS.labels("/chat/batch", "queue_full").inc()
+                return {"index": index, "error": str(e)}
+            except httpx.ConnectError:
+                ERRORS.labels("/chat/batch", "upstream_unreachable").inc()
+                return {"index": index, "error": "Ollama server is not accessible"}
+            except Exception as e:
+                ERRORS.labels("/chat/batch", type(e).__name__).inc()
+                return {"index": index, "error": f"Error: {str(e)}"}
+
+    started = time.perf_counter()
+    IN_FLIGHT.labels("/chat/batch").inc()
+    results = await asyncio.gather(
+        *(run(i, item) for i, item in enumerate(batch_request.items)))
+    observe_request("/chat/batch", "batch", started, 200)
+    return {"results": results}
+
+
+async def run_job(app: FastAPI,
+                  body: Dict[str, Any]) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+    """Generate one job's reply, from the start on every attempt"""
+    chat_request = ChatRequest(**body)
+    residency: ModelResidency = app.state.residency
+    payload = build_payload(chat_request, keep_alive=residency.keep_alive_for(chat_request.model))
+    upstream: httpx.AsyncClient = app.state.upstream
+    while True:
+        try:
+            # below interactive chats of the same priority
+            ticket = await scheduler.acquire(chat_request.model, chat_request.priority - 1)
+            break
+        except QueueFullError:
+            # chats fill the queue, batch work waits its turn
+            await asyncio.sleep(1.0)
+    try:
+        async with upstream.stream("POST", f"{OLLAMA_URL}/api/generate", json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                frame = read_line(line)
+                if frame is None:
+                    continue
+                if frame.get("done"):
+                    observe_generation(chat_request.model, frame)
+                    yield frame.get("response", ""), usage_from(frame)
+                else:
+                    yield frame.get("response", ""), None
+    finally:
+        scheduler.release(ticket)
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(chat_request: ChatRequest, request: Request):
+    """Queue a chat to be generated in the background, see GET /jobs/{job_id}/stream"""
+    if chat_request.session_id or chat_request.start_session:
+        raise HTTPException(status_code=422, detail="Jobs cannot use server-side sessions")
+    await require_model(request, chat_request.model)
+    job_id = request.app.state.jobs.submit(await request.json(), chat_request.priority)
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, request: Request):
+    job = request.app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str, request: Request, offset: int = 0,
+                     attempt: Optional[int] = None):
+    """Output of a job from offset (in characters) on, live until it finishes
+
+    A client whose connection dropped reconnects with the length of what
+    it already has and the attempt it came from; if the job has started
+    over since, the stream ends with a job_restarted error.
+    """
+    jobs: JobQueue = request.app.state.jobs
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+
+    async def frames():
+        try:
+            async for text, current in jobs.follow(job_id, offset, attempt):
+                yield job_frame(text, current)
+        except JobRestartedError as e:
+            yield error_frame(str(e), code=JOB_RESTARTED)
+            return
+        job = jobs.get(job_id)
+        if job["status"] == "done":
+            yield done_frame(job["usage"] or {})
+        else:
+            yield error_frame(job["error"] or f"Job {job['status']}")
+    return StreamingResponse(frames(), media_type=MEDIA_TYPE)
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, request: Request):
+    if not await request.app.state.jobs.cancel(job_id):
+        raise HTTPException(status_code=404, detail="Unknown or finished job")
+    return {"cancelled": job_id}
+
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return {"session_id": session.session_id, "model": session.model,
+            "history": session.history}
+
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return {"deleted": session_id}
+
+
+class LoadRequest(BaseModel):
+    keep_alive: Optional[KeepAlive] = None
+
+
+@app.get("/models")
+async def list_models(request: Request, refresh: bool = False):
+    residency: ModelResidency = request.app.state.residency
+    try:
+        loaded = await residency.loaded()
+    except httpx.HTTPError:
+        loaded = []
+    return {"available": await residency.available(refresh=refresh),
+            "loaded": loaded,
+            "keep_alive": residency.keep_alive}
+
+
+@app.post("/models/{model}/load")
+async def load_model(model: str, request: Request, load_request: Optional[LoadRequest] = None):
+    """Load a model into Ollama's memory so the next chat skips the load time"""
+    await require_model(request, model)
+    residency: ModelResidency = request.app.state.residency
+    keep_alive = load_request.keep_alive if load_request else None
+    try:
+        # goes through the scheduler so loading never interrupts a generation
+        async with scheduler.slot(model, priority=1):
+            elapsed = await residency.load(model, keep_alive)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code,
+                            detail=f"Ollama could not load {model}: {e.response.text}")
+    except httpx.ConnectError:
+        raise HTTPException(
+            status_code=503, detail="Ollama server is not accessible")
+    if keep_alive is not None:
+        residency.keep_alive[model] = keep_alive
+    return {"model": model, "load_time": elapsed}
+
+
+@app.post("/models/{model}/evict")
+async def evict_model(model: str, request: Request):
+    try:
+        await request.app.state.residency.evict(model)
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code,
+                            detail=f"Ollama could not evict {model}: {e.response.text}")
+    except httpx.ConnectError:
+        raise HTTPException(
+            status_code=503, detail="Ollama server is not accessible")
+    return {"model": model, "evicted": True}
+
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    """Prometheus text exposition of the server's counters and histograms"""
+    scheduler_stats = scheduler.stats()
+    QUEUE_WAITING.set(scheduler_stats["waiting"])
+    GENERATIONS_RUNNING.set(scheduler_stats["running"])
+    job_counts = request.app.state.jobs.store.counts()
+    for status in JOB_STATES:
+        JOBS.labels(status).set(job_counts.get(status, 0))
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """Server-side spans recorded for one trace id, oldest first"""
+    spans = tracer.spans(trace_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail="Unknown trace")
+    return {"trace_id": trace_id, "spans": [s.to_dict() for s in spans]}
+
+
+@app.get("/health")
+async def health():
+    """Liveness probe for load balancers and HiClient's backend pool"""
+    scheduler_stats = scheduler.stats()
+    return {"status": "ok", "running": scheduler_stats["running"],
+            "waiting": scheduler_stats["waiting"]}
+
+
+@app.get("/stats")
+async def stats(request: Request):
+    return {"upstream_pool": async_client_pool_stats(request.app.state.upstream),
+            "cache": response_cache.stats(),
+            "single_flight": single_flight.stats(),
+            "scheduler": scheduler.stats(),
+            "jobs": request.app.state.jobs.stats()}
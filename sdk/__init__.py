@@ -1,7 +1,30 @@
-from .client import HiClient
-from .utils import SDKLogger, Metrics
-from .exceptions import SDKException, ModelNotFoundError, InvalidConfigError
+import importlib
+
+# submodules are imported on first use, so `import sdk` (and the hi CLI)
+# does not pay for requests, httpx and the client up front
+_EXPORTS = {
+    'HiClient': '.client',
+    'AsyncHiClient': '.async_client',
+    'SDKLogger': '.utils',
+    'Metrics': '.metrics',
+    'SDKException': '.exceptions',
+    'ModelNotFoundError': '.exceptions',
+    'InvalidConfigError': '.exceptions',
+}
 
 __version__ = "0.1"
-__all__ = ['HiClient', 'SDKLogger', 'Metrics', 'SDKException',
+__all__ = ['HiClient', 'AsyncHiClient', 'SDKLogger', 'Metrics', 'SDKException',
            'ModelNotFoundError', 'InvalidConfigError']
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
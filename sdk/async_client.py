@@ -0,0 +1,274 @@
+import inspect
+import time
+from typing import AsyncIterator, Optional, List, Dict, Any
+
+import httpx
+
+from .client import _ClientBase
+from .transport import PoolConfig, build_async_client, async_client_pool_stats
+from .history import ContextBudget, BackgroundCompactor
+from .cache import ResponseCache
+from .store import ConversationStore
+from .tracing import Tracer, Span, TRACE_HEADER, PARENT_SPAN_HEADER
+from .listener import AsyncChatListener
+from .protocol import parse_frame, eval_seconds, DEADLINE_HEADER, DEADLINE_EXCEEDED
+from .exceptions import (
+    SDKException,
+    ConnectionError,
+    InvalidConfigError,
+    StreamingError,
+    CallbackError,
+    DeadlineExceededError
+)
+
+"""
+asyncio flavour of HiClient: one event loop can drive many concurrent chats
+"""
+
+
+async def _maybe_await(result):
+    if inspect.isawaitable(result):
+        await result
+
+
+async def _replay(chunks: List[str]) -> AsyncIterator[str]:
+    for chunk in chunks:
+        yield chunk
+
+
+class AsyncHiClient(_ClientBase):
+    def __init__(self, base_url="http://localhost:8000", track_conversation=False,
+                 http_client: Optional[httpx.AsyncClient] = None,
+                 pool_config: Optional[PoolConfig] = None, server_session=False,
+                 context_budget: Optional[ContextBudget] = None,
+                 compactor: Optional[BackgroundCompactor] = None,
+                 cache: Optional[ResponseCache] = None, tracer: Optional[Tracer] = None,
+                 conversation_store: Optional[ConversationStore] = None,
+                 conversation_id: Optional[str] = None):
+        super().__init__(base_url, track_conversation, server_session,
+                         context_budget, compactor, cache, tracer,
+                         conversation_store, conversation_id)
+        # one shared pool per AsyncHiClient; chats beyond max_connections wait for a free slot
+        self.pool_config = pool_config or PoolConfig(
+            max_connections=100, max_connections_per_host=100)
+        self._http = http_client or build_async_client(self.pool_config)
+        self._listener: Optional[AsyncChatListener] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.stop_continuous_chat()
+        self.events.close()
+        await self._http.aclose()
+
+    def pool_stats(self):
+        """Requests sent vs. connections opened, to verify connection reuse"""
+        return async_client_pool_stats(self._http)
+
+    async def refresh_models(self) -> Dict[str, Any]:
+        """Ask the server which models are pulled and which are loaded"""
+        try:
+            response = await self._http.get(f"{self.base_url}/models", params={"refresh": "true"})
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise ConnectionError(f"Failed to fetch models: {str(e)}")
+        models = response.json()
+        self.model_manager.update_available(models["available"])
+        return models
+
+    async def warm_model(self, model_name: Optional[str] = None, keep_alive=None) -> float:
+        """Load a model into Ollama's memory ahead of the first chat, returns the load time"""
+        model_name = model_name or self._current_model_name()
+        body = {"keep_alive": keep_alive} if keep_alive is not None else None
+        try:
+            response = await self._http.post(f"{self.base_url}/models/{model_name}/load", json=body)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise ConnectionError(f"Failed to load {model_name}: {str(e)}")
+        return response.json()["load_time"]
+
+    def start_continuous_chat(self, barge_in: bool = True,
+                              role: Optional[str] = None) -> AsyncChatListener:
+        """Answer input passed to push_input() as it arrives; call inside the event loop"""
+        if self._listener is None:
+            self._listener = AsyncChatListener(self, role=role, barge_in=barge_in).start()
+        return self._listener
+
+    async def stop_continuous_chat(self):
+        if self._listener is not None:
+            listener, self._listener = self._listener, None
+            await listener.stop()
+
+    def push_input(self, text: str):
+        if self._listener is None:
+            raise InvalidConfigError("Call start_continuous_chat() first")
+        self._listener.push(text)
+
+    async def _fire(self, event: str, *args):
+        """Run a sync or async callback, wrapping failures in CallbackError"""
+        if not self.events.has(event):
+            return
+        try:
+            for result in self.events.emit(event, *args):
+                await _maybe_await(result)
+        except Exception as e:
+            raise CallbackError(f"Error in {event} callback: {str(e)}")
+
+    async def _flush(self, event: str):
+        """Deliver what batching subscribers of event still hold back"""
+        try:
+            for result in self.events.flush(event):
+                await _maybe_await(result)
+        except Exception as e:
+            raise CallbackError(f"Error in {event} callback: {str(e)}")
+
+    async def _fire_error(self, error: SDKException):
+        if self.events.has('on_error'):
+            try:
+                for result in self.events.emit('on_error', str(error)):
+                    await _maybe_await(result)
+            except Exception as callback_error:
+                print(f"Error in error callback: {str(callback_error)}")
+
+    async def _stream_chunks(self, payload: Dict[str, Any], message: str,
+                             role: Optional[str], root: Span,
+                             usage: Dict[str, Any],
+                             deadline: Optional[float] = None) -> AsyncIterator[str]:
+        headers = {TRACE_HEADER: root.trace_id, PARENT_SPAN_HEADER: root.span_id}
+        try:
+            for attempt in range(2):
+                kwargs = {}
+                if deadline is not None:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        raise DeadlineExceededError("Deadline exceeded")
+                    headers[DEADLINE_HEADER] = str(int(remaining * 1000))
+                    # a read that blocks past the deadline fails instead of hanging
+                    kwargs["timeout"] = httpx.Timeout(remaining,
+                                                      connect=self.pool_config.connect_timeout)
+                started = time.perf_counter()
+                async with self._http.stream("POST", f"{self.base_url}/chat", json=payload,
+                                             headers=headers, **kwargs) as response:
+                    self.tracer.record("request", root, started, time.perf_counter(),
+                                       status=response.status_code)
+                    if response.status_code == 404 and "session_id" in payload and not attempt:
+                        # the server forgot our session, start over with the full history
+                        self.session_id = None
+                        payload = self._build_payload(message, role)
+                        continue
+                    if response.status_code == 504 and deadline is not None:
+                        raise DeadlineExceededError("Deadline exceeded while queued on the server")
+                    response.raise_for_status()
+                    if self.track_conversation and self.server_session:
+                        self.session_id = response.headers.get(
+                            "X-Session-Id", self.session_id)
+                    try:
+                        async for line in response.aiter_lines():
+                            if not line:
+                                continue
+                            frame = parse_frame(line)
+                            if "token" in frame:
+                                if deadline is not None and time.perf_counter() >= deadline:
+                                    raise DeadlineExceededError("Deadline exceeded while streaming")
+                                yield frame["token"]
+                            elif "error" in frame:
+                                if frame.get("code") == DEADLINE_EXCEEDED:
+                                    raise DeadlineExceededError(frame["error"])
+                                raise StreamingError(frame["error"])
+                            elif frame.get("done"):
+                                usage.update(frame.get("usage") or {})
+                    except httpx.TimeoutException:
+                        if deadline is not None and time.perf_counter() >= deadline:
+                            raise DeadlineExceededError("Deadline exceeded while streaming")
+                        raise
+                    except (httpx.HTTPError, ValueError) as e:
+                        raise StreamingError(
+                            f"Error while streaming response: {str(e)}")
+                break
+        except httpx.ConnectError:
+            raise ConnectionError(
+                f"Failed to connect to server at {self.base_url}")
+        except httpx.HTTPStatusError as e:
+            raise ConnectionError(f"HTTP error occurred: {str(e)}")
+        except httpx.TimeoutException as e:
+            if deadline is not None and time.perf_counter() >= deadline:
+                raise DeadlineExceededError("Deadline exceeded waiting for the server")
+            raise ConnectionError(f"Request timed out: {str(e)}")
+
+    async def stream(self, message: str, role: Optional[str] = None,
+                     timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Yield response chunks as they arrive from the server
+
+        timeout bounds the whole turn in seconds; the server stops
+        generating once it has passed.
+        """
+        timer = None
+        deadline = time.perf_counter() + timeout if timeout is not None else None
+        root = self.tracer.span("chat")
+        try:
+            with self.tracer.span("validate", root):
+                payload = self._build_payload(message, role)
+            root.set(model=payload["model"])
+            timer = self.metrics.start_request(payload["model"])
+            await self._fire('on_request', message)
+
+            key = self._cache_key(payload)
+            cached = self.cache.get(key) if key else None
+            # a cache hit is replayed through the same on_token path as a live stream
+            usage: Dict[str, Any] = {}
+            source = _replay(cached) if cached is not None else \
+                self._stream_chunks(payload, message, role, root, usage, deadline)
+
+            chunks = []
+            stream_span = self.tracer.span("stream", root)
+            async for chunk_content in source:
+                timer.token()
+                if not chunks:
+                    self.tracer.record("first_byte", stream_span, stream_span.start,
+                                       time.perf_counter())
+                chunks.append(chunk_content)
+                await self._fire('on_token', chunk_content)
+                yield chunk_content
+            await self._flush('on_token')
+            stream_span.set(chunks=len(chunks))
+            stream_span.finish()
+            if key and cached is None:
+                self.cache.put(key, chunks)
+            self.last_usage = usage
+            self.last_model = payload["model"]
+
+            with self.tracer.span("finalize", root):
+                full_response = "".join(chunks)
+                if self.track_conversation:
+                    self.conversation.add_message("user", message)
+                    self.conversation.add_message("assistant", full_response)
+
+                await self._fire('on_response', full_response)
+
+                token_count = self._token_count(usage, full_response)
+                latency = self.metrics.end_request(timer, token_count, eval_seconds(usage))
+                if cached is None:
+                    self._observe(payload["model"], usage, timer)
+            self.logger.info(
+                f"Request completed in {latency:.2f}s with {token_count} tokens"
+                f" by {payload['model']}")
+
+        except SDKException as e:
+            root.set(error=type(e).__name__)
+            if timer is not None:
+                timer.fail()
+            await self._fire_error(e)
+            raise
+        finally:
+            root.finish()
+
+    async def chat(self, message: str, role: Optional[str] = None,
+                   timeout: Optional[float] = None) -> str:
+        chunks = []
+        async for chunk in self.stream(message, role=role, timeout=timeout):
+            chunks.append(chunk)
+        return "".join(chunks)
@@ -0,0 +1,196 @@
+import asyncio
+import random
+import time
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+from .metrics import Histogram
+from .protocol import parse_frame
+
+"""
+load generator for the /chat endpoint: closed-loop (fixed concurrency) or
+open-loop (fixed request rate), reports throughput and latency percentiles
+"""
+
+DEFAULT_PROMPTS = [
+    "Hello!",
+    "Tell me a short joke",
+    "Explain what a Raspberry Pi is in one sentence",
+    "Write a haiku about the ocean",
+]
+
+
+class BenchConfig:
+    """What to send and how hard
+
+    With rate=None every worker sends its next request as soon as the last
+    one finished (closed loop). With a rate, requests are started on a fixed
+    schedule and latency is measured from the scheduled start, so time spent
+    waiting for one of the concurrency slots counts against the server.
+    The run ends after duration seconds or max_requests, whichever is first.
+    """
+
+    def __init__(self, url: str = "http://localhost:8000", model: str = "qwen:0.5b",
+                 concurrency: int = 4, duration: float = 10.0, rate: Optional[float] = None,
+                 prompts: Optional[List[str]] = None, max_requests: Optional[int] = None,
+                 timeout: float = 120.0, seed: Optional[int] = None, unique: bool = False):
+        self.url = url
+        self.model = model
+        self.concurrency = concurrency
+        self.duration = duration
+        self.rate = rate
+        self.prompts = prompts or list(DEFAULT_PROMPTS)
+        self.max_requests = max_requests
+        self.timeout = timeout
+        self.seed = seed
+        # numbered prompts defeat the server's response cache and request coalescing
+        self.unique = unique
+
+
+class BenchReport:
+    def __init__(self):
+        self.ok = 0
+        self.errors: Dict[str, int] = {}
+        self.tokens = 0
+        self.elapsed = 0.0
+        self.latency = Histogram()
+        self.ttft = Histogram()
+
+    @property
+    def requests(self) -> int:
+        return self.ok + sum(self.errors.values())
+
+    def record(self, latency: float, ttft: Optional[float], tokens: int):
+        self.ok += 1
+        self.tokens += tokens
+        self.latency.record(latency)
+        if ttft is not None:
+            self.ttft.record(ttft)
+
+    def record_error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = self.elapsed or 1e-9
+        return {
+            "requests": self.requests,
+            "ok": self.ok,
+            "errors": dict(self.errors),
+            "elapsed": self.elapsed,
+            "requests_per_second": self.ok / elapsed,
+            "tokens_per_second": self.tokens / elapsed,
+            "latency": self.latency.summary(),
+            "time_to_first_token": self.ttft.summary(),
+        }
+
+    def format(self) -> str:
+        d = self.to_dict()
+        lines = [
+            f"requests      {d['requests']} ({d['ok']} ok, {d['requests'] - d['ok']} failed) in {d['elapsed']:.1f}s",
+            f"throughput    {d['requests_per_second']:.2f} req/s, {d['tokens_per_second']:.1f} tokens/s",
+        ]
+        for label, key in (("ttft", "time_to_first_token"), ("latency", "latency")):
+            s = d[key]
+            lines.append(f"{label:<13} p50 {s['p50'] * 1000:.0f}ms  p95 {s['p95'] * 1000:.0f}ms  "
+                         f"p99 {s['p99'] * 1000:.0f}ms")
+        for kind, count in sorted(d["errors"].items()):
+            lines.append(f"error         {kind}: {count}")
+        return "\n".join(lines)
+
+
+async def _one_request(client: httpx.AsyncClient, config: BenchConfig, prompt: str,
+                       started: float, report: BenchReport):
+    first_chunk_at = None
+    words = 0
+    usage: Dict[str, Any] = {}
+    try:
+        async with client.stream("POST", f"{config.url}/chat",
+                                 json={"message": prompt, "model": config.model}) as response:
+            if response.is_error:
+                report.record_error(f"http_{response.status_code}")
+                return
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                frame = parse_frame(line)
+                if "token" in frame:
+                    if first_chunk_at is None:
+                        first_chunk_at = time.perf_counter()
+                    words += len(frame["token"].split())
+                elif "error" in frame:
+                    report.record_error("stream_error")
+                    return
+                elif frame.get("done"):
+                    usage = frame.get("usage") or {}
+    except httpx.HTTPError as e:
+        report.record_error(type(e).__name__)
+        return
+    now = time.perf_counter()
+    # Ollama's token count when the server passed it on (not for cache hits)
+    tokens = usage.get("eval_count") or words
+    report.record(now - started, first_chunk_at - started if first_chunk_at else None, tokens)
+
+
+async def run_bench(config: BenchConfig, client: Optional[httpx.AsyncClient] = None) -> BenchReport:
+    report = BenchReport()
+    rng = random.Random(config.seed)
+    sent = [0]
+
+    def pick() -> str:
+        prompt = rng.choice(config.prompts)
+        sent[0] += 1
+        return f"{prompt} (#{sent[0]})" if config.unique else prompt
+
+    own_client = client is None
+    if own_client:
+        limits = httpx.Limits(max_connections=config.concurrency,
+                              max_keepalive_connections=config.concurrency)
+        client = httpx.AsyncClient(limits=limits, timeout=config.timeout)
+
+    start = time.perf_counter()
+    deadline = start + config.duration
+    budget = [config.max_requests if config.max_requests is not None else float("inf")]
+
+    def take() -> bool:
+        if budget[0] <= 0 or time.perf_counter() >= deadline:
+            return False
+        budget[0] -= 1
+        return True
+
+    async def closed_loop_worker():
+        while take():
+            await _one_request(client, config, pick(), time.perf_counter(), report)
+
+    async def open_loop():
+        slots = asyncio.Semaphore(config.concurrency)
+        interval = 1.0 / config.rate
+        pending = set()
+
+        async def scheduled(started: float):
+            async with slots:
+                await _one_request(client, config, pick(), started, report)
+
+        n = 0
+        while take():
+            started = start + n * interval
+            task = asyncio.ensure_future(scheduled(started))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            n += 1
+            delay = start + n * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if pending:
+            await asyncio.gather(*pending)
+
+    try:
+        if config.rate:
+            await open_loop()
+        else:
+            await asyncio.gather(*(closed_loop_worker() for _ in range(config.concurrency)))
+    finally:
+        report.elapsed = time.perf_counter() - start
+        if own_client:
+            await client.aclose()
+    return report
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Optional, Any, Tuple
+
+"""
+response cache for repeated prompts: in-memory LRU with TTL and a byte cap,
+optionally backed by SQLite so answers survive restarts
+"""
+
+
+def cache_key(model: str, model_parameters: Optional[Dict[str, Any]], system_prompt: Optional[str],
+              role: Optional[str], history: List[Dict[str, str]], message: str) -> str:
+    blob = json.dumps([model, model_parameters or {}, system_prompt, role, history, message],
+                      sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Caches the streamed chunks of a reply so hits can be replayed token by token
+
+    max_entries and max_bytes bound the in-memory tier (least recently used
+    entries go first), ttl is in seconds. With a path, entries are also
+    written to a SQLite file and memory misses fall back to it.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 4 * 1024 * 1024,
+                 ttl: float = 3600.0, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, List[str], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, chunks TEXT NOT NULL, expires_at REAL NOT NULL)")
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self._remove(key)
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT chunks, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] > now:
+                    chunks = json.loads(row[0])
+                    self._store(key, chunks, row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return chunks
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, chunks: List[str]):
+        expires_at = time.time() + self.ttl
+        chunks = list(chunks)
+        with self._lock:
+            self._store(key, chunks, expires_at)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                                 (key, json.dumps(chunks), expires_at))
+                self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+    def _store(self, key: str, chunks: List[str], expires_at: float):
+        size = sum(len(c.encode()) for c in chunks)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (expires_at, chunks, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
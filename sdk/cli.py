@@ -1,9 +1,22 @@
 import click
-from .client import HiClient, ModelConfig
-from colorama import init, Fore, Style
-import time
 
-init()
+"""
+the hi command; heavy modules (the client, requests, httpx, colorama) are
+imported inside the commands that need them so `hi --help` and `hi models`
+start fast
+"""
+
+_colorama = None
+
+
+def _colors():
+    """colorama's Fore and Style, initialized on first use"""
+    global _colorama
+    if _colorama is None:
+        import colorama
+        colorama.init()
+        _colorama = colorama
+    return _colorama.Fore, _colorama.Style
 
 
 @click.group()
@@ -13,13 +26,15 @@ def cli():
 
 
 @cli.command()
-@click.option('--model', default='qwen:1.8b', help='Model to load')
+@click.option('--model', default='qwen:1.8b', help="Model to load, or 'auto' to pick one per message")
 @click.option('--temp', default=0.7, help='Temperature for generation')
 @click.option('--system-prompt', help='System prompt to use')
 @click.option('--role', help='Role for the assistant')
 @click.option('--stream/--no-stream', default=True, help='Enable/disable streaming')
 def chat(model: str, temp: float, system_prompt: str, role: str, stream: bool):
     """Start an interactive chat session"""
+    from .client import HiClient
+    Fore, Style = _colors()
     client = HiClient()
 
     try:
@@ -31,11 +46,6 @@ def chat(model: str, temp: float, system_prompt: str, role: str, stream: bool):
 
         print(f"{Fore.GREEN}Model loaded! Type 'exit' to quit.{Style.RESET_ALL}\n")
 
-        if stream:
-            def on_token(token):
-                print(token, end="", flush=True)
-            client.register_callback("on_token", on_token)
-
         while True:
             try:
                 msg = input(f"{Fore.BLUE}> {Style.RESET_ALL}")
@@ -44,8 +54,10 @@ def chat(model: str, temp: float, system_prompt: str, role: str, stream: bool):
 
                 if stream:
                     print(f"{Fore.GREEN}Assistant: {Style.RESET_ALL}", end="")
-                    for _ in client.chat(msg, role=role):
-                        pass  # Tokens are handled by callback
+                    # Ctrl+C stops the reply and closes the connection
+                    with client.stream(msg, role=role) as reply:
+                        for token in reply:
+                            print(token, end="", flush=True)
                     print("\n")
                 else:
                     response = client.chat(msg, role=role)
@@ -64,11 +76,99 @@ def chat(model: str, temp: float, system_prompt: str, role: str, stream: bool):
 @cli.command()
 def models():
     """List available models"""
+    from .models import DEFAULT_MODELS
+    Fore, Style = _colors()
     print(f"{Fore.CYAN}Available models:{Style.RESET_ALL}")
-    for model in ModelConfig.AVAILABLE_MODELS:
+    for model in DEFAULT_MODELS:
         print(f"  • {model}")
 
 
+@cli.command()
+@click.option('--url', default='http://localhost:8000', help='Hi server to benchmark')
+@click.option('--model', default='qwen:0.5b', help='Model to request')
+@click.option('--concurrency', default=4, help='Requests in flight at once')
+@click.option('--duration', default=10.0, help='Seconds to run')
+@click.option('--rate', type=float, help='Requests per second (default: as fast as concurrency allows)')
+@click.option('--requests', 'max_requests', type=int, help='Stop after this many requests')
+@click.option('--prompt', 'prompts', multiple=True, help='Prompt to send, repeat for a mix')
+@click.option('--prompt-file', type=click.File(), help='File with one prompt per line')
+@click.option('--unique/--no-unique', default=False,
+              help='Number prompts so the server cannot answer from cache')
+@click.option('--fake', is_flag=True, help='Benchmark against a local fake Ollama instead of --url')
+@click.option('--fake-tps', default=50.0, help='Tokens/sec of the fake Ollama')
+@click.option('--fake-error-rate', default=0.0, help='Fraction of fake generations that fail')
+@click.option('--json', 'as_json', is_flag=True, help='Print the report as JSON')
+def bench(url, model, concurrency, duration, rate, max_requests, prompts, prompt_file,
+          unique, fake, fake_tps, fake_error_rate, as_json):
+    """Load test the /chat endpoint and report throughput and latency"""
+    import asyncio
+    import json
+    from .bench import BenchConfig, run_bench
+    Fore, Style = _colors()
+
+    prompts = list(prompts)
+    if prompt_file:
+        prompts += [line.strip() for line in prompt_file if line.strip()]
+    config = BenchConfig(url=url, model=model, concurrency=concurrency, duration=duration,
+                         rate=rate, prompts=prompts, max_requests=max_requests, unique=unique)
+
+    servers = []
+    try:
+        if fake:
+            servers = _start_fake_stack(fake_tps, fake_error_rate)
+            config.url = servers[-1].url
+        if not as_json:
+            print(f"{Fore.CYAN}Benchmarking {config.url} with {model}, "
+                  f"concurrency {concurrency}, {duration:g}s...{Style.RESET_ALL}")
+        report = asyncio.run(run_bench(config))
+    finally:
+        for server in reversed(servers):
+            server.stop()
+
+    if as_json:
+        print(json.dumps(report.to_dict(), indent=2))
+    else:
+        print(report.format())
+
+
+def _start_fake_stack(tokens_per_second: float, error_rate: float):
+    """Fake Ollama plus the Hi server in front of it, both on free local ports"""
+    from .fake_ollama import create_app, BackgroundServer
+    try:
+        import main
+    except ImportError:
+        raise click.ClickException("--fake needs the Hi server (main.py) on the import path, "
+                                   "run it from the repository root")
+
+    ollama = BackgroundServer(create_app(tokens_per_second=tokens_per_second,
+                                         error_rate=error_rate)).start()
+    main.OLLAMA_URL = ollama.url
+    # a throwaway run must not leave a job database in the working directory
+    main.JOBS_PATH = ":memory:"
+    return [ollama, BackgroundServer(main.app).start()]
+
+
+@cli.command(name='fake-ollama')
+@click.option('--host', default='127.0.0.1', help='Interface to bind')
+@click.option('--port', default=11434, help='Port to listen on')
+@click.option('--tps', default=50.0, help='Tokens per second to stream')
+@click.option('--startup-delay', default=0.0, help='Seconds before the server accepts requests')
+@click.option('--first-token-delay', default=0.0, help='Seconds before each first token')
+@click.option('--error-rate', default=0.0, help='Fraction of generations that fail with a 500')
+@click.option('--reply', help='Canned reply to stream')
+def fake_ollama(host, port, tps, startup_delay, first_token_delay, error_rate, reply):
+    """Run a fake Ollama for offline benchmarks"""
+    import uvicorn
+    from .fake_ollama import create_app, DEFAULT_REPLY
+    Fore, Style = _colors()
+
+    app = create_app(reply=reply or DEFAULT_REPLY, tokens_per_second=tps,
+                     startup_delay=startup_delay, first_token_delay=first_token_delay,
+                     error_rate=error_rate)
+    print(f"{Fore.CYAN}Fake Ollama on http://{host}:{port} ({tps:g} tokens/s){Style.RESET_ALL}")
+    uvicorn.run(app, host=host, port=port, log_level="warning")
+
+
 @cli.command()
 @click.option('--dev/--no-dev', default=False, help='Install in development mode')
 def setup(dev):
@@ -77,6 +177,7 @@ def setup(dev):
     import os
     import sys
     from pathlib import Path
+    Fore, Style = _colors()
 
     print(f"{Fore.CYAN}Setting up Hi SDK... Grab a coffee, this will take a while! ☕{Style.RESET_ALL}")
 
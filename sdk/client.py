@@ -1,5 +1,8 @@
 import requests
-from typing import List, Optional, Dict, Callable, Any
+from typing import List, Optional, Dict, Callable, Any, Iterable, Iterator, Deque, Tuple
+from collections import deque
+from concurrent.futures import (ThreadPoolExecutor, as_completed as futures_as_completed,
+                                wait as futures_wait, FIRST_COMPLETED)
 import time
 import threading
 import json
@@ -9,9 +12,24 @@ from .exceptions import (
     InvalidConfigError,
     ConnectionError,
     StreamingError,
-    CallbackError
+    CallbackError,
+    DeadlineExceededError,
+    JobNotFoundError,
+    JobRestartedError
 )
-from .utils import SDKLogger, Metrics
+from .utils import SDKLogger
+from .metrics import Metrics, RequestTimer
+from .tracing import Tracer, Span, TRACE_HEADER, PARENT_SPAN_HEADER
+from .protocol import parse_frame, eval_seconds, DEADLINE_HEADER, DEADLINE_EXCEEDED, JOB_RESTARTED
+from .transport import PoolConfig, build_session, session_pool_stats
+from .history import ContextBudget, BackgroundCompactor, estimate_tokens
+from .cache import ResponseCache, cache_key
+from .models import DEFAULT_MODELS, AUTO_MODEL
+from .selection import ModelSelector, DEFAULT_LATENCY_SLO
+from .routing import Backend, BackendPool
+from .listener import ChatListener
+from .events import EventBus, Subscription
+from .store import ConversationStore, Message, new_conversation_id
 
 """
 two main classes: conversation, client
@@ -22,12 +40,14 @@ two main classes: conversation, client
 
 
 class ModelConfig:
-    AVAILABLE_MODELS = ["qwen:0.5b", "qwen:1.8b", "gemma2:2b"]
+    AVAILABLE_MODELS = list(DEFAULT_MODELS)
 
-    def __init__(self, model_name: str = "qwen:1.8b", **kwargs):
-        if model_name not in self.AVAILABLE_MODELS:
+    def __init__(self, model_name: str = "qwen:1.8b",
+                 available_models: Optional[List[str]] = None, **kwargs):
+        available_models = available_models or self.AVAILABLE_MODELS
+        if model_name not in available_models:
             error_msg = f"Model '{model_name}' not found. Available models:\n" + \
-                "\n".join(f"  • {model}" for model in self.AVAILABLE_MODELS)
+                "\n".join(f"  • {model}" for model in available_models)
             raise ModelNotFoundError(error_msg)
 
         self.model_name = model_name
@@ -38,162 +58,1049 @@ class ModelManager:
     def __init__(self):
         self.current_model = None
         self.model_config = None
+        # set by load_model("auto"), picks the model of every request
+        self.selector: Optional[ModelSelector] = None
+        # replaced by what the server reports once refresh_models() ran
+        self.available_models = list(ModelConfig.AVAILABLE_MODELS)
 
-    def load_model(self, model_name: str, **kwargs):
-        self.model_config = ModelConfig(model_name, **kwargs)
+    def load_model(self, model_name: str, latency_slo: float = DEFAULT_LATENCY_SLO,
+                   reply_tokens: Optional[int] = None, **kwargs):
+        """Use model_name, or with "auto" choose per request
+
+        In auto mode latency_slo (seconds) is the budget a larger model has
+        to fit in, reply_tokens the expected reply length (learned if not
+        given); see ModelSelector.
+        """
+        if model_name != AUTO_MODEL:
+            self.selector = None
+            self.model_config = ModelConfig(model_name, self.available_models, **kwargs)
+            return
+        self.selector = ModelSelector(self.available_models, latency_slo, reply_tokens)
+        # the smallest model stands in wherever a single name is needed
+        self.model_config = ModelConfig(self.selector.models[0], self.available_models, **kwargs)
+
+    @property
+    def auto(self) -> bool:
+        return self.selector is not None
+
+    def select(self, prompt_tokens: int) -> str:
+        """Model for a request whose prompt and history are prompt_tokens long"""
+        if self.selector is not None:
+            return self.selector.select(prompt_tokens)
+        return self.model_config.model_name
+
+    def observe(self, model: str, usage: Dict[str, Any], ttft: Optional[float] = None):
+        if self.selector is not None:
+            self.selector.observe(model, usage, ttft)
+
+    def update_available(self, models: List[str]):
+        if models:
+            self.available_models = list(models)
+            if self.selector is not None:
+                self.selector.set_models(self.available_models)
 
     def set_parameters(self, **kwargs):
         if self.model_config:
             self.model_config.parameters.update(kwargs)
 
     def list_available_models(self):
-        return ModelConfig.AVAILABLE_MODELS
+        return self.available_models
 
 
 class Conversation:
-    def __init__(self):
-        self.messages: List[Dict[str, str]] = []
+    """Message history, optionally held to a token budget
+
+    With a budget the oldest messages are evicted once the history (plus the
+    pinned system prompt and summary) outgrows the model's window. Token
+    counts are kept as running totals, so each turn costs O(1). Evicted
+    messages go to the compactor, if any, which folds them into a summary
+    that is pinned at the start of the history.
+
+    Every message is also appended to the store. Only the store's window
+    of recent messages is loaded when an existing conversation_id is
+    resumed and kept in memory afterwards.
+    """
+
+    def __init__(self, budget: Optional[ContextBudget] = None,
+                 compactor: Optional[BackgroundCompactor] = None,
+                 store: Optional[ConversationStore] = None,
+                 conversation_id: Optional[str] = None):
+        self.budget = budget
+        self.compactor = compactor
+        self.store = store or ConversationStore()
+        self.conversation_id = conversation_id or new_conversation_id()
+        self.messages: Deque[Message] = deque(
+            self.store.load(self.conversation_id, self.store.window))
+        self.model: Optional[str] = None
+        self.summary: Optional[str] = None
+        self.total_tokens = sum(m.tokens for m in self.messages)
+        self._system_tokens = 0
+        self._summary_tokens = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pinned_tokens(self) -> int:
+        return self._system_tokens + self._summary_tokens
 
     def add_message(self, role: str, content: str):
-        self.messages.append({"role": role, "content": content})
+        message = Message(role, content, estimate_tokens(content))
+        self.store.append(self.conversation_id, message)
+        with self._lock:
+            self.messages.append(message)
+            self.total_tokens += message.tokens
+            evicted = self._enforce_budget()
+        self._compact(evicted)
 
     def get_history(self) -> List[Dict[str, str]]:
-        return self.messages
+        with self._lock:
+            history = [m.to_dict() for m in self.messages]
+            if self.summary:
+                history.insert(0, {"role": "system",
+                                   "content": f"Summary of the earlier conversation: {self.summary}"})
+        return history
 
+    def set_model(self, model: str):
+        self._update(lambda: setattr(self, "model", model))
 
-# client class, holds the conversation, system prompt, and callbacks
-# ! TODO: Add set role
-class HiClient:
-    def __init__(self, base_url="http://localhost:8000", track_conversation=False):
+    def pin_system_prompt(self, prompt: Optional[str]):
+        """Account for the system prompt, which is sent next to the history"""
+        self._update(lambda: setattr(
+            self, "_system_tokens", estimate_tokens(prompt) if prompt else 0))
+
+    def set_summary(self, summary: str):
+        def apply():
+            self.summary = summary
+            self._summary_tokens = estimate_tokens(summary)
+        self._update(apply)
+
+    def _update(self, change: Callable[[], None]):
+        with self._lock:
+            change()
+            evicted = self._enforce_budget()
+        self._compact(evicted)
+
+    def _enforce_budget(self) -> List[Message]:
+        evicted = []
+        window = self.store.window
+        if self.budget is None and window is None:
+            return evicted
+        limit = self.budget.limit(self.model) - self.pinned_tokens if self.budget else None
+        max_messages = self.budget.max_messages if self.budget else None
+        if window is not None:
+            max_messages = window if max_messages is None else min(max_messages, window)
+        while self.messages and ((limit is not None and self.total_tokens > limit) or
+                                 (max_messages is not None and len(self.messages) > max_messages)):
+            message = self.messages.popleft()
+            self.total_tokens -= message.tokens
+            evicted.append(message)
+        return evicted
+
+    def _compact(self, evicted: List[Message]):
+        if evicted and self.compactor:
+            self.compactor.submit(self, [m.to_dict() for m in evicted])
+
+
+class BatchResult:
+    """Outcome of one prompt in a batch; exactly one of response/error is set"""
+
+    def __init__(self, index: int, message: str, response: Optional[str] = None,
+                 error: Optional[str] = None):
+        self.index = index
+        self.message = message
+        self.response = response
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        outcome = f"response={self.response!r}" if self.ok else f"error={self.error!r}"
+        return f"BatchResult(index={self.index}, {outcome})"
+
+
+class _ClientBase:
+    """State and payload handling shared by HiClient and AsyncHiClient"""
+
+    def __init__(self, base_url="http://localhost:8000", track_conversation=False,
+                 server_session=False, context_budget: Optional[ContextBudget] = None,
+                 compactor: Optional[BackgroundCompactor] = None,
+                 cache: Optional[ResponseCache] = None, tracer: Optional[Tracer] = None,
+                 conversation_store: Optional[ConversationStore] = None,
+                 conversation_id: Optional[str] = None):
         self.base_url = base_url
-        self.conversation = Conversation()
+        # where tracked messages are kept; the default keeps them in memory only
+        self.conversation_store = conversation_store
+        self.cache = cache
+        # receives timing spans for every phase of a chat turn
+        self.tracer = tracer or Tracer()
+        self.context_budget = context_budget
+        self.compactor = compactor
         self.system_prompt = None
-        self.track_conversation = track_conversation
-        self._continuous_chat = False
-        self._callbacks = {}
         self.model_manager = ModelManager()
+        self.conversation = self._new_conversation(conversation_id)
+        self.track_conversation = track_conversation
+        # with server_session the server keeps the history (and Ollama's context),
+        # so follow-up turns only carry the new message
+        self.server_session = server_session
+        self.session_id: Optional[str] = None
+        # usage frame of the last reply: eval_count, prompt_eval_count, durations
+        self.last_usage: Dict[str, Any] = {}
+        # model that served the last reply, the one load_model("auto") picked
+        self.last_model: Optional[str] = None
+        # any number of subscribers per event, see subscribe()
+        self.events = EventBus()
+        self._registered: Dict[str, Subscription] = {}
         self.logger = SDKLogger()
         self.metrics = Metrics()
 
     def load_model(self, model_name: str, **kwargs):
         self.model_manager.load_model(model_name, **kwargs)
+        self.conversation.set_model(self.model_manager.model_config.model_name)
 
     def set_model_parameters(self, **kwargs):
         self.model_manager.set_parameters(**kwargs)
 
     def set_system_prompt(self, prompt: str):
         self.system_prompt = prompt
+        self.conversation.pin_system_prompt(prompt)
 
     # register callbacks for different events (e.g., 'on_response', 'on_error')
     # Benachrichtigungshaken, auf bestimme Ereignisse reagieren
     def register_callback(self, event: str, callback: Callable):
-        """Register callbacks for different events (e.g., 'on_response', 'on_error')"""
-        self._callbacks[event] = callback
+        """Register callbacks for different events (e.g., 'on_response', 'on_error')
+
+        Replaces the callback registered for event before; subscribe() adds
+        one next to the others instead.
+        """
+        previous = self._registered.pop(event, None)
+        if previous is not None:
+            self.events.unsubscribe(previous)
+        self._registered[event] = self.events.subscribe(event, callback)
+
+    def subscribe(self, event: str, callback: Callable, threaded: bool = False,
+                  queue_size: int = 256, overflow: str = "block",
+                  batch_size: Optional[int] = None,
+                  batch_interval: Optional[float] = None) -> Subscription:
+        """Add a subscriber to event
+
+        threaded=True delivers from a bounded queue on a separate thread, so
+        a slow callback no longer holds up reading the stream; overflow is
+        "block", "drop_oldest" or "drop_newest". For on_token, batch_size
+        and batch_interval (seconds) join tokens into fewer calls.
+        """
+        return self.events.subscribe(event, callback, threaded=threaded, queue_size=queue_size,
+                                     overflow=overflow, batch_size=batch_size,
+                                     batch_interval=batch_interval)
+
+    def unsubscribe(self, subscription: Subscription):
+        self.events.unsubscribe(subscription)
+
+    def clear_conversation(self):
+        self.conversation = self._new_conversation()
+        self.session_id = None
+
+    def _new_conversation(self, conversation_id: Optional[str] = None) -> Conversation:
+        conversation = Conversation(self.context_budget, self.compactor,
+                                    self.conversation_store, conversation_id)
+        conversation.pin_system_prompt(self.system_prompt)
+        if self.model_manager.model_config:
+            conversation.set_model(self.model_manager.model_config.model_name)
+        return conversation
+
+    @staticmethod
+    def _read_frames(lines: Iterable[str], usage: Dict[str, Any]) -> Iterator[str]:
+        """Text of the token frames in lines; the final usage frame is copied into usage"""
+        for line in lines:
+            frame = parse_frame(line)
+            if "token" in frame:
+                yield frame["token"]
+            elif "error" in frame:
+                if frame.get("code") == DEADLINE_EXCEEDED:
+                    raise DeadlineExceededError(frame["error"])
+                raise StreamingError(frame["error"])
+            elif frame.get("done"):
+                usage.update(frame.get("usage") or {})
+
+    @staticmethod
+    def _token_count(usage: Dict[str, Any], full_response: Optional[str]) -> int:
+        # Ollama's count when the server passed it on, a word count otherwise
+        return usage.get("eval_count") or len(full_response.split())
+
+    def _observe(self, model: str, usage: Dict[str, Any], timer: RequestTimer):
+        """Let auto mode learn from a reply the server generated"""
+        ttft = timer.first_token_at - timer.start if timer.first_token_at is not None else None
+        self.model_manager.observe(model, usage, ttft)
+
+    def _current_model_name(self) -> str:
+        if not self.model_manager.model_config:
+            raise InvalidConfigError(
+                "No model loaded. Call load_model() first")
+        return self.model_manager.model_config.model_name
+
+    def _cache_key(self, payload: Dict[str, Any]) -> Optional[str]:
+        # server-side sessions carry history we cannot see, so they are never cached
+        if self.cache is None or "session_id" in payload or "start_session" in payload:
+            return None
+        return cache_key(payload["model"], payload["model_parameters"],
+                         payload.get("system_prompt"), payload.get("role"),
+                         payload["conversation_history"], payload["message"])
+
+    def _build_payload(self, message: str, role: Optional[str] = None,
+                       with_history: bool = True) -> Dict[str, Any]:
+        if not message.strip():
+            raise InvalidConfigError("Message cannot be empty")
+
+        with_history = self.track_conversation and with_history
+        payload = {
+            "message": message,
+            "conversation_history": self.conversation.get_history() if with_history else []
+        }
+
+        if with_history and self.server_session:
+            if self.session_id:
+                payload["session_id"] = self.session_id
+                payload["conversation_history"] = []
+            else:
+                payload["start_session"] = True
+
+        if self.system_prompt:
+            payload["system_prompt"] = self.system_prompt
+
+        if role:
+            payload["role"] = role
+
+        if not self.model_manager.model_config:
+            raise InvalidConfigError(
+                "No model loaded. Call load_model() first")
+
+        if self.model_manager.auto:
+            prompt_tokens = estimate_tokens(message) + self.conversation.pinned_tokens
+            if with_history:
+                prompt_tokens += self.conversation.total_tokens
+            payload["model"] = self.model_manager.select(prompt_tokens)
+        else:
+            payload["model"] = self.model_manager.model_config.model_name
+        payload["model_parameters"] = self.model_manager.model_config.parameters
+        return payload
+
+
+def _remaining(deadline: float) -> float:
+    remaining = deadline - time.perf_counter()
+    if remaining <= 0:
+        raise DeadlineExceededError("Deadline exceeded")
+    return remaining
+
+
+def _discard(future, pool: BackendPool, backend: Backend):
+    """Close a hedged response that lost the race, whenever it arrives"""
+    if future.exception() is None:
+        future.result().close()
+        pool.release(backend)
+
+
+def _until(chunks: Iterator[str], deadline: float) -> Iterator[str]:
+    """Pass chunks on until the deadline, the server's own check may lag behind"""
+    for chunk in chunks:
+        _remaining(deadline)
+        yield chunk
+
+
+class ChatStream:
+    """Tokens of one reply, fetched lazily; returned by HiClient.stream()
+
+    The text is only joined when text() is called. Use it as a context
+    manager (or call close()) to release the connection when not reading
+    to the end.
+    """
+
+    def __init__(self, client: "HiClient", message: str, role: Optional[str], track: bool,
+                 timeout: Optional[float] = None):
+        self.parts: List[str] = []
+        # filled from the server's final frame once the reply is complete
+        self.usage: Dict[str, Any] = {}
+        self._tokens = client._iter_chat(message, role, track, self.parts, self.usage, timeout)
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        return next(self._tokens)
+
+    def text(self) -> str:
+        """Read the rest of the reply and return all of it"""
+        for _ in self._tokens:
+            pass
+        return "".join(self.parts)
+
+    def close(self):
+        self._tokens.close()
+
+    def __enter__(self) -> "ChatStream":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# client class, holds the conversation, system prompt, and callbacks
+# ! TODO: Add set role
+class HiClient(_ClientBase):
+    def __init__(self, base_url="http://localhost:8000", track_conversation=False,
+                 pool_config: Optional[PoolConfig] = None, server_session=False,
+                 context_budget: Optional[ContextBudget] = None,
+                 compactor: Optional[BackgroundCompactor] = None,
+                 cache: Optional[ResponseCache] = None, tracer: Optional[Tracer] = None,
+                 backends: Optional[BackendPool] = None,
+                 conversation_store: Optional[ConversationStore] = None,
+                 conversation_id: Optional[str] = None):
+        # with several servers, chats are routed over the pool and everything
+        # else (models, warm-up) goes to the first one
+        if backends is not None:
+            base_url = backends.urls[0]
+        super().__init__(base_url, track_conversation, server_session,
+                         context_budget, compactor, cache, tracer,
+                         conversation_store, conversation_id)
+        self._continuous_chat = False
+        self._listener: Optional[ChatListener] = None
+        # keep-alive connection pool reused by every chat() call
+        self.pool_config = pool_config or PoolConfig()
+        self._connects = threading.local()
+        self.session = build_session(self.pool_config, on_connect=self._on_connect)
+        self.backends = backends
+        # the backend holding this client's conversation
+        self._affinity: Optional[Backend] = None
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        if backends is not None:
+            backends.start_health_checks(self._probe)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.events.close()
+        if self.backends is not None:
+            self.backends.stop_health_checks()
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+        self.session.close()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Requests sent vs. connections opened, to verify connection reuse"""
+        return session_pool_stats(self.session)
+
+    def load_model(self, model_name: str, warm: bool = False, keep_alive=None, **kwargs):
+        """Use model_name for the next chats; with warm, also load it into Ollama's memory now
+
+        keep_alive is passed on to warm_model(). In auto mode the smallest
+        model is warmed, it answers the first chat.
+        """
+        try:
+            super().load_model(model_name, **kwargs)
+        except ModelNotFoundError as e:
+            # the model may have been pulled after we last asked the server
+            try:
+                self.refresh_models()
+            except ConnectionError:
+                raise e
+            super().load_model(model_name, **kwargs)
+        if warm:
+            self.warm_model(keep_alive=keep_alive)
+
+    def refresh_models(self) -> Dict[str, Any]:
+        """Ask the server which models are pulled and which are loaded"""
+        try:
+            response = self.session.get(f"{self.base_url}/models", params={"refresh": "true"})
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            raise ConnectionError(f"Failed to fetch models: {str(e)}")
+        models = response.json()
+        self.model_manager.update_available(models["available"])
+        return models
+
+    def warm_model(self, model_name: Optional[str] = None, keep_alive=None) -> float:
+        """Load a model into Ollama's memory ahead of the first chat, returns the load time"""
+        model_name = model_name or self._current_model_name()
+        body = {"keep_alive": keep_alive} if keep_alive is not None else None
+        try:
+            response = self.session.post(f"{self.base_url}/models/{model_name}/load", json=body)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            raise ConnectionError(f"Failed to load {model_name}: {str(e)}")
+        return response.json()["load_time"]
+
+    def evict_model(self, model_name: Optional[str] = None):
+        """Free the memory a model holds in Ollama"""
+        model_name = model_name or self._current_model_name()
+        try:
+            response = self.session.post(f"{self.base_url}/models/{model_name}/evict")
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            raise ConnectionError(f"Failed to evict {model_name}: {str(e)}")
 
     # continous chat - always listening devices
-    def start_continuous_chat(self, interval: float = 1.0):
-        self._continuous_chat = True
-        threading.Thread(target=self._continuous_chat_loop,
-                         args=(interval,), daemon=True).start()
+    def start_continuous_chat(self, interval: float = 1.0, barge_in: bool = True,
+                              role: Optional[str] = None,
+                              blocking_listener: bool = False) -> ChatListener:
+        """Answer input as it arrives, from push_input() or the on_listening callback
+
+        on_listening is polled every interval seconds. With
+        blocking_listener, for a callback that blocks until it hears
+        something, it is called again right after it returned input. Input
+        keeps being accepted while a reply streams; see ChatListener for
+        coalescing and barge-in.
+        """
+        if self._listener is None:
+            self._listener = ChatListener(self, role=role, barge_in=barge_in).start()
+        if not self._continuous_chat:
+            self._continuous_chat = True
+            threading.Thread(target=self._continuous_chat_loop,
+                             args=(interval, blocking_listener), daemon=True).start()
+        return self._listener
 
     def stop_continuous_chat(self):
         """Stop continuous chat mode"""
         self._continuous_chat = False
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
 
-    def _continuous_chat_loop(self, interval: float):
+    def push_input(self, text: str):
+        """Hand input to the continuous chat without waiting for anything"""
+        if self._listener is None:
+            raise InvalidConfigError("Call start_continuous_chat() first")
+        self._listener.push(text)
+
+    def _continuous_chat_loop(self, interval: float, blocking_listener: bool = False):
         while self._continuous_chat:
-            if 'on_listening' in self._callbacks:
-                response = self._callbacks['on_listening']()
-                if response:
-                    self.chat(response)
+            listener = self._listener
+            if self.events.has('on_listening') and listener is not None:
+                text = next((r for r in self.events.emit('on_listening') if r), None)
+                if text:
+                    listener.push(text)
+                    if blocking_listener:
+                        continue
             time.sleep(interval)
 
     # chat function, sends a message to the server and returns the response
-    def chat(self, message: str, role: Optional[str] = None) -> str:
-        try:
-            if not message.strip():
-                raise InvalidConfigError("Message cannot be empty")
+    # timeout is the whole turn's budget in seconds; the server is told how much
+    # is left and stops generating once it is used up
+    def chat(self, message: str, role: Optional[str] = None,
+             timeout: Optional[float] = None) -> str:
+        return self._chat(message, role, self.track_conversation, timeout)
 
-            payload = {
-                "message": message,
-                "conversation_history": self.conversation.get_history() if self.track_conversation else []
-            }
+    def stream(self, message: str, role: Optional[str] = None,
+               timeout: Optional[float] = None) -> "ChatStream":
+        """Iterate over the reply's tokens as they arrive
 
-            if self.system_prompt:
-                payload["system_prompt"] = self.system_prompt
+        Nothing is sent until iteration starts. Stopping early (break, or
+        close()) drops the connection so the server stops generating. The
+        timeout starts counting with the first token requested.
+        """
+        return ChatStream(self, message, role, self.track_conversation, timeout)
 
-            if role:
-                payload["role"] = role
+    def chat_many(self, messages: Iterable[str], concurrency: int = 4,
+                  role: Optional[str] = None, as_completed: bool = False) -> Iterator[BatchResult]:
+        """Send independent prompts over a bounded thread pool
 
-            if not self.model_manager.model_config:
-                raise InvalidConfigError(
-                    "No model loaded. Call load_model() first")
-
-            payload["model"] = self.model_manager.model_config.model_name
-            payload["model_parameters"] = self.model_manager.model_config.parameters
+        Yields one BatchResult per prompt, in input order or, with
+        as_completed=True, as soon as each finishes. A failing prompt is
+        reported in its result and does not stop the rest of the batch.
+        Prompts never read or extend the tracked conversation.
+        """
+        if concurrency < 1:
+            raise InvalidConfigError("concurrency must be at least 1")
+        messages = list(messages)
+        executor = ThreadPoolExecutor(max_workers=min(concurrency, len(messages) or 1))
 
+        def run(index: int, message: str) -> BatchResult:
             try:
-                if 'on_request' in self._callbacks:
-                    self._callbacks['on_request'](message)
+                return BatchResult(index, message, response=self._chat(message, role, False))
             except Exception as e:
-                raise CallbackError(f"Error in on_request callback: {str(e)}")
+                return BatchResult(index, message, error=str(e))
+
+        futures = [executor.submit(run, i, m) for i, m in enumerate(messages)]
 
+        def results():
             try:
-                response = requests.post(
-                    f"{self.base_url}/chat",
-                    json=payload,
-                    stream=True
-                )
+                for future in (futures_as_completed(futures) if as_completed else futures):
+                    yield future.result()
+            finally:
+                # consumer stopped early: drop prompts that have not started yet
+                for future in futures:
+                    future.cancel()
+                executor.shutdown(wait=False)
+
+        return results()
+
+    def chat_batch(self, messages: Iterable[str], role: Optional[str] = None,
+                   concurrency: Optional[int] = None) -> List[BatchResult]:
+        """Send prompts in one /chat/batch request and let the server schedule them
+
+        Returns one BatchResult per prompt, in input order; a prompt that
+        is invalid (e.g. empty) gets an error result and is not sent.
+        """
+        messages = list(messages)
+        results: Dict[int, BatchResult] = {}
+        items: List[Dict[str, Any]] = []
+        # index into messages of each item sent
+        sent: List[int] = []
+        for index, message in enumerate(messages):
+            try:
+                items.append(self._build_payload(message, role, with_history=False))
+            except InvalidConfigError as e:
+                results[index] = BatchResult(index, message, error=str(e))
+                continue
+            sent.append(index)
+        if not items:
+            return [results[i] for i in range(len(messages))]
+        body: Dict[str, Any] = {"items": items}
+        if concurrency:
+            body["concurrency"] = concurrency
+        try:
+            response = self.session.post(f"{self.base_url}/chat/batch", json=body,
+                                         timeout=self.pool_config.timeout)
+            response.raise_for_status()
+        except requests.exceptions.ConnectionError:
+            raise ConnectionError(
+                f"Failed to connect to server at {self.base_url}")
+        except requests.exceptions.HTTPError as e:
+            raise ConnectionError(f"HTTP error occurred: {str(e)}")
+        except requests.exceptions.Timeout as e:
+            raise ConnectionError(f"Request timed out: {str(e)}")
+        for r in response.json()["results"]:
+            index = sent[r["index"]]
+            results[index] = BatchResult(index, messages[index], response=r.get("response"),
+                                         error=r.get("error"))
+        return [results[i] for i in range(len(messages))]
+
+    def submit_job(self, message: str, role: Optional[str] = None, priority: int = 0) -> str:
+        """Queue a prompt on the server and return its job id right away
+
+        The reply is generated in the background and kept by the server, so
+        it survives dropped connections and server restarts; collect it
+        with wait_job() or stream_job(). Jobs never read or extend the
+        tracked conversation.
+        """
+        body = self._build_payload(message, role, with_history=False)
+        body["priority"] = priority
+        return self._job_request("POST", "/jobs", json=body).json()["job_id"]
+
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        """Status, output so far and usage of a job"""
+        return self._job_request("GET", f"/jobs/{job_id}").json()
+
+    def cancel_job(self, job_id: str):
+        self._job_request("DELETE", f"/jobs/{job_id}")
+
+    def stream_job(self, job_id: str, offset: int = 0, attempt: Optional[int] = None,
+                   timeout: Optional[float] = None, retries: int = 5) -> Iterator[str]:
+        """Yield a job's output from offset (in characters) on until it is done
+
+        A dropped connection is picked up again where the text stopped;
+        retries bounds the reconnect attempts in a row that fail. timeout
+        bounds the whole wait in seconds. A job interrupted by a server
+        restart is generated again from the start: once text of the
+        earlier attempt was yielded this raises JobRestartedError, and the
+        reply has to be read again from offset 0.
+        """
+        deadline = time.perf_counter() + timeout if timeout is not None else None
+        url = f"{self.base_url}/jobs/{job_id}/stream"
+        failures = 0
+        while True:
+            timeout = self.pool_config.timeout
+            if deadline is not None:
+                remaining = _remaining(deadline)
+                connect, read = timeout
+                timeout = (connect, remaining if read is None else min(read, remaining))
+            try:
+                params = {"offset": offset}
+                if attempt is not None:
+                    params["attempt"] = attempt
+                response = self.session.get(url, params=params, stream=True, timeout=timeout)
+                if response.status_code == 404:
+                    response.close()
+                    raise JobNotFoundError(f"Unknown job {job_id}")
                 response.raise_for_status()
-            except requests.exceptions.ConnectionError:
-                raise ConnectionError(
-                    f"Failed to connect to server at {self.base_url}")
-            except requests.exceptions.HTTPError as e:
-                raise ConnectionError(f"HTTP error occurred: {str(e)}")
+                failures = 0
+                with response:
+                    for line in response.iter_lines(decode_unicode=True):
+                        if not line:
+                            continue
+                        frame = parse_frame(line)
+                        if deadline is not None:
+                            _remaining(deadline)
+                        if "token" in frame:
+                            offset += len(frame["token"])
+                            attempt = frame.get("attempt", attempt)
+                            yield frame["token"]
+                        elif frame.get("code") == JOB_RESTARTED:
+                            raise JobRestartedError(frame["error"])
+                        elif "error" in frame:
+                            raise StreamingError(frame["error"])
+                        elif frame.get("done"):
+                            self.last_usage = frame.get("usage") or {}
+                            return
+                # closed without a final frame, e.g. the server restarted
+            except requests.exceptions.RequestException as e:
+                failures += 1
+                if failures > retries:
+                    raise ConnectionError(f"Lost job {job_id}: {str(e)}")
+            if deadline is not None:
+                _remaining(deadline)
+            time.sleep(min(0.1 * 2 ** failures, 5.0))
 
-            full_response = ""
+    def wait_job(self, job_id: str, timeout: Optional[float] = None) -> str:
+        """Block until the job is done and return its reply"""
+        deadline = time.perf_counter() + timeout if timeout is not None else None
+        while True:
             try:
-                for chunk in response.iter_lines():
-                    if chunk:
-                        chunk_content = chunk.decode()
-                        full_response += chunk_content
-
-                        if 'on_token' in self._callbacks:
-                            try:
-                                self._callbacks['on_token'](chunk_content)
-                            except Exception as e:
-                                raise CallbackError(
-                                    f"Error in on_token callback: {str(e)}")
+                return "".join(self.stream_job(
+                    job_id, timeout=_remaining(deadline) if deadline is not None else None))
+            except JobRestartedError:
+                self.logger.info(f"Job {job_id} restarted, reading it again")
+
+    def _job_request(self, method: str, path: str, **kwargs) -> requests.Response:
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}",
+                                            timeout=self.pool_config.timeout, **kwargs)
+            if response.status_code == 404:
+                raise JobNotFoundError(response.json().get("detail", "Unknown job"))
+            response.raise_for_status()
+        except requests.exceptions.ConnectionError:
+            raise ConnectionError(
+                f"Failed to connect to server at {self.base_url}")
+        except requests.exceptions.HTTPError as e:
+            raise ConnectionError(f"HTTP error occurred: {str(e)}")
+        except requests.exceptions.Timeout as e:
+            raise ConnectionError(f"Request timed out: {str(e)}")
+        return response
+
+    def _post_chat(self, payload: Dict[str, Any], root: Span, deadline: Optional[float] = None,
+                   affinity: bool = False) -> Tuple[requests.Response, Optional[Backend]]:
+        """Send the chat request; returns the response and the backend that answered, if pooled"""
+        with self.tracer.span("serialize", root):
+            body = json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json",
+                   TRACE_HEADER: root.trace_id, PARENT_SPAN_HEADER: root.span_id}
+        timeout = self.pool_config.timeout
+        if deadline is not None:
+            remaining = _remaining(deadline)
+            headers[DEADLINE_HEADER] = str(int(remaining * 1000))
+            # a read that blocks past the deadline fails instead of hanging
+            connect, read = timeout
+            timeout = (connect, remaining if read is None else min(read, remaining))
+        if self.backends is None:
+            return self._send(self.base_url, body, headers, timeout, root, deadline), None
+        # a server-side session only exists on one backend, so it is never hedged
+        hedge = "session_id" not in payload and "start_session" not in payload
+        return self._route(body, headers, timeout, root, deadline, affinity, hedge)
+
+    def _route(self, body: bytes, headers: Dict[str, str], timeout, root: Span,
+               deadline: Optional[float], affinity: bool,
+               hedge: bool) -> Tuple[requests.Response, Backend]:
+        """Send to the least busy backend, moving on to the next one when a backend is down"""
+        pool = self.backends
+        tried: List[Backend] = []
+        while True:
+            backend = pool.pick(exclude=tried, prefer=self._affinity if affinity else None)
+            tried.append(backend)
+            delay = pool.hedge_delay() if hedge else None
+            try:
+                if delay is not None:
+                    response, backend = self._send_hedged(backend, delay, tried, body, headers,
+                                                          timeout, root, deadline)
+                else:
+                    response = self._send_to(backend, body, headers, timeout, root, deadline)
+            except ConnectionError:
+                if len(tried) >= len(pool.backends):
+                    raise
+                continue
+            # Ollama unreachable or queue full on that node, another one may have room
+            if response.status_code in (429, 503) and len(tried) < len(pool.backends):
+                response.close()
+                pool.release(backend)
+                continue
+            if affinity:
+                self._affinity = backend
+            root.set(backend=backend.url)
+            return response, backend
+
+    def _send_to(self, backend: Backend, body: bytes, headers: Dict[str, str], timeout,
+                 root: Span, deadline: Optional[float]) -> requests.Response:
+        """_send() to one pooled backend; the caller releases it once the reply was read"""
+        pool = self.backends
+        pool.acquire(backend)
+        started = time.perf_counter()
+        try:
+            response = self._send(backend.url, body, headers, timeout, root, deadline)
+        except SDKException:
+            pool.release(backend)
+            pool.failed(backend)
+            raise
+        if response.status_code >= 500 and response.status_code != 504:
+            pool.failed(backend)
+        else:
+            # response headers only come once the generation started on that node
+            pool.succeeded(backend, time.perf_counter() - started)
+        return response
+
+    def _send_hedged(self, backend: Backend, delay: float, tried: List[Backend], body: bytes,
+                     headers: Dict[str, str], timeout, root: Span,
+                     deadline: Optional[float]) -> Tuple[requests.Response, Backend]:
+        """Send to backend and, if it has not answered within delay, to a second one too
+
+        The second backend is one not in tried, and is added to it.
+        """
+        pool = self.backends
+        if self._hedge_executor is None:
+            self._hedge_executor = ThreadPoolExecutor(max_workers=4)
+        executor = self._hedge_executor
+        send = (self._send_to, body, headers, timeout, root, deadline)
+        primary = executor.submit(send[0], backend, *send[1:])
+        done, _ = futures_wait([primary], timeout=delay)
+        if done:
+            return primary.result(), backend
+        second = pool.pick(exclude=tried)
+        if second in tried:
+            return primary.result(), backend
+        tried.append(second)
+        root.set(hedged=True)
+        racing = {primary: backend, executor.submit(send[0], second, *send[1:]): second}
+        winner = None
+        error: Optional[BaseException] = None
+        pending = set(racing)
+        while pending and winner is None:
+            done, pending = futures_wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                elif winner is None and future.result().status_code < 500:
+                    winner = future
+                else:
+                    # a second answer that lost the race
+                    future.result().close()
+                    pool.release(racing[future])
+        for future in pending:
+            # dropping the loser's connection stops its generation on the server
+            future.add_done_callback(lambda f, b=racing[future]: _discard(f, pool, b))
+        pool.record_hedge(won=winner is not None and winner is not primary)
+        if winner is None:
+            raise error or ConnectionError("No backend answered")
+        return winner.result(), racing[winner]
+
+    def _probe(self, url: str) -> bool:
+        return self.session.get(f"{url}/health", timeout=self.pool_config.connect_timeout).ok
+
+    def _send(self, url: str, body: bytes, headers: Dict[str, str], timeout, root: Span,
+              deadline: Optional[float] = None) -> requests.Response:
+        self._connects.seconds = None
+        started = time.perf_counter()
+        try:
+            response = self.session.post(
+                f"{url}/chat",
+                data=body,
+                headers=headers,
+                stream=True,
+                timeout=timeout
+            )
+        except requests.exceptions.ConnectionError:
+            raise ConnectionError(
+                f"Failed to connect to server at {url}")
+        except requests.exceptions.Timeout as e:
+            if deadline is not None and time.perf_counter() >= deadline:
+                raise DeadlineExceededError("Deadline exceeded waiting for the server")
+            raise ConnectionError(f"Request timed out: {str(e)}")
+        # time until the response headers arrived, including a new connection if one was needed
+        connect = self._connects.seconds
+        if connect is not None:
+            self.tracer.record("connect", root, started, started + connect)
+        self.tracer.record("request", root, started, time.perf_counter(),
+                           status=response.status_code, new_connection=connect is not None)
+        return response
+
+    def _on_connect(self, seconds: float):
+        self._connects.seconds = seconds
+
+    def _fire_token(self, chunk_content: Optional[str] = None):
+        """Emit one token, or with None deliver the tokens batching subscribers hold back"""
+        try:
+            if chunk_content is None:
+                self.events.flush('on_token')
+            else:
+                self.events.emit('on_token', chunk_content)
+        except Exception as e:
+            raise CallbackError(
+                f"Error in on_token callback: {str(e)}")
+
+    def _deliver(self, chunks: Iterable[str], timer: Optional[RequestTimer],
+                 stream_span: Span) -> Iterator[str]:
+        """Hand chunks to on_token and pass them on, timing the callbacks on the stream span"""
+        count = 0
+        callback_time = callback_max = 0.0
+        timed = self.events.has('on_token')
+        try:
+            for chunk_content in chunks:
+                if timer is not None:
+                    timer.token()
+                if not count:
+                    self.tracer.record("first_byte", stream_span, stream_span.start,
+                                       time.perf_counter())
+                count += 1
+                if timed:
+                    started = time.perf_counter()
+                    self._fire_token(chunk_content)
+                    elapsed = time.perf_counter() - started
+                    callback_time += elapsed
+                    callback_max = max(callback_max, elapsed)
+                yield chunk_content
+            if timed:
+                self._fire_token()
+        finally:
+            stream_span.set(chunks=count, callback_time=callback_time,
+                            callback_max=callback_max)
+
+    def _stream_chunks(self, payload: Dict[str, Any], message: str,
+                       role: Optional[str], track: bool,
+                       timer: Optional[RequestTimer] = None,
+                       root: Optional[Span] = None,
+                       usage: Optional[Dict[str, Any]] = None,
+                       deadline: Optional[float] = None) -> Iterator[str]:
+        """Yield the text chunks of one reply; the final usage frame is copied into usage"""
+        root = root or self.tracer.span("chat")
+        usage = {} if usage is None else usage
+        response, backend = self._post_chat(payload, root, deadline, track)
+        if response.status_code == 404 and "session_id" in payload:
+            # the server forgot our session, start over with the full history
+            response.close()
+            self._release(backend)
+            self.session_id = None
+            payload = self._build_payload(message, role, with_history=track)
+            response, backend = self._post_chat(payload, root, deadline, track)
+        if response.status_code == 504 and deadline is not None:
+            response.close()
+            self._release(backend)
+            raise DeadlineExceededError("Deadline exceeded while queued on the server")
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            response.close()
+            self._release(backend)
+            raise ConnectionError(f"HTTP error occurred: {str(e)}")
+        if track and self.server_session:
+            self.session_id = response.headers.get("X-Session-Id", self.session_id)
+
+        try:
+            with self.tracer.span("stream", root) as stream_span:
+                lines = (line.decode() for line in response.iter_lines() if line)
+                chunks = self._read_frames(lines, usage)
+                if deadline is not None:
+                    chunks = _until(chunks, deadline)
+                yield from self._deliver(chunks, timer, stream_span)
+        except DeadlineExceededError:
+            raise
+        except Exception as e:
+            if deadline is not None and time.perf_counter() >= deadline:
+                # the read timeout fired because the deadline passed
+                raise DeadlineExceededError(f"Deadline exceeded while streaming: {str(e)}")
+            raise StreamingError(
+                f"Error while streaming response: {str(e)}")
+        finally:
+            # back to the pool when the reply was read to the end, closed
+            # right away when the caller stopped early
+            response.close()
+            self._release(backend)
+
+    def _release(self, backend: Optional[Backend]):
+        if backend is not None:
+            self.backends.release(backend)
+
+    def _iter_chat(self, message: str, role: Optional[str], track: bool,
+                   parts: List[str], usage: Dict[str, Any],
+                   timeout: Optional[float] = None) -> Iterator[str]:
+        timer = None
+        deadline = time.perf_counter() + timeout if timeout is not None else None
+        root = self.tracer.span("chat")
+        try:
+            with self.tracer.span("validate", root):
+                payload = self._build_payload(message, role, with_history=track)
+            root.set(model=payload["model"])
+            timer = self.metrics.start_request(payload["model"])
+
+            try:
+                self.events.emit('on_request', message)
             except Exception as e:
-                raise StreamingError(
-                    f"Error while streaming response: {str(e)}")
+                raise CallbackError(f"Error in on_request callback: {str(e)}")
 
-            if self.track_conversation:
-                self.conversation.add_message("user", message)
-                self.conversation.add_message("assistant", full_response)
+            key = self._cache_key(payload)
+            cached = self.cache.get(key) if key else None
+            if cached is not None:
+                # replay the cached answer through the same streaming path
+                root.set(cache="hit")
+                stream_span = self.tracer.span("stream", root)
+                source = self._deliver(list(cached), timer, stream_span)
+            else:
+                stream_span = None
+                source = self._stream_chunks(payload, message, role, track, timer, root, usage,
+                                             deadline)
+            try:
+                for chunk_content in source:
+                    parts.append(chunk_content)
+                    yield chunk_content
+            finally:
+                # closes the response now, not whenever the generator is collected
+                source.close()
+                if stream_span is not None:
+                    stream_span.finish()
+            if key and cached is None:
+                self.cache.put(key, parts)
+            self.last_usage = usage
+            self.last_model = payload["model"]
 
-            if 'on_response' in self._callbacks:
-                try:
-                    self._callbacks['on_response'](full_response)
-                except Exception as e:
-                    raise CallbackError(
-                        f"Error in on_response callback: {str(e)}")
-
-            latency = self.metrics.end_request()
-            token_count = len(full_response.split())
-            self.metrics.record_tokens(token_count)
-            self.logger.info(
-                f"Request completed in {latency:.2f}s with {token_count} tokens")
+            with self.tracer.span("finalize", root):
+                full_response = None
+                if track or self.events.has('on_response') or not usage.get("eval_count"):
+                    full_response = "".join(parts)
+
+                if track:
+                    self.conversation.add_message("user", message)
+                    self.conversation.add_message("assistant", full_response)
 
-            return full_response
+                if self.events.has('on_response'):
+                    try:
+                        self.events.emit('on_response', full_response)
+                    except Exception as e:
+                        raise CallbackError(
+                            f"Error in on_response callback: {str(e)}")
+
+                token_count = self._token_count(usage, full_response)
+                latency = self.metrics.end_request(timer, token_count, eval_seconds(usage))
+                if cached is None:
+                    self._observe(payload["model"], usage, timer)
+            self.logger.info(
+                f"Request completed in {latency:.2f}s with {token_count} tokens"
+                f" by {payload['model']}")
 
         except SDKException as e:
-            if 'on_error' in self._callbacks:
+            root.set(error=type(e).__name__)
+            if timer is not None:
+                timer.fail()
+            if self.events.has('on_error'):
                 try:
-                    self._callbacks['on_error'](str(e))
+                    self.events.emit('on_error', str(e))
                 except Exception as callback_error:
                     print(f"Error in error callback: {str(callback_error)}")
             raise
+        except GeneratorExit:
+            # the caller stopped iterating, nothing is recorded for this turn
+            root.set(cancelled=True)
+            raise
+        finally:
+            root.finish()
 
-    def clear_conversation(self):
-        self.conversation = Conversation()
+    def _chat(self, message: str, role: Optional[str], track: bool,
+              timeout: Optional[float] = None) -> str:
+        return ChatStream(self, message, role, track, timeout).text()
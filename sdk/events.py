@@ -0,0 +1,192 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .utils import SDKLogger
+
+"""
+client events ('on_token', 'on_response', ...) with any number of
+subscribers each, delivered inline or from a bounded queue on a thread of
+their own, optionally with tokens batched into fewer calls
+"""
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+_logger = SDKLogger("hi_events")
+
+
+class Subscription:
+    """One callback subscribed to one event
+
+    Inline subscriptions run inside emit(), so they slow down whoever emits
+    (for on_token: the read loop) and their errors reach the caller. With
+    threaded=True calls go through a queue of queue_size to a thread of
+    their own; once it is full, overflow decides: "block" the emitter,
+    "drop_oldest" queued call, or "drop_newest" (the call being emitted).
+    Errors there are logged.
+
+    batch_size and batch_interval (seconds) join string arguments, such as
+    tokens, into one call every batch_size items or once the oldest one is
+    batch_interval old; whatever is left goes out on flush(). An inline
+    subscription checks the age on each emit(), a threaded one also
+    delivers a batch that has waited batch_interval when no more come.
+    """
+
+    def __init__(self, event: str, callback: Callable, threaded: bool = False,
+                 queue_size: int = 256, overflow: str = "block",
+                 batch_size: Optional[int] = None, batch_interval: Optional[float] = None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+        self.event = event
+        self.callback = callback
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.dropped = 0
+        self._batching = batch_size is not None or batch_interval is not None
+        self._buffer: List[str] = []
+        self._first_at = 0.0
+        self._lock = threading.Lock()
+        self._queue: Optional["queue.Queue[Optional[Tuple[Any, ...]]]"] = None
+        self._thread: Optional[threading.Thread] = None
+        if threaded:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(target=self._run, daemon=True,
+                                            name=f"hi-events-{event}")
+            self._thread.start()
+
+    def emit(self, args: Tuple[Any, ...]) -> Any:
+        if not self._batching:
+            return self._dispatch(args)
+        with self._lock:
+            if not self._buffer:
+                self._first_at = time.perf_counter()
+            self._buffer.append(args[0])
+            if ((self.batch_size is not None and len(self._buffer) >= self.batch_size) or
+                    (self.batch_interval is not None and
+                     time.perf_counter() - self._first_at >= self.batch_interval)):
+                batch = self._take()
+            else:
+                return None
+        return self._dispatch((batch,))
+
+    def flush(self) -> Any:
+        with self._lock:
+            batch = self._take() if self._buffer else None
+        if batch is not None:
+            return self._dispatch((batch,))
+        return None
+
+    def close(self, wait: bool = True):
+        """Deliver what is buffered, then stop the delivery thread"""
+        self.flush()
+        if self._queue is not None and self._thread.is_alive():
+            self._queue.put(None)
+            if wait and self._thread is not threading.current_thread():
+                self._thread.join()
+
+    def _take(self) -> str:
+        batch = "".join(self._buffer)
+        self._buffer = []
+        return batch
+
+    def _dispatch(self, args: Tuple[Any, ...]) -> Any:
+        if self._queue is None:
+            return self.callback(*args)
+        if self.overflow == "block":
+            self._queue.put(args)
+            return None
+        try:
+            self._queue.put_nowait(args)
+        except queue.Full:
+            self.dropped += 1
+            if self.overflow == "drop_oldest":
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    self._queue.put_nowait(args)
+                except queue.Full:
+                    pass
+        return None
+
+    def _run(self):
+        while True:
+            try:
+                args = self._queue.get(timeout=self._until_due())
+            except queue.Empty:
+                # batch_interval is over and no emit() came to send the batch
+                with self._lock:
+                    if not self._buffer or time.perf_counter() - self._first_at < self.batch_interval:
+                        continue
+                    args = (self._take(),)
+            if args is None:
+                return
+            try:
+                self.callback(*args)
+            except Exception as e:
+                _logger.error(f"Error in {self.event} callback: {str(e)}")
+
+
+    def _until_due(self) -> Optional[float]:
+        """Seconds until the buffered batch is due; without one, a batch_interval"""
+        if self.batch_interval is None:
+            return None
+        with self._lock:
+            if not self._buffer:
+                return self.batch_interval
+            return max(0.0, self._first_at + self.batch_interval - time.perf_counter())
+
+
+class EventBus:
+    """Subscribers per event; emit() is lock-free and cheap when nobody listens"""
+
+    def __init__(self):
+        self._subscriptions: Dict[str, List[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, event: str, callback: Callable, **options) -> Subscription:
+        """Add a subscriber, options as for Subscription"""
+        subscription = Subscription(event, callback, **options)
+        with self._lock:
+            # replaced, never mutated, so emit() can iterate without the lock
+            self._subscriptions[event] = self._subscriptions.get(event, []) + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            remaining = [s for s in self._subscriptions.get(subscription.event, [])
+                         if s is not subscription]
+            if remaining:
+                self._subscriptions[subscription.event] = remaining
+            else:
+                self._subscriptions.pop(subscription.event, None)
+        subscription.close(wait=False)
+
+    def has(self, event: str) -> bool:
+        return event in self._subscriptions
+
+    def subscribers(self, event: str) -> List[Subscription]:
+        return list(self._subscriptions.get(event, ()))
+
+    def emit(self, event: str, *args) -> List[Any]:
+        """Call every subscriber; returns what the inline ones returned"""
+        subscriptions = self._subscriptions.get(event)
+        if not subscriptions:
+            return []
+        return [subscription.emit(args) for subscription in subscriptions]
+
+    def flush(self, event: Optional[str] = None) -> List[Any]:
+        """Deliver batched calls now, for one event or all of them"""
+        events = [event] if event is not None else list(self._subscriptions)
+        return [subscription.flush() for name in events
+                for subscription in self._subscriptions.get(name, ())]
+
+    def close(self):
+        with self._lock:
+            subscriptions = [s for subs in self._subscriptions.values() for s in subs]
+            self._subscriptions = {}
+        for subscription in subscriptions:
+            subscription.close()
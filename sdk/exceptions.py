@@ -20,3 +20,19 @@ class StreamingError(SDKException):
 
 class CallbackError(SDKException):
     pass
+
+
+class QueueFullError(SDKException):
+    pass
+
+
+class DeadlineExceededError(SDKException):
+    pass
+
+
+class JobNotFoundError(SDKException):
+    pass
+
+
+class JobRestartedError(StreamingError):
+    pass
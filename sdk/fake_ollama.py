@@ -0,0 +1,143 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from .models import DEFAULT_MODELS
+
+"""
+stand-in for Ollama's HTTP API, streams canned tokens at a fixed rate so the
+server and SDK can be exercised without a model
+"""
+
+DEFAULT_REPLY = "This is a canned reply from the fake Ollama server."
+
+
+def create_app(reply: str = DEFAULT_REPLY, tokens_per_second: float = 50.0,
+               models: Optional[List[str]] = None, startup_delay: float = 0.0,
+               first_token_delay: float = 0.0, error_rate: float = 0.0,
+               seed: Optional[int] = None) -> FastAPI:
+    """Fake Ollama app
+
+    startup_delay holds back the server start (like Ollama loading), every
+    generation waits first_token_delay before its first token (prompt
+    evaluation), and error_rate is the fraction of generations that fail
+    with a 500 instead of answering.
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await asyncio.sleep(startup_delay)
+        yield
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.requests = []
+    # generations the caller hung up on before the final frame
+    app.state.cancelled = 0
+    app.state.models = list(models or DEFAULT_MODELS)
+    # model name -> keep_alive it was loaded with
+    app.state.loaded = {}
+    tokens = [word + " " for word in reply.split()]
+    rng = random.Random(seed)
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": name} for name in app.state.models]}
+
+    @app.get("/api/ps")
+    async def ps():
+        return {"models": [{"name": name, "expires_at": None, "size_vram": 0}
+                           for name in app.state.loaded]}
+
+    @app.post("/api/generate")
+    async def generate(payload: dict):
+        model = payload.get("model")
+        if payload.get("keep_alive") == 0:
+            app.state.loaded.pop(model, None)
+        else:
+            app.state.loaded[model] = payload.get("keep_alive")
+        if "prompt" not in payload:
+            # Ollama treats a generate without prompt as load/unload only
+            return {"model": model, "response": "", "done": True}
+        app.state.requests.append(payload)
+        delay = 1.0 / tokens_per_second if tokens_per_second else 0
+        if error_rate and rng.random() < error_rate:
+            return JSONResponse({"error": "injected failure"}, status_code=500)
+        await asyncio.sleep(first_token_delay)
+
+        if not payload.get("stream", True):
+            await asyncio.sleep(delay * len(tokens))
+            return {"model": payload.get("model"), "response": "".join(tokens),
+                    "done": True, "eval_count": len(tokens),
+                    "eval_duration": int(delay * len(tokens) * 1e9)}
+
+        async def stream():
+            start = time.perf_counter_ns()
+            complete = False
+            try:
+                for token in tokens:
+                    await asyncio.sleep(delay)
+                    yield json.dumps({"model": payload.get("model"), "response": token,
+                                      "done": False}) + "\n"
+                complete = True
+            finally:
+                if not complete:
+                    app.state.cancelled += 1
+            yield json.dumps({
+                "model": payload.get("model"), "response": "", "done": True,
+                # stand-in token ids, grows by one entry per turn like a real context
+                "context": list(payload.get("context", [])) + [len(app.state.requests)],
+                "eval_count": len(tokens),
+                "eval_duration": time.perf_counter_ns() - start,
+                "total_duration": time.perf_counter_ns() - start,
+            }) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    return app
+
+
+class BackgroundServer:
+    """Runs an ASGI app with uvicorn on a daemon thread"""
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0):
+        config = uvicorn.Config(app, host=host, port=port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.host = host
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server.servers[0].sockets[0].getsockname()[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self, timeout: float = 10.0) -> "BackgroundServer":
+        self._thread = threading.Thread(target=self.server.run, daemon=True)
+        self._thread.start()
+        deadline = time.time() + timeout
+        while not self.server.started:
+            if time.time() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Server failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Callable
+
+"""
+token budgets for conversation history and background summarization of old turns
+"""
+
+# Ollama runs every model with num_ctx=2048 unless told otherwise
+DEFAULT_CONTEXT_TOKENS = 2048
+MODEL_CONTEXT_TOKENS = {
+    "qwen:0.5b": 2048,
+    "qwen:1.8b": 2048,
+    "gemma2:2b": 2048,
+}
+
+# role/formatting tokens the prompt template adds around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return (len(text) + 3) // 4 + MESSAGE_OVERHEAD_TOKENS
+
+
+class ContextBudget:
+    """How much history may be sent with a prompt
+
+    max_tokens overrides the model's context window, reserve_tokens is kept
+    free for the new message and the reply, max_messages caps the sliding
+    window regardless of size.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, reserve_tokens: int = 512,
+                 max_messages: Optional[int] = None):
+        self.max_tokens = max_tokens
+        self.reserve_tokens = reserve_tokens
+        self.max_messages = max_messages
+
+    def limit(self, model: Optional[str] = None) -> int:
+        window = self.max_tokens or MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+        return max(window - self.reserve_tokens, 0)
+
+
+def trim_history(history: List[Dict[str, str]], limit: int,
+                 pinned_tokens: int = 0) -> List[Dict[str, str]]:
+    """Newest messages of history that fit into limit tokens"""
+    remaining = limit - pinned_tokens
+    start = len(history)
+    while start > 0:
+        cost = estimate_tokens(history[start - 1]["content"])
+        if cost > remaining:
+            break
+        remaining -= cost
+        start -= 1
+    return history[start:]
+
+
+Summarizer = Callable[[Optional[str], List[Dict[str, str]]], str]
+
+
+class BackgroundCompactor:
+    """Folds evicted turns into a running summary on a single worker thread
+
+    summarize(previous_summary, messages) returns the new summary; the result
+    is pinned at the start of the conversation once it is ready, so chat()
+    never waits on it.
+    """
+
+    def __init__(self, summarize: Summarizer):
+        self.summarize = summarize
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hi-compactor")
+
+    def submit(self, conversation, messages: List[Dict[str, str]]):
+        return self._executor.submit(self._compact, conversation, messages)
+
+    def _compact(self, conversation, messages: List[Dict[str, str]]):
+        summary = self.summarize(conversation.summary, messages)
+        if summary:
+            conversation.set_summary(summary)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+def server_summarizer(base_url: str = "http://localhost:8000", model: str = "qwen:0.5b") -> Summarizer:
+    """Summarizer that asks the (cheap) model behind a Hi server"""
+    from .client import HiClient
+
+    client = HiClient(base_url)
+    client.load_model(model)
+    client.set_system_prompt(
+        "Summarize the conversation below in a few sentences. "
+        "Keep names, facts and decisions, drop small talk.")
+    lock = threading.Lock()
+
+    def summarize(previous: Optional[str], messages: List[Dict[str, str]]) -> str:
+        text = f"Earlier summary: {previous}\n" if previous else ""
+        text += "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        with lock:
+            return client.chat(text)
+
+    return summarize
@@ -0,0 +1,305 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from .exceptions import JobRestartedError
+from .utils import SDKLogger
+
+"""
+durable background jobs: chat requests queued in SQLite, generated by a
+small worker pool and followed (or picked up again after a dropped
+connection) from any offset into their output
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+STATES = (QUEUED, RUNNING) + FINISHED
+
+# run(request) yields (text, usage); usage only with the last chunk
+JobRunner = Callable[[Dict[str, Any]], AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]]
+
+_logger = SDKLogger("hi_jobs")
+
+
+class JobStore:
+    """Jobs and their output so far, in a SQLite file
+
+    Output is appended as it is generated and belongs to the job's current
+    attempt: claiming a job for another attempt starts it over empty.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "id TEXT NOT NULL UNIQUE, status TEXT NOT NULL, priority INTEGER NOT NULL, "
+            "request TEXT NOT NULL, output TEXT NOT NULL DEFAULT '', usage TEXT, error TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, created REAL NOT NULL, started REAL, "
+            "finished REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, priority, seq)")
+        self._db.commit()
+
+    def add(self, job_id: str, request: Dict[str, Any], priority: int = 0):
+        self._write("INSERT INTO jobs (id, status, priority, request, created) VALUES (?, ?, ?, ?, ?)",
+                    (job_id, QUEUED, priority, json.dumps(request), time.time()))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, status, priority, output, usage, error, attempts, created, started, "
+                "finished FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        keys = ("job_id", "status", "priority", "output", "usage", "error", "attempts",
+                "created", "started", "finished")
+        job = dict(zip(keys, row))
+        job["usage"] = json.loads(job["usage"]) if job["usage"] else None
+        return job
+
+    def claim(self) -> Optional[Tuple[str, Dict[str, Any], int]]:
+        """Mark the next queued job running with empty output: (id, request, attempt)"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, request, attempts FROM jobs WHERE status = ? "
+                "ORDER BY priority DESC, seq LIMIT 1", (QUEUED,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, output = '', "
+                "started = COALESCE(started, ?) WHERE id = ?", (RUNNING, time.time(), row[0]))
+            self._db.commit()
+        return row[0], json.loads(row[1]), row[2] + 1
+
+    def append(self, job_id: str, text: str):
+        # a cancelled job keeps what was generated before the cancel reached it
+        self._write("UPDATE jobs SET output = output || ? WHERE id = ? AND status IN (?, ?)",
+                    (text, job_id, RUNNING, CANCELLED))
+
+    def finish(self, job_id: str, usage: Dict[str, Any]):
+        self._write("UPDATE jobs SET status = ?, usage = ?, finished = ? WHERE id = ? AND status = ?",
+                    (DONE, json.dumps(usage), time.time(), job_id, RUNNING))
+
+    def fail(self, job_id: str, error: str):
+        self._write("UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ? AND status = ?",
+                    (FAILED, error, time.time(), job_id, RUNNING))
+
+    def requeue(self, job_id: str, error: Optional[str] = None):
+        self._write("UPDATE jobs SET status = ?, error = ? WHERE id = ? AND status = ?",
+                    (QUEUED, error, job_id, RUNNING))
+
+    def cancel(self, job_id: str) -> bool:
+        return self._write(
+            "UPDATE jobs SET status = ?, finished = ? WHERE id = ? AND status IN (?, ?)",
+            (CANCELLED, time.time(), job_id, QUEUED, RUNNING)) > 0
+
+    def recover(self) -> int:
+        """Queue the jobs a previous process left running, returns how many"""
+        return self._write("UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING))
+
+    def prune(self, older_than: float) -> int:
+        """Delete finished jobs that finished more than older_than seconds ago"""
+        return self._write("DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished < ?",
+                           FINISHED + (time.time() - older_than,))
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _write(self, sql: str, params: Tuple[Any, ...]) -> int:
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            self._db.commit()
+        return cursor.rowcount
+
+
+class JobQueue:
+    """Drains a JobStore with a fixed number of workers
+
+    Each worker runs one job at a time and rests pause seconds between
+    jobs, so batch work goes at a rate the machine can keep up. Output is
+    written every flush_interval seconds, and followers only ever see
+    written output. A job interrupted by a restart is generated again from
+    the start, since a model cannot pick up a reply halfway through; its
+    followers get a JobRestartedError and start over. A job that raises
+    is retried, after retry_delay seconds times the attempt, until it has
+    had max_attempts; finished jobs are deleted after retention seconds.
+    """
+
+    def __init__(self, store: JobStore, run: JobRunner, workers: int = 1, pause: float = 0.0,
+                 flush_interval: float = 0.5, max_attempts: int = 3, retry_delay: float = 1.0,
+                 retention: float = 7 * 24 * 3600.0):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.store = store
+        self.run = run
+        self.workers = workers
+        self.pause = pause
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.retention = retention
+        self._tasks: List["asyncio.Future[None]"] = []
+        self._running: Dict[str, "asyncio.Future[None]"] = {}
+        # created in start(), inside the loop that uses them
+        self._wakeup: Optional[asyncio.Event] = None
+        self._progress: Optional[asyncio.Event] = None
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._progress = asyncio.Event()
+        recovered = self.store.recover()
+        if recovered:
+            _logger.info(f"Resuming {recovered} interrupted jobs")
+        self.store.prune(self.retention)
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers; running jobs are queued again on the next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, request: Dict[str, Any], priority: int = 0) -> str:
+        job_id = uuid.uuid4().hex
+        self.store.add(job_id, request, priority)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    async def cancel(self, job_id: str) -> bool:
+        """Stop a queued or running job, returns once its generation has stopped"""
+        if not self.store.cancel(job_id):
+            return False
+        running = self._running.get(job_id)
+        if running is not None:
+            running.cancel()
+            await asyncio.wait([running])
+        self._notify()
+        return True
+
+    async def follow(self, job_id: str, offset: int = 0,
+                     attempt: Optional[int] = None) -> AsyncIterator[Tuple[str, int]]:
+        """(text, attempt) of the job from offset on, as it is written, until the job finishes
+
+        offset counts into the output of attempt, the current one if not
+        given. Raises JobRestartedError once the job starts over while
+        text of an earlier attempt has been passed.
+        """
+        while True:
+            # taken before reading, so a write in between is not missed
+            progress = self._progress
+            job = self.store.get(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            if job["attempts"] != attempt:
+                if attempt is not None and offset:
+                    raise JobRestartedError(
+                        f"Job {job_id} restarted with attempt {job['attempts']}")
+                attempt = job["attempts"]
+            if len(job["output"]) > offset:
+                yield job["output"][offset:], attempt
+                offset = len(job["output"])
+            if job["status"] in FINISHED:
+                return
+            try:
+                await asyncio.wait_for(progress.wait(), self.flush_interval * 4)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "active": len(self._running), **self.store.counts()}
+
+    def _notify(self):
+        if self._progress is not None:
+            progress, self._progress = self._progress, asyncio.Event()
+            progress.set()
+
+    async def _work(self):
+        while True:
+            claimed = self.store.claim()
+            if claimed is None:
+                self._wakeup.clear()
+                # a job submitted before the clear would otherwise wait for the next one
+                claimed = self.store.claim()
+                if claimed is None:
+                    await self._wakeup.wait()
+                    continue
+            job_id, request, attempt = claimed
+            task = asyncio.ensure_future(self._run_job(job_id, request, attempt))
+            self._running[job_id] = task
+            try:
+                await asyncio.wait([task])
+            finally:
+                self._running.pop(job_id, None)
+                if not task.done():
+                    # the worker is being stopped
+                    task.cancel()
+                    await asyncio.wait([task])
+            if self.pause:
+                await asyncio.sleep(self.pause)
+
+    async def _run_job(self, job_id: str, request: Dict[str, Any], attempt: int):
+        loop = asyncio.get_running_loop()
+        buffer: List[str] = []
+        usage: Optional[Dict[str, Any]] = None
+        flushed_at = loop.time()
+        chunks = self.run(request)
+        try:
+            async for text, final in chunks:
+                if text:
+                    buffer.append(text)
+                if final is not None:
+                    usage = final
+                if buffer and loop.time() - flushed_at >= self.flush_interval:
+                    self._flush(job_id, buffer)
+                    flushed_at = loop.time()
+            self._flush(job_id, buffer)
+            self.store.finish(job_id, usage or {})
+        except asyncio.CancelledError:
+            # a cancelled job keeps what it had, a stopped one starts over on the next start
+            self._flush(job_id, buffer)
+            raise
+        except Exception as e:
+            self._flush(job_id, buffer)
+            error = f"Error: {str(e)}"
+            if attempt < self.max_attempts:
+                _logger.warning(f"Job {job_id} attempt {attempt} failed, retrying: {error}")
+                # stays running until the delay is over, so no other worker picks it up early
+                await asyncio.sleep(self.retry_delay * attempt)
+                self.store.requeue(job_id, error)
+                self._wakeup.set()
+            else:
+                self.store.fail(job_id, error)
+        finally:
+            # releases whatever the runner holds (connection, generation slot) right away
+            await chunks.aclose()
+            self._notify()
+        self.store.prune(self.retention)
+
+    def _flush(self, job_id: str, buffer: List[str]):
+        if buffer:
+            self.store.append(job_id, "".join(buffer))
+            buffer.clear()
+            self._notify()
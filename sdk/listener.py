@@ -0,0 +1,199 @@
+import asyncio
+import queue
+import threading
+from typing import TYPE_CHECKING, Optional
+
+from .exceptions import SDKException
+
+if TYPE_CHECKING:
+    from .client import HiClient
+    from .async_client import AsyncHiClient
+
+"""
+continuous chat for always-listening devices: inputs are pushed as they are
+heard, inputs that pile up while a reply streams are answered together, and
+new input can cut the current reply short (barge-in)
+"""
+
+
+class ChatListener:
+    """Answers pushed inputs on a worker thread
+
+    push() never blocks. The worker starts a chat as soon as input arrives;
+    everything pushed in the meantime is joined with separator into the next
+    message. With barge_in, input pushed while a reply streams stops that
+    reply after its current token, and the client's 'on_interrupt' callback
+    gets the interrupted message. An interrupted turn is not added to the
+    tracked conversation.
+    """
+
+    def __init__(self, client: "HiClient", role: Optional[str] = None, barge_in: bool = True,
+                 separator: str = " ", timeout: Optional[float] = None):
+        self.client = client
+        self.role = role
+        self.barge_in = barge_in
+        self.separator = separator
+        self.timeout = timeout
+        self.replies = 0
+        self.interrupted = 0
+        self.coalesced = 0
+        self._inputs: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._interrupt = threading.Event()
+        self._lock = threading.Lock()
+        self._responding = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> "ChatListener":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, wait: bool = False):
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._inputs.put(None)
+        self._interrupt.set()
+        if wait:
+            thread.join()
+
+    def push(self, text: str):
+        if not text or not text.strip():
+            return
+        with self._lock:
+            self._inputs.put(text)
+            if self.barge_in and self._responding:
+                self._interrupt.set()
+
+    def _take(self) -> Optional[str]:
+        """Block for the next input and join whatever else is already waiting"""
+        first = self._inputs.get()
+        if first is None:
+            return None
+        inputs = [first]
+        with self._lock:
+            while True:
+                try:
+                    text = self._inputs.get_nowait()
+                except queue.Empty:
+                    break
+                if text is None:
+                    # stop() was called, answer nothing more
+                    return None
+                inputs.append(text)
+            self._interrupt.clear()
+            self._responding = True
+        self.coalesced += len(inputs) - 1
+        return self.separator.join(inputs)
+
+    def _run(self):
+        while True:
+            message = self._take()
+            if message is None:
+                return
+            try:
+                with self.client.stream(message, role=self.role, timeout=self.timeout) as reply:
+                    for _ in reply:
+                        if self._interrupt.is_set():
+                            self.interrupted += 1
+                            self._fire_interrupt(message)
+                            break
+                    else:
+                        self.replies += 1
+            except SDKException:
+                # already reported through the client's on_error callback
+                pass
+            finally:
+                with self._lock:
+                    self._responding = False
+
+    def _fire_interrupt(self, message: str):
+        try:
+            self.client.events.emit('on_interrupt', message)
+        except Exception as e:
+            self.client.logger.warning(f"Error in on_interrupt callback: {str(e)}")
+
+
+class AsyncChatListener:
+    """ChatListener for AsyncHiClient, running as a task on the event loop
+
+    Barge-in cancels the task streaming the reply, so the connection is
+    dropped right away instead of after the next token.
+    """
+
+    def __init__(self, client: "AsyncHiClient", role: Optional[str] = None,
+                 barge_in: bool = True, separator: str = " ", timeout: Optional[float] = None):
+        self.client = client
+        self.role = role
+        self.barge_in = barge_in
+        self.separator = separator
+        self.timeout = timeout
+        self.replies = 0
+        self.interrupted = 0
+        self.coalesced = 0
+        self._inputs: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reply: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> "AsyncChatListener":
+        """Start the listener task; call from within the running event loop"""
+        if self._task is None:
+            self._inputs = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def push(self, text: str):
+        if not text or not text.strip() or self._inputs is None:
+            return
+        self._inputs.put_nowait(text)
+        if self.barge_in and self._reply is not None and not self._reply.done():
+            self._reply.cancel()
+
+    async def _answer(self, message: str):
+        async for _ in self.client.stream(message, role=self.role, timeout=self.timeout):
+            pass
+
+    async def _run(self):
+        try:
+            while True:
+                inputs = [await self._inputs.get()]
+                while not self._inputs.empty():
+                    inputs.append(self._inputs.get_nowait())
+                self.coalesced += len(inputs) - 1
+                message = self.separator.join(inputs)
+                self._reply = asyncio.ensure_future(self._answer(message))
+                # wait() does not raise when the reply task was cancelled by a barge-in
+                await asyncio.wait({self._reply})
+                if self._reply.cancelled():
+                    self.interrupted += 1
+                    try:
+                        await self.client._fire('on_interrupt', message)
+                    except SDKException as e:
+                        self.client.logger.warning(str(e))
+                elif self._reply.exception() is None:
+                    self.replies += 1
+                elif not isinstance(self._reply.exception(), SDKException):
+                    # SDK errors went to on_error already, anything else is a bug
+                    raise self._reply.exception()
+        finally:
+            if self._reply is not None and not self._reply.done():
+                self._reply.cancel()
@@ -0,0 +1,271 @@
+import math
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+"""
+constant-memory latency and throughput metrics: log-bucketed histograms with
+bounded relative error, per-request timers and per-model breakdowns
+"""
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Quantile sketch with logarithmic buckets
+
+    Every value lands in the bucket (gamma^(i-1), gamma^i], so reported
+    quantiles are within relative_accuracy of the true value. Values below
+    min_value count as zero and values above max_value are clamped, which
+    bounds the number of buckets no matter how many values are recorded.
+    Not thread-safe on its own; Metrics guards it with a lock.
+    """
+
+    __slots__ = ("relative_accuracy", "min_value", "_gamma", "_log_gamma", "_max_index",
+                 "_buckets", "_zero", "count", "sum", "min", "max")
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-6,
+                 max_value: float = 1e6):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._max_index = math.ceil(math.log(max_value) / self._log_gamma)
+        self._buckets: Dict[int, int] = {}
+        self._zero = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def record(self, value: float):
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value <= self.min_value:
+            self._zero += 1
+            return
+        index = min(math.ceil(math.log(value) / self._log_gamma), self._max_index)
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self._zero
+        if rank < seen:
+            return 0.0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if rank < seen:
+                # midpoint of the bucket, clamped to what was actually seen
+                value = 2 * self._gamma ** index / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def merge(self, other: "Histogram"):
+        for index, count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+        self._zero += other._zero
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def summary(self) -> Dict[str, float]:
+        summary = {"count": self.count, "mean": self.mean}
+        for q in PERCENTILES:
+            summary[f"p{round(q * 100)}"] = self.quantile(q)
+        return summary
+
+
+class ModelStats:
+    """Histograms and counters for one model (or for all of them)"""
+
+    __slots__ = ("latency", "ttft", "inter_token", "tokens_per_second",
+                 "requests", "tokens", "errors")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.ttft = Histogram()
+        self.inter_token = Histogram()
+        self.tokens_per_second = Histogram()
+        self.requests = 0
+        self.tokens = 0
+        self.errors = 0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "tokens": self.tokens,
+            "errors": self.errors,
+            "latency": self.latency.summary(),
+            "time_to_first_token": self.ttft.summary(),
+            "inter_token_latency": self.inter_token.summary(),
+            "tokens_per_second": self.tokens_per_second.summary(),
+        }
+
+
+class RequestTimer:
+    """Timing handle for one request, returned by Metrics.start_request()
+
+    Call token() for every streamed chunk and finish() once the response is
+    complete. Each request has its own handle, so concurrent requests never
+    share a start time.
+    """
+
+    __slots__ = ("metrics", "model", "start", "first_token_at", "last_token_at", "chunks", "done")
+
+    def __init__(self, metrics: "Metrics", model: Optional[str] = None):
+        self.metrics = metrics
+        self.model = model
+        self.start = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.last_token_at: Optional[float] = None
+        self.chunks = 0
+        self.done = False
+
+    def token(self):
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.last_token_at = now
+        self.chunks += 1
+
+    def finish(self, tokens: Optional[int] = None, eval_seconds: Optional[float] = None) -> float:
+        """Record the request and return its latency in seconds
+
+        tokens defaults to the number of chunks seen. eval_seconds is the
+        generation time the server reported; without it, throughput is
+        measured from the first to the last chunk.
+        """
+        latency = time.perf_counter() - self.start
+        if not self.done:
+            self.done = True
+            self.metrics._record(self, latency, self.chunks if tokens is None else tokens,
+                                 eval_seconds)
+        return latency
+
+    def fail(self):
+        if not self.done:
+            self.done = True
+            self.metrics._record_error(self.model)
+
+
+class Metrics:
+    """Thread-safe request metrics with p50/p95/p99 overall and per model
+
+    Memory stays constant however many requests are recorded. For each
+    request: total latency, time to first token, mean gap between tokens
+    and tokens per second.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._total = ModelStats()
+        self._models: Dict[str, ModelStats] = {}
+
+    def start_request(self, model: Optional[str] = None) -> RequestTimer:
+        timer = RequestTimer(self, model)
+        # lets end_request() without a handle find the timer of this thread
+        self._local.timer = timer
+        return timer
+
+    def end_request(self, timer: Optional[RequestTimer] = None, tokens: Optional[int] = None,
+                    eval_seconds: Optional[float] = None) -> float:
+        if timer is None:
+            timer = getattr(self._local, "timer", None)
+            if timer is None:
+                return 0.0
+        if getattr(self._local, "timer", None) is timer:
+            self._local.timer = None
+        return timer.finish(tokens, eval_seconds)
+
+    def record_latency(self, latency: float, model: Optional[str] = None):
+        with self._lock:
+            for stats in self._targets(model):
+                stats.latency.record(latency)
+                stats.requests += 1
+
+    def record_tokens(self, count: int, model: Optional[str] = None):
+        with self._lock:
+            for stats in self._targets(model):
+                stats.tokens += count
+
+    def get_average_latency(self) -> float:
+        with self._lock:
+            return self._total.latency.mean
+
+    def get_total_tokens(self) -> int:
+        with self._lock:
+            return self._total.tokens
+
+    def percentile(self, q: float, model: Optional[str] = None) -> float:
+        """Latency percentile in seconds, q between 0 and 1"""
+        with self._lock:
+            stats = self._models.get(model) if model else self._total
+            return stats.latency.quantile(q) if stats else 0.0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._total
+            metrics = {
+                "average_latency": total.latency.mean,
+                "total_tokens": total.tokens,
+                "request_count": total.requests,
+                "tokens_per_request": total.tokens / total.requests if total.requests else 0,
+            }
+            metrics.update(total.summary())
+            metrics["models"] = {name: stats.summary() for name, stats in self._models.items()}
+            return metrics
+
+    def reset(self):
+        with self._lock:
+            self._total = ModelStats()
+            self._models = {}
+        self._local = threading.local()
+
+    def _targets(self, model: Optional[str]) -> List[ModelStats]:
+        if model is None:
+            return [self._total]
+        stats = self._models.get(model)
+        if stats is None:
+            stats = self._models[model] = ModelStats()
+        return [self._total, stats]
+
+    def _record(self, timer: RequestTimer, latency: float, tokens: int,
+                eval_seconds: Optional[float] = None):
+        inter_token = throughput = None
+        if eval_seconds and tokens:
+            inter_token = eval_seconds / tokens
+            throughput = tokens / eval_seconds
+        elif timer.first_token_at is not None:
+            generation = timer.last_token_at - timer.first_token_at
+            if timer.chunks > 1:
+                inter_token = generation / (timer.chunks - 1)
+            if generation > 0 and tokens:
+                throughput = tokens / generation
+        with self._lock:
+            for stats in self._targets(timer.model):
+                stats.requests += 1
+                stats.tokens += tokens
+                stats.latency.record(latency)
+                if timer.first_token_at is not None:
+                    stats.ttft.record(timer.first_token_at - timer.start)
+                if inter_token is not None:
+                    stats.inter_token.record(inter_token)
+                if throughput is not None:
+                    stats.tokens_per_second.record(throughput)
+
+    def _record_error(self, model: Optional[str]):
+        with self._lock:
+            for stats in self._targets(model):
+                stats.errors += 1
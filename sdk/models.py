@@ -0,0 +1,19 @@
+import re
+from typing import Optional
+
+"""
+models the SDK knows about before asking Ollama what is actually pulled
+"""
+
+DEFAULT_MODELS = ["qwen:0.5b", "qwen:1.8b", "gemma2:2b"]
+
+# load_model() name that picks one of the available models per request
+AUTO_MODEL = "auto"
+
+_SIZE = re.compile(r":(\d+(?:\.\d+)?)b\b", re.IGNORECASE)
+
+
+def model_size(model: str) -> Optional[float]:
+    """Billions of parameters from a tag such as 'qwen:1.8b', None if it has none"""
+    match = _SIZE.search(model)
+    return float(match.group(1)) if match else None
@@ -0,0 +1,68 @@
+import json
+from typing import Any, Dict, Optional
+
+"""
+the /chat wire format, one JSON object per line (NDJSON):
+
+  {"token": "..."}                 generated text, one or more tokens
+  {"done": true, "usage": {...}}   last frame, Ollama's counts and durations
+  {"error": "...", "code": "..."}  the generation failed after the stream started
+
+GET /jobs/{job_id}/stream tags each token frame with the job's attempt,
+{"token": "...", "attempt": 2}; a job restarted after the client saw some
+of its text ends the stream with code "job_restarted".
+
+A client may send its remaining time budget in milliseconds in the
+X-Request-Timeout header; the server then gives up with code
+"deadline_exceeded" instead of generating an answer nobody waits for.
+"""
+
+MEDIA_TYPE = "application/x-ndjson"
+DEADLINE_HEADER = "X-Request-Timeout"
+DEADLINE_EXCEEDED = "deadline_exceeded"
+JOB_RESTARTED = "job_restarted"
+
+# copied from Ollama's final frame, durations are in nanoseconds
+USAGE_FIELDS = ("eval_count", "prompt_eval_count", "total_duration", "load_duration",
+                "prompt_eval_duration", "eval_duration")
+
+
+def token_frame(text: str) -> str:
+    return json.dumps({"token": text}) + "\n"
+
+
+def job_frame(text: str, attempt: int) -> str:
+    return json.dumps({"token": text, "attempt": attempt}) + "\n"
+
+
+def done_frame(usage: Dict[str, Any]) -> str:
+    return json.dumps({"done": True, "usage": usage}) + "\n"
+
+
+def error_frame(message: str, code: Optional[str] = None) -> str:
+    frame = {"error": message}
+    if code is not None:
+        frame["code"] = code
+    return json.dumps(frame) + "\n"
+
+
+def usage_from(ollama_frame: Dict[str, Any]) -> Dict[str, Any]:
+    usage = {field: ollama_frame[field] for field in USAGE_FIELDS if field in ollama_frame}
+    eval_count, eval_duration = usage.get("eval_count"), usage.get("eval_duration")
+    if eval_count and eval_duration:
+        usage["tokens_per_second"] = eval_count / (eval_duration / 1e9)
+    return usage
+
+
+def parse_frame(line: str) -> Dict[str, Any]:
+    frame = json.loads(line)
+    if not isinstance(frame, dict):
+        raise ValueError(f"Unexpected frame: {line[:80]}")
+    return frame
+
+
+def eval_seconds(usage: Optional[Dict[str, Any]]) -> Optional[float]:
+    """Time Ollama spent generating, None if the server did not say"""
+    if usage and usage.get("eval_duration"):
+        return usage["eval_duration"] / 1e9
+    return None
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Union, Any
+
+import httpx
+
+from .models import DEFAULT_MODELS
+
+"""
+which models Ollama has pulled and which it keeps in memory: discovery via
+/api/tags, preloading, and per-model keep_alive
+"""
+
+KeepAlive = Union[str, int]
+
+
+def parse_keep_alive(spec: str) -> Dict[str, KeepAlive]:
+    """Parse "qwen:0.5b=1h,gemma2:2b=5m" into a per-model mapping"""
+    keep_alive = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, value = item.rpartition("=")
+        keep_alive[model] = int(value) if value.lstrip("-").isdigit() else value
+    return keep_alive
+
+
+class ModelResidency:
+    """Tracks pulled and loaded models of one Ollama instance
+
+    The pulled model list is cached for ttl seconds; if Ollama cannot be
+    asked, DEFAULT_MODELS is assumed. keep_alive maps model names to
+    Ollama keep_alive values ("10m", 3600, -1 to pin, 0 to unload right
+    away) and is added to every generate request for that model.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, ollama_url: str, ttl: float = 60.0,
+                 keep_alive: Optional[Dict[str, KeepAlive]] = None):
+        self.client = client
+        self.ollama_url = ollama_url
+        self.ttl = ttl
+        self.keep_alive = keep_alive or {}
+        self._models: Optional[List[str]] = None
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def keep_alive_for(self, model: str) -> Optional[KeepAlive]:
+        return self.keep_alive.get(model)
+
+    async def available(self, refresh: bool = False) -> List[str]:
+        if not refresh and self._models is not None and time.monotonic() - self._fetched_at < self.ttl:
+            return self._models
+        async with self._lock:
+            if refresh or self._models is None or time.monotonic() - self._fetched_at >= self.ttl:
+                try:
+                    response = await self.client.get(f"{self.ollama_url}/api/tags")
+                    response.raise_for_status()
+                    self._models = [m["name"] for m in response.json().get("models", [])]
+                except (httpx.HTTPError, ValueError, KeyError):
+                    # keep serving the last known list, or the defaults
+                    if self._models is None:
+                        return list(DEFAULT_MODELS)
+                self._fetched_at = time.monotonic()
+        return self._models
+
+    async def loaded(self) -> List[Dict[str, Any]]:
+        response = await self.client.get(f"{self.ollama_url}/api/ps")
+        response.raise_for_status()
+        return [{"name": m["name"], "expires_at": m.get("expires_at"),
+                 "size_vram": m.get("size_vram")}
+                for m in response.json().get("models", [])]
+
+    async def load(self, model: str,
+                   keep_alive: Optional[KeepAlive] = None) -> float:
+        """Load model into memory (a generate call without prompt), returns seconds taken"""
+        payload: Dict[str, Any] = {"model": model}
+        keep_alive = keep_alive if keep_alive is not None else self.keep_alive_for(model)
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        start = time.monotonic()
+        response = await self.client.post(f"{self.ollama_url}/api/generate", json=payload)
+        response.raise_for_status()
+        return time.monotonic() - start
+
+    async def evict(self, model: str):
+        response = await self.client.post(f"{self.ollama_url}/api/generate",
+                                          json={"model": model, "keep_alive": 0})
+        response.raise_for_status()
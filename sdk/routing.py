@@ -0,0 +1,179 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .metrics import Histogram
+
+"""
+client-side load balancing over several hi servers: least-outstanding
+routing, conversation affinity, health checks with ejection, and the
+first-byte statistics used to decide when to hedge a request
+"""
+
+
+class Backend:
+    """One server in the pool and what the client knows about it"""
+
+    __slots__ = ("url", "outstanding", "failures", "ejected_at", "requests", "errors",
+                 "first_byte")
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        # consecutive failures, reset by any success
+        self.failures = 0
+        self.ejected_at: Optional[float] = None
+        self.requests = 0
+        self.errors = 0
+        self.first_byte = Histogram()
+
+    @property
+    def ejected(self) -> bool:
+        return self.ejected_at is not None
+
+    def stats(self) -> Dict[str, object]:
+        return {"url": self.url, "outstanding": self.outstanding, "ejected": self.ejected,
+                "requests": self.requests, "errors": self.errors,
+                "first_byte_p95": self.first_byte.quantile(0.95)}
+
+
+class BackendPool:
+    """Picks the server for each chat
+
+    Requests go to the available backend with the fewest requests in
+    flight. A backend is ejected after failure_threshold consecutive
+    failures and readmitted by the next passing health check, or, without
+    health checks, after eject_seconds. When every backend is ejected the
+    pool fails open and routes over all of them.
+
+    With hedge=True a chat whose first byte has not arrived after the
+    pool's hedge_quantile first-byte time is sent to a second backend as
+    well and the faster answer wins; hedge_after sets a fixed delay in
+    seconds instead. No request is hedged until min_samples first-byte
+    times were measured.
+    """
+
+    def __init__(self, urls: Iterable[str], failure_threshold: int = 3,
+                 eject_seconds: float = 30.0, health_interval: Optional[float] = 10.0,
+                 hedge: bool = False, hedge_quantile: float = 0.95,
+                 hedge_after: Optional[float] = None, min_samples: int = 20):
+        self.backends = [Backend(url) for url in urls]
+        if not self.backends:
+            raise ValueError("BackendPool needs at least one url")
+        self.failure_threshold = failure_threshold
+        self.eject_seconds = eject_seconds
+        self.health_interval = health_interval
+        self.hedge = hedge or hedge_after is not None
+        self.hedge_quantile = hedge_quantile
+        self.hedge_after = hedge_after
+        self.min_samples = min_samples
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._first_byte = Histogram()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+
+    @property
+    def urls(self) -> List[str]:
+        return [backend.url for backend in self.backends]
+
+    def get(self, url: str) -> Optional[Backend]:
+        for backend in self.backends:
+            if backend.url == url:
+                return backend
+        return None
+
+    def available(self) -> List[Backend]:
+        now = time.monotonic()
+        with self._lock:
+            backends = [b for b in self.backends if not b.ejected
+                        or (self._health_thread is None and now - b.ejected_at >= self.eject_seconds)]
+        return backends or list(self.backends)
+
+    def pick(self, exclude: Iterable[Backend] = (), prefer: Optional[Backend] = None) -> Backend:
+        """Least-outstanding available backend; prefer wins while it is available"""
+        candidates = [b for b in self.available() if b not in exclude]
+        if not candidates:
+            candidates = [b for b in self.backends if b not in exclude] or list(self.backends)
+        if prefer is not None and prefer in candidates:
+            return prefer
+        # ties go to the backend listed first, so a quiet pool stays on one node
+        return min(candidates, key=lambda b: b.outstanding)
+
+    def acquire(self, backend: Backend):
+        with self._lock:
+            backend.outstanding += 1
+            backend.requests += 1
+
+    def release(self, backend: Backend):
+        with self._lock:
+            backend.outstanding -= 1
+
+    def succeeded(self, backend: Backend, first_byte: Optional[float] = None):
+        with self._lock:
+            backend.failures = 0
+            backend.ejected_at = None
+            if first_byte is not None:
+                backend.first_byte.record(first_byte)
+                self._first_byte.record(first_byte)
+
+    def failed(self, backend: Backend):
+        with self._lock:
+            backend.errors += 1
+            backend.failures += 1
+            if backend.failures >= self.failure_threshold and not backend.ejected:
+                backend.ejected_at = time.monotonic()
+
+    def record_hedge(self, won: bool):
+        """Count a hedged request, won when the second backend answered first"""
+        with self._lock:
+            self.hedged += 1
+            if won:
+                self.hedge_wins += 1
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait for the first byte before hedging, None to not hedge"""
+        if not self.hedge or len(self.backends) < 2:
+            return None
+        if self.hedge_after is not None:
+            return self.hedge_after
+        with self._lock:
+            if self._first_byte.count < self.min_samples:
+                return None
+            return self._first_byte.quantile(self.hedge_quantile)
+
+    def check(self, probe: Callable[[str], bool]):
+        """Run one round of health checks; probe(url) returns whether the server is up"""
+        for backend in self.backends:
+            try:
+                ok = probe(backend.url)
+            except Exception:
+                ok = False
+            if ok:
+                self.succeeded(backend)
+            else:
+                self.failed(backend)
+
+    def start_health_checks(self, probe: Callable[[str], bool]):
+        if self.health_interval is None or self._health_thread is not None:
+            return
+        self._stop.clear()
+        self._health_thread = threading.Thread(target=self._health_loop, args=(probe,),
+                                               daemon=True)
+        self._health_thread.start()
+
+    def stop_health_checks(self):
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join()
+            self._health_thread = None
+
+    def _health_loop(self, probe: Callable[[str], bool]):
+        while not self._stop.wait(self.health_interval):
+            self.check(probe)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"backends": [b.stats() for b in self.backends],
+                    "hedged": self.hedged, "hedge_wins": self.hedge_wins}
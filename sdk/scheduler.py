@@ -0,0 +1,167 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+from .exceptions import QueueFullError
+
+"""
+admission control in front of Ollama: a fixed number of generation slots,
+per-model priority queues, and a preference for the model that is already
+loaded so requests do not force model swaps
+"""
+
+
+class Ticket:
+    __slots__ = ("model", "priority", "seq", "enqueued_at", "wait_time", "future", "cancelled")
+
+    def __init__(self, model: str, priority: int, seq: int):
+        self.model = model
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.wait_time = 0.0
+        self.future: Optional[asyncio.Future] = None
+        self.cancelled = False
+
+
+class ModelScheduler:
+    """Grants generation slots, at most max_concurrency at a time
+
+    Waiting requests are queued per model and ordered by priority (higher
+    first), then arrival. While the loaded model has queued work it keeps
+    the slots, up to max_consecutive grants in a row when other models are
+    waiting, unless another model's request has a strictly higher priority.
+    Once max_queue_depth requests wait, new ones fail with QueueFullError.
+    """
+
+    def __init__(self, max_concurrency: int = 1, max_queue_depth: int = 32,
+                 max_consecutive: int = 8):
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.max_consecutive = max_consecutive
+        self.current_model: Optional[str] = None
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.model_switches = 0
+        self._total_wait = 0.0
+        self._consecutive = 0
+        self._queues: Dict[str, List[Tuple[int, int, Ticket]]] = {}
+        self._seq = itertools.count()
+
+    async def acquire(self, model: str, priority: int = 0) -> Ticket:
+        ticket = Ticket(model, priority, next(self._seq))
+        if self.waiting == 0 and self._can_start(model):
+            self._grant(ticket)
+            return ticket
+
+        if self.waiting >= self.max_queue_depth:
+            self.rejected += 1
+            raise QueueFullError(
+                f"Generation queue is full ({self.waiting} requests waiting)")
+
+        ticket.future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queues.setdefault(model, []), (-priority, ticket.seq, ticket))
+        self.waiting += 1
+        self._dispatch()
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # granted in the same tick we were cancelled, hand the slot on
+                self.release(ticket)
+            elif not ticket.cancelled:
+                ticket.cancelled = True
+                self.waiting -= 1
+            raise
+        return ticket
+
+    def release(self, ticket: Ticket):
+        self.running -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: int = 0):
+        ticket = await self.acquire(model, priority)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "running": self.running,
+            "waiting": self.waiting,
+            "current_model": self.current_model,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "model_switches": self.model_switches,
+            "average_queue_wait": self._total_wait / self.admitted if self.admitted else 0.0,
+        }
+
+    def _can_start(self, model: str) -> bool:
+        if self.running >= self.max_concurrency:
+            return False
+        # never run two models side by side, that is exactly the swap we avoid
+        return self.running == 0 or model == self.current_model
+
+    def _grant(self, ticket: Ticket):
+        if ticket.model != self.current_model:
+            if self.current_model is not None:
+                self.model_switches += 1
+            self.current_model = ticket.model
+            self._consecutive = 0
+        self._consecutive += 1
+        self.running += 1
+        self.admitted += 1
+        ticket.wait_time = time.monotonic() - ticket.enqueued_at
+        self._total_wait += ticket.wait_time
+        if ticket.future is not None:
+            ticket.future.set_result(ticket)
+
+    def _head(self, model: str) -> Optional[Ticket]:
+        queue = self._queues.get(model)
+        while queue and (queue[0][2].cancelled or queue[0][2].future.cancelled()):
+            _, _, ticket = heapq.heappop(queue)
+            if not ticket.cancelled:
+                # the waiter was cancelled but has not noticed yet
+                ticket.cancelled = True
+                self.waiting -= 1
+        if not queue:
+            self._queues.pop(model, None)
+            return None
+        return queue[0][2]
+
+    def _next_model(self) -> Optional[str]:
+        heads = {}
+        for model in list(self._queues):
+            head = self._head(model)
+            if head is not None:
+                heads[model] = head
+        if not heads:
+            return None
+
+        best = min(heads.values(), key=lambda t: (-t.priority, t.seq))
+        current = heads.get(self.current_model)
+        if current is not None:
+            others_waiting = len(heads) > 1
+            if best.priority <= current.priority and \
+                    not (others_waiting and self._consecutive >= self.max_consecutive):
+                return self.current_model
+            if best.model == self.current_model:
+                best = min((t for t in heads.values() if t.model != self.current_model),
+                           key=lambda t: (-t.priority, t.seq))
+        return best.model
+
+    def _dispatch(self):
+        while self.waiting:
+            model = self._next_model()
+            if model is None or not self._can_start(model):
+                return
+            _, _, ticket = heapq.heappop(self._queues[model])
+            self.waiting -= 1
+            self._grant(ticket)
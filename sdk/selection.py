@@ -0,0 +1,160 @@
+import threading
+from typing import Any, Dict, List, Optional
+
+from .models import model_size
+
+"""
+latency-aware model choice for load_model("auto"): every request goes to
+the largest model expected to answer within the latency SLO, judged by the
+prompt length and what each model measured on this hardware
+"""
+
+# a few seconds is what a spoken reply can wait on a Raspberry Pi
+DEFAULT_LATENCY_SLO = 3.0
+# reply length assumed until replies have been seen
+DEFAULT_REPLY_TOKENS = 64
+
+# until a model has served a request: generation speed per billion
+# parameters, how much faster the prompt is read, fixed setup cost
+PRIOR_TOKENS_PER_SECOND = 10.0
+PRIOR_PROMPT_SPEEDUP = 5.0
+PRIOR_OVERHEAD = 0.3
+
+
+class ModelProfile:
+    """Running estimates for one model, updated after every request it serves"""
+
+    __slots__ = ("model", "size", "tokens_per_second", "prompt_tokens_per_second",
+                 "overhead", "reply_tokens", "samples")
+
+    def __init__(self, model: str, reply_tokens: int = DEFAULT_REPLY_TOKENS):
+        self.model = model
+        # unknown sizes sort last, as if they were the largest
+        self.size = model_size(model) or float("inf")
+        speed = PRIOR_TOKENS_PER_SECOND / (model_size(model) or 2.0)
+        self.tokens_per_second = speed
+        self.prompt_tokens_per_second = speed * PRIOR_PROMPT_SPEEDUP
+        self.overhead = PRIOR_OVERHEAD
+        self.reply_tokens = float(reply_tokens)
+        self.samples = 0
+
+    def ttft(self, prompt_tokens: int) -> float:
+        return self.overhead + prompt_tokens / self.prompt_tokens_per_second
+
+    def latency(self, prompt_tokens: int, reply_tokens: Optional[int] = None) -> float:
+        reply = self.reply_tokens if reply_tokens is None else reply_tokens
+        return self.ttft(prompt_tokens) + reply / self.tokens_per_second
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "tokens_per_second": self.tokens_per_second,
+            "prompt_tokens_per_second": self.prompt_tokens_per_second,
+            "overhead": self.overhead,
+            "reply_tokens": self.reply_tokens,
+        }
+
+
+class ModelSelector:
+    """Picks a model per request from a latency budget
+
+    The smallest model is the default; a larger one is only chosen when its
+    predicted latency (setup, reading the prompt, generating the expected
+    reply) fits in latency_slo seconds. If none fits, the fastest is used.
+    Estimates start from priors scaled by model size and follow the usage
+    of served requests as moving averages (weight alpha for the newest);
+    models not measured yet are scaled from the ones that were.
+    reply_tokens fixes the expected reply length instead of learning it.
+    """
+
+    def __init__(self, models: List[str], latency_slo: float = DEFAULT_LATENCY_SLO,
+                 reply_tokens: Optional[int] = None, alpha: float = 0.3):
+        if latency_slo <= 0:
+            raise ValueError("latency_slo must be positive")
+        self.latency_slo = latency_slo
+        self.reply_tokens = reply_tokens
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._profiles: Dict[str, ModelProfile] = {}
+        self.set_models(models)
+
+    @property
+    def models(self) -> List[str]:
+        """Candidates, smallest first"""
+        return [p.model for p in self._ordered]
+
+    def set_models(self, models: List[str]):
+        with self._lock:
+            self._profiles = {model: self._profiles.get(model) or
+                              ModelProfile(model, self.reply_tokens or DEFAULT_REPLY_TOKENS)
+                              for model in models}
+            self._ordered = sorted(self._profiles.values(), key=lambda p: p.size)
+        if not self._ordered:
+            raise ValueError("auto needs at least one model")
+
+    def predict(self, model: str, prompt_tokens: int) -> float:
+        """Expected seconds for model to answer a prompt of prompt_tokens"""
+        return self._profiles[model].latency(prompt_tokens, self.reply_tokens)
+
+    def select(self, prompt_tokens: int) -> str:
+        ordered = self._ordered
+        fastest, fastest_latency = ordered[0], None
+        for profile in reversed(ordered):
+            latency = profile.latency(prompt_tokens, self.reply_tokens)
+            if latency <= self.latency_slo:
+                return profile.model
+            if fastest_latency is None or latency < fastest_latency:
+                fastest, fastest_latency = profile, latency
+        return fastest.model
+
+    def observe(self, model: str, usage: Dict[str, Any], ttft: Optional[float] = None):
+        """Fold a served request in: usage is the server's final frame, ttft in seconds"""
+        profile = self._profiles.get(model)
+        if profile is None:
+            return
+        eval_count, eval_duration = usage.get("eval_count"), usage.get("eval_duration")
+        prompt_count = usage.get("prompt_eval_count")
+        prompt_duration = usage.get("prompt_eval_duration")
+        with self._lock:
+            # the first measurement replaces the prior outright
+            alpha = self.alpha if profile.samples else 1.0
+            if eval_count and eval_duration:
+                profile.tokens_per_second = _ewma(
+                    profile.tokens_per_second, eval_count / (eval_duration / 1e9), alpha)
+                profile.reply_tokens = _ewma(profile.reply_tokens, eval_count, alpha)
+            prompt_seconds = 0.0
+            if prompt_count and prompt_duration:
+                prompt_seconds = prompt_duration / 1e9
+                profile.prompt_tokens_per_second = _ewma(
+                    profile.prompt_tokens_per_second, prompt_count / prompt_seconds, alpha)
+            if ttft is not None:
+                # network, queueing and loading: whatever the prompt does not explain
+                profile.overhead = _ewma(profile.overhead, max(ttft - prompt_seconds, 0.0), alpha)
+            profile.samples += 1
+            self._scale_unmeasured()
+
+    def _scale_unmeasured(self):
+        """Models not tried yet are assumed as fast as the nearest measured one, scaled by size
+
+        So a machine much faster than the priors assume gets to try the
+        larger models, and one much slower never does.
+        """
+        measured = [p for p in self._ordered if p.samples and p.size != float("inf")]
+        if not measured:
+            return
+        for profile in self._ordered:
+            if profile.samples or profile.size == float("inf"):
+                continue
+            nearest = min(measured, key=lambda p: abs(p.size - profile.size))
+            scale = nearest.size / profile.size
+            profile.tokens_per_second = nearest.tokens_per_second * scale
+            profile.prompt_tokens_per_second = nearest.prompt_tokens_per_second * scale
+            profile.overhead = nearest.overhead
+            profile.reply_tokens = nearest.reply_tokens
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {p.model: p.to_dict() for p in self._ordered}
+
+
+def _ewma(current: float, value: float, alpha: float) -> float:
+    return current + alpha * (value - current)
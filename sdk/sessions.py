@@ -0,0 +1,59 @@
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Dict, Optional
+
+"""
+server-side chat sessions: history plus the Ollama context tokens of the last turn
+"""
+
+
+class ChatSession:
+    __slots__ = ("session_id", "model", "history", "context", "updated_at")
+
+    def __init__(self, session_id: str, model: str, history: Optional[List[Dict[str, str]]] = None):
+        self.session_id = session_id
+        self.model = model
+        self.history: List[Dict[str, str]] = history or []
+        # token ids returned by /api/generate, replayed so Ollama skips re-prefilling the history
+        self.context: Optional[List[int]] = None
+        self.updated_at = time.monotonic()
+
+    def record_turn(self, model: str, message: str, response: str, context: Optional[List[int]]):
+        self.history.append({"role": "user", "content": message})
+        self.history.append({"role": "assistant", "content": response})
+        self.model = model
+        self.context = context
+        self.updated_at = time.monotonic()
+
+
+class SessionStore:
+    """In-memory sessions, evicted least-recently-used first or after ttl seconds idle"""
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 3600.0):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+
+    def create(self, model: str, history: Optional[List[Dict[str, str]]] = None) -> ChatSession:
+        session = ChatSession(uuid.uuid4().hex, model, history)
+        self._sessions[session.session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if time.monotonic() - session.updated_at > self.ttl:
+            del self._sessions[session_id]
+            return None
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self):
+        return len(self._sessions)
@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import json
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, List, Optional
+
+from .exceptions import StreamingError
+
+"""
+single-flight for streams: identical concurrent requests share one upstream
+generation, every subscriber receives every item from the start
+"""
+
+
+def flight_key(payload: Dict[str, Any]) -> str:
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class Abort:
+    """Stops one subscriber from another task, even while it waits for items
+
+    Calling it with an exception makes the subscriber raise that exception
+    at its next wait (or right away if it is waiting).
+    """
+
+    __slots__ = ("error", "_waiter")
+
+    def __init__(self):
+        self.error: Optional[BaseException] = None
+        self._waiter: Optional[asyncio.Future] = None
+
+    def __call__(self, error: BaseException):
+        if self.error is None:
+            self.error = error
+            if self._waiter is not None and not self._waiter.done():
+                self._waiter.set_result(None)
+
+
+class Flight:
+    """One running upstream stream and the items it produced so far"""
+
+    def __init__(self, key: str, on_abandon: Optional[Callable[["Flight"], None]] = None):
+        self.key = key
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        # set once the last subscriber left and the generation is being stopped
+        self.cancelled = False
+        self._on_abandon = on_abandon
+        self.started = asyncio.get_running_loop().create_future()
+        self.task: Optional[asyncio.Task] = None
+        self._waiters: List[asyncio.Future] = []
+
+    def _notify(self):
+        # wake everyone waiting right now, later waiters register again
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def _wait(self, abort: Optional[Abort] = None):
+        if abort is not None and abort.error is not None:
+            raise abort.error
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        if abort is not None:
+            abort._waiter = waiter
+        await waiter
+        if abort is not None and abort.error is not None:
+            raise abort.error
+
+    async def wait_started(self):
+        """Raises whatever opening the upstream stream raised"""
+        await asyncio.shield(self.started)
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        position = 0
+        try:
+            while True:
+                while position < len(self.items):
+                    yield self.items[position]
+                    position += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._wait()
+        finally:
+            self._unsubscribe()
+
+    async def batches(self, abort: Optional[Abort] = None) -> AsyncIterator[List[Any]]:
+        """Like subscribe(), but yields everything produced since the last batch at once"""
+        position = 0
+        try:
+            while True:
+                if abort is not None and abort.error is not None:
+                    raise abort.error
+                if position < len(self.items):
+                    batch = self.items[position:]
+                    position += len(batch)
+                    yield batch
+                    continue
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._wait(abort)
+        finally:
+            self._unsubscribe()
+
+    def leave(self):
+        """Drop a subscriber that joined but will never iterate"""
+        self._unsubscribe()
+
+    def _unsubscribe(self):
+        self.subscribers -= 1
+        # nobody is listening any more, stop the upstream generation
+        if self.subscribers == 0 and not self.done and self.task is not None:
+            self.cancelled = True
+            # right away, so an identical request starts afresh instead of
+            # joining a flight that is being torn down
+            if self._on_abandon is not None:
+                self._on_abandon(self)
+            self.task.cancel()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        self.generations = 0
+        self.coalesced = 0
+
+    def join(self, key: str, open_stream: Callable[[], Awaitable[AsyncIterator[Any]]]) -> Flight:
+        """Attach to the running flight for key, or start one with open_stream()"""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = Flight(key, self._forget)
+            self._flights[key] = flight
+            flight.task = asyncio.get_running_loop().create_task(self._run(flight, open_stream))
+            self.generations += 1
+        else:
+            self.coalesced += 1
+        flight.subscribers += 1
+        return flight
+
+    async def _run(self, flight: Flight, open_stream):
+        try:
+            stream = await open_stream()
+            flight.started.set_result(None)
+            async for item in stream:
+                flight.items.append(item)
+                flight._notify()
+        except asyncio.CancelledError:
+            # anyone still attached sees an error, never a reply that just stops
+            error = StreamingError("Generation was cancelled")
+            if not flight.started.done():
+                flight.started.set_exception(error)
+                # retrieved or not, nobody has to be told twice
+                flight.started.exception()
+            else:
+                flight.error = error
+            raise
+        except Exception as e:
+            if not flight.started.done():
+                flight.started.set_exception(e)
+            else:
+                flight.error = e
+        finally:
+            flight.done = True
+            self._forget(flight)
+            flight._notify()
+
+    def _forget(self, flight: Flight):
+        # a newer flight for the same key may already be running
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "generations": self.generations,
+            "generations_saved": self.coalesced,
+            "in_flight": self.in_flight(),
+        }
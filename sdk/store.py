@@ -0,0 +1,149 @@
+import sqlite3
+import sys
+import threading
+import uuid
+from typing import Dict, Iterator, List, Optional
+
+"""
+compact message records and where conversations are kept: in memory only,
+or appended to SQLite so they survive restarts and only the recent window
+has to be held in RAM
+"""
+
+
+class Message:
+    """One turn of a conversation
+
+    Slotted, with the role interned, so a message costs little more than
+    its text. Reads like the {"role", "content"} dict it replaces.
+    """
+
+    __slots__ = ("role", "content", "tokens")
+
+    def __init__(self, role: str, content: str, tokens: int):
+        self.role = sys.intern(role)
+        self.content = content
+        self.tokens = tokens
+
+    def __getitem__(self, key: str) -> str:
+        if key == "role":
+            return self.role
+        if key == "content":
+            return self.content
+        raise KeyError(key)
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"role": self.role, "content": self.content}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Message):
+            return self.role == other.role and self.content == other.content
+        if isinstance(other, dict):
+            return other == self.to_dict()
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Message({self.role!r}, {self.content[:40]!r})"
+
+
+def new_conversation_id() -> str:
+    return uuid.uuid4().hex
+
+
+class ConversationStore:
+    """Keeps nothing beyond the Conversation's own messages
+
+    Subclasses persist every appended message. window is the number of most
+    recent messages a Conversation loads and keeps in memory (None for
+    all); older ones stay in the store.
+    """
+
+    window: Optional[int] = None
+
+    def append(self, conversation_id: str, message: Message):
+        pass
+
+    def load(self, conversation_id: str, limit: Optional[int] = None) -> List[Message]:
+        """The last limit messages, oldest first"""
+        return []
+
+    def iter_messages(self, conversation_id: str) -> Iterator[Message]:
+        return iter(())
+
+    def conversations(self) -> List[str]:
+        return []
+
+    def delete(self, conversation_id: str):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteStore(ConversationStore):
+    """Append-only message log in a SQLite file
+
+    Messages are only ever inserted; nothing is rewritten when the in-memory
+    window slides or the history is cleared (a cleared conversation gets a
+    new id), so every append is one small write.
+    """
+
+    def __init__(self, path: str, window: Optional[int] = 200):
+        self.path = path
+        self.window = window
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "conversation TEXT NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL, "
+            "tokens INTEGER NOT NULL)")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS messages_by_conversation ON messages (conversation, seq)")
+        self._db.commit()
+
+    def append(self, conversation_id: str, message: Message):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO messages (conversation, role, content, tokens) VALUES (?, ?, ?, ?)",
+                (conversation_id, message.role, message.content, message.tokens))
+            self._db.commit()
+
+    def load(self, conversation_id: str, limit: Optional[int] = None) -> List[Message]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT role, content, tokens FROM messages WHERE conversation = ? "
+                "ORDER BY seq DESC LIMIT ?",
+                (conversation_id, -1 if limit is None else limit)).fetchall()
+        return [Message(*row) for row in reversed(rows)]
+
+    def iter_messages(self, conversation_id: str) -> Iterator[Message]:
+        """Every message of the conversation, read in pages"""
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT seq, role, content, tokens FROM messages "
+                    "WHERE conversation = ? AND seq > ? ORDER BY seq LIMIT 256",
+                    (conversation_id, last)).fetchall()
+            if not rows:
+                return
+            for seq, role, content, tokens in rows:
+                yield Message(role, content, tokens)
+            last = rows[-1][0]
+
+    def conversations(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                "SELECT DISTINCT conversation FROM messages")]
+
+    def delete(self, conversation_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM messages WHERE conversation = ?", (conversation_id,))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
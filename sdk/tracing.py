@@ -0,0 +1,123 @@
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+"""
+timing spans for following one chat turn through the client and the server,
+the trace id travels in the X-Trace-Id header
+"""
+
+TRACE_HEADER = "X-Trace-Id"
+PARENT_SPAN_HEADER = "X-Parent-Span-Id"
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class Span:
+    """One timed phase of a request
+
+    start and end are time.perf_counter() values, timestamp is the wall
+    clock time the span started at, for lining up client and server spans.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "timestamp", "start", "end",
+                 "attributes", "_tracer")
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str,
+                 parent_id: Optional[str] = None, start: Optional[float] = None,
+                 **attributes):
+        self._tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = new_id()
+        self.parent_id = parent_id
+        now = time.perf_counter()
+        self.start = now if start is None else start
+        self.timestamp = time.time() - (now - self.start)
+        self.end: Optional[float] = None
+        self.attributes: Dict[str, Any] = attributes
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self, end: Optional[float] = None):
+        if self.end is None:
+            self.end = time.perf_counter() if end is None else end
+            self._tracer.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "trace_id": self.trace_id, "span_id": self.span_id,
+                "parent_id": self.parent_id, "timestamp": self.timestamp,
+                "duration": self.duration, "attributes": dict(self.attributes)}
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.finish()
+
+
+class Tracer:
+    """Creates spans and receives them once they finish
+
+    The base class drops finished spans; subclass it and override export()
+    to send them elsewhere (a log, a file, an OpenTelemetry exporter).
+    """
+
+    def span(self, name: str, parent: Optional[Span] = None, trace_id: Optional[str] = None,
+             parent_id: Optional[str] = None, **attributes) -> Span:
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        return Span(self, name, trace_id or new_id(), parent_id, **attributes)
+
+    def record(self, name: str, parent: Span, start: float, end: float, **attributes) -> Span:
+        """Add a span for an interval that was measured without a context manager"""
+        span = Span(self, name, parent.trace_id, parent.span_id, start=start, **attributes)
+        span.finish(end)
+        return span
+
+    def export(self, span: Span):
+        pass
+
+
+class RecordingTracer(Tracer):
+    """Keeps the last max_spans finished spans in memory"""
+
+    def __init__(self, max_spans: int = 10000):
+        self._spans: Deque[Span] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    def spans(self, trace_id: Optional[str] = None) -> List[Span]:
+        with self._lock:
+            return [s for s in self._spans if trace_id is None or s.trace_id == trace_id]
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+class LoggingTracer(Tracer):
+    """Logs every finished span with its duration"""
+
+    def __init__(self, logger=None):
+        from .utils import SDKLogger
+        self.logger = logger or SDKLogger("hi_trace")
+
+    def export(self, span: Span):
+        attributes = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+        self.logger.info(f"trace={span.trace_id} span={span.name} "
+                         f"{span.duration * 1000:.1f}ms {attributes}".rstrip())
@@ -0,0 +1,191 @@
+from typing import Dict, Any, Callable, Optional, Tuple
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+"""
+connection pooling shared by the clients and the server's upstream calls
+"""
+
+
+class PoolConfig:
+    """Connection pool settings for the requests and httpx transports
+
+    Timeouts are in seconds, None means no limit; keep_alive applies to
+    both. The limits map onto what each transport can enforce:
+
+    requests (HiClient): max_connections_per_host connections are pooled per
+    host, a hard cap only with block, which makes a request wait for a free
+    one instead of opening a throwaway connection. max_connections is the
+    number of host pools kept; there is no cap on the total and idle
+    connections stay open until the server closes them (no
+    keepalive_expiry).
+
+    httpx (AsyncHiClient, the server's upstream): max_connections caps all
+    open connections and a request always waits for a free one, idle ones
+    are closed after keepalive_expiry. There is no per-host cap,
+    max_connections_per_host and block do not apply.
+    """
+
+    def __init__(self, max_connections: int = 10, max_connections_per_host: int = 10,
+                 keep_alive: bool = True, keepalive_expiry: float = 5.0,
+                 connect_timeout: Optional[float] = 5.0, read_timeout: Optional[float] = None,
+                 block: bool = False):
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.keep_alive = keep_alive
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.block = block
+
+    @property
+    def timeout(self) -> Tuple[Optional[float], Optional[float]]:
+        """(connect, read) timeout tuple in the form requests expects"""
+        return (self.connect_timeout, self.read_timeout)
+
+
+class _ConnectionCounter:
+    """Counts requests and TCP connects made through one pool"""
+
+    def __init__(self, on_connect: Optional[Callable[[float], None]] = None):
+        self.requests = 0
+        self.connections_opened = 0
+        # called with the seconds each TCP connect took, on the connecting thread
+        self.on_connect = on_connect
+        self._lock = threading.Lock()
+
+    def request_sent(self):
+        with self._lock:
+            self.requests += 1
+
+    def connected(self, seconds: Optional[float] = None):
+        with self._lock:
+            self.connections_opened += 1
+        if seconds is not None and self.on_connect is not None:
+            self.on_connect(seconds)
+
+    # httpx hooks, connects are reported through httpcore's trace extension
+    async def on_request(self, request: httpx.Request):
+        self.request_sent()
+        request.extensions["trace"] = self._trace if self.on_connect is None else self._timed_trace()
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]):
+        if event_name == "connection.connect_tcp.complete":
+            self.connected()
+
+    def _timed_trace(self):
+        started = [0.0]
+
+        async def trace(event_name: str, info: Dict[str, Any]):
+            if event_name == "connection.connect_tcp.started":
+                started[0] = time.perf_counter()
+            elif event_name == "connection.connect_tcp.complete":
+                self.connected(time.perf_counter() - started[0])
+        return trace
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose urllib3 connections report every (re)connect"""
+
+    def __init__(self, counter: _ConnectionCounter, **kwargs):
+        self.counter = counter
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        counter = self.counter
+
+        class CountingHTTPConnection(HTTPConnection):
+            def connect(self):
+                started = time.perf_counter()
+                super().connect()
+                counter.connected(time.perf_counter() - started)
+
+        class CountingHTTPSConnection(HTTPSConnection):
+            def connect(self):
+                started = time.perf_counter()
+                super().connect()
+                counter.connected(time.perf_counter() - started)
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": type("CountingHTTPConnectionPool", (HTTPConnectionPool,),
+                         {"ConnectionCls": CountingHTTPConnection}),
+            "https": type("CountingHTTPSConnectionPool", (HTTPSConnectionPool,),
+                          {"ConnectionCls": CountingHTTPSConnection}),
+        }
+
+    def send(self, request, *args, **kwargs):
+        self.counter.request_sent()
+        return super().send(request, *args, **kwargs)
+
+
+def build_session(config: PoolConfig,
+                  on_connect: Optional[Callable[[float], None]] = None) -> requests.Session:
+    session = requests.Session()
+    adapter = _CountingAdapter(_ConnectionCounter(on_connect),
+                               pool_connections=config.max_connections,
+                               pool_maxsize=config.max_connections_per_host,
+                               pool_block=config.block)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not config.keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def session_pool_stats(session: requests.Session) -> Dict[str, Any]:
+    """Requests sent vs. TCP connections opened by a pooled session"""
+    counters = {id(a.counter): a.counter for a in session.adapters.values()
+                if isinstance(a, _CountingAdapter)}
+    idle = 0
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None and pool.pool is not None:
+                idle += pool.pool.qsize()
+    stats = _summarize(counters.values())
+    stats["idle_connections"] = idle
+    return stats
+
+
+class CountingAsyncClient(httpx.AsyncClient):
+    """httpx.AsyncClient that counts its requests and TCP connects"""
+
+    def __init__(self, counter: _ConnectionCounter, **kwargs):
+        super().__init__(event_hooks={"request": [counter.on_request]}, **kwargs)
+        self.counter = counter
+
+
+def build_async_client(config: PoolConfig, on_connect: Optional[Callable[[float], None]] = None,
+                       **kwargs) -> CountingAsyncClient:
+    limits = httpx.Limits(
+        max_connections=config.max_connections,
+        max_keepalive_connections=config.max_connections if config.keep_alive else 0,
+        keepalive_expiry=config.keepalive_expiry)
+    timeout = httpx.Timeout(config.read_timeout, connect=config.connect_timeout,
+                            pool=None)
+    return CountingAsyncClient(_ConnectionCounter(on_connect), limits=limits, timeout=timeout,
+                               **kwargs)
+
+
+def async_client_pool_stats(client: httpx.AsyncClient) -> Dict[str, Any]:
+    """Requests sent vs. TCP connections opened, zeros for a client built elsewhere"""
+    counters = [client.counter] if isinstance(client, CountingAsyncClient) else []
+    return _summarize(counters)
+
+
+def _summarize(counters) -> Dict[str, int]:
+    requests_total = sum(c.requests for c in counters)
+    connections = sum(c.connections_opened for c in counters)
+    return {
+        "requests": requests_total,
+        "connections_opened": connections,
+        "reused_requests": max(requests_total - connections, 0),
+    }
@@ -1,6 +1,7 @@
 import logging
-from typing import List, Optional, Dict, Any
-import time
+
+# Metrics used to live here, existing imports keep working
+from .metrics import Metrics, RequestTimer  # noqa: F401
 
 
 class SDKLogger:
@@ -9,6 +10,9 @@ class SDKLogger:
         self._setup_logger()
 
     def _setup_logger(self):
+        # loggers are shared by name, every client would add another handler
+        if self.logger.handlers:
+            return
         handler = logging.StreamHandler()
         formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -28,43 +32,3 @@ class SDKLogger:
 
     def warning(self, message: str):
         self.logger.warning(message)
-
-
-class Metrics:
-    def __init__(self):
-        self.latencies: List[float] = []
-        self.token_counts: List[int] = []
-        self.start_time: Optional[float] = None
-
-    def start_request(self):
-        self.start_time = time.time()
-
-    def end_request(self) -> float:
-        if self.start_time is None:
-            return 0.0
-        latency = time.time() - self.start_time
-        self.latencies.append(latency)
-        self.start_time = None
-        return latency
-
-    def record_tokens(self, count: int):
-        self.token_counts.append(count)
-
-    def get_average_latency(self) -> float:
-        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
-
-    def get_total_tokens(self) -> int:
-        return sum(self.token_counts)
-
-    def get_metrics(self) -> Dict[str, Any]:
-        return {
-            "average_latency": self.get_average_latency(),
-            "total_tokens": self.get_total_tokens(),
-            "request_count": len(self.latencies),
-            "tokens_per_request": self.get_total_tokens() / len(self.token_counts) if self.token_counts else 0
-        }
-
-    def reset(self):
-        self.latencies = []
-        self.token_counts = []
-        self.start_time = None
@@ -7,9 +7,10 @@ setup(
     author='Your Name',
     author_email='psven595@gmail.com',
     url='https://github.com/svenplb/hi-sdk',
-    packages=find_packages(),
+    packages=find_packages(exclude=('benchmarks',)),
     install_requires=[
         'requests',
+        'httpx',
         'fastapi',
         'uvicorn',
         'click',
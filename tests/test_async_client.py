@@ -0,0 +1,100 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock
+
+import httpx
+
+from sdk.async_client import AsyncHiClient
+from sdk.exceptions import InvalidConfigError, ConnectionError, CallbackError
+from sdk.protocol import token_frame, done_frame
+
+
+def frames(*tokens: str, **usage) -> bytes:
+    return ("".join(token_frame(t) for t in tokens) + done_frame(usage)).encode()
+
+
+def make_client(handler, **kwargs):
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client = AsyncHiClient(http_client=http, **kwargs)
+    client.load_model("qwen:1.8b")
+    return client
+
+
+class TestAsyncClient(unittest.IsolatedAsyncioTestCase):
+    """Test suite for the AsyncHiClient SDK"""
+
+    async def test_stream_tokens(self):
+        """Should yield the streamed body and fire sync and async callbacks"""
+        def handler(request):
+            return httpx.Response(200, content=frames("Hello", " there"))
+
+        received = []
+
+        async def on_token(token):
+            received.append(token)
+
+        on_response = MagicMock()
+        async with make_client(handler) as client:
+            client.register_callback("on_token", on_token)
+            client.register_callback("on_response", on_response)
+            tokens = [token async for token in client.stream("Hi")]
+
+        self.assertEqual("".join(tokens), "Hello there")
+        self.assertEqual(received, tokens)
+        on_response.assert_called_once_with("Hello there")
+
+    async def test_concurrent_chats(self):
+        """Should run many chats concurrently on one event loop"""
+        async def handler(request):
+            await asyncio.sleep(0.1)
+            return httpx.Response(200, content=frames("pong"))
+
+        async with make_client(handler) as client:
+            start = time.time()
+            results = await asyncio.gather(
+                *(client.chat(f"ping {i}") for i in range(200)))
+            elapsed = time.time() - start
+
+        self.assertEqual(results, ["pong"] * 200)
+        self.assertLess(elapsed, 5)
+
+    async def test_conversation_tracking(self):
+        def handler(request):
+            return httpx.Response(200, content=frames("Hi!"))
+
+        async with make_client(handler, track_conversation=True) as client:
+            await client.chat("Hello")
+            self.assertEqual(len(client.conversation.messages), 2)
+
+    async def test_empty_message(self):
+        async with make_client(lambda request: httpx.Response(200)) as client:
+            with self.assertRaises(InvalidConfigError):
+                await client.chat("")
+
+    async def test_callback_error(self):
+        def handler(request):
+            return httpx.Response(200, content=b"Hello")
+
+        def on_request(message):
+            raise ValueError("boom")
+
+        on_error = MagicMock()
+        async with make_client(handler) as client:
+            client.register_callback("on_request", on_request)
+            client.register_callback("on_error", on_error)
+            with self.assertRaises(CallbackError):
+                await client.chat("Hello")
+        self.assertTrue(on_error.called)
+
+    async def test_connection_error(self):
+        """Test that connection errors are properly handled"""
+        client = AsyncHiClient(base_url="http://localhost:9999")
+        client.load_model("qwen:1.8b")
+        async with client:
+            with self.assertRaises(ConnectionError):
+                await client.chat("Test message")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+import httpx
+from click.testing import CliRunner
+
+import main
+from sdk import fake_ollama
+from sdk.bench import BenchConfig, run_bench
+from sdk.cli import cli
+
+
+class TestBench(unittest.TestCase):
+    """Load generator against the server backed by a fake Ollama"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.ollama_app = fake_ollama.create_app(tokens_per_second=200, error_rate=0.0)
+        cls.ollama = fake_ollama.BackgroundServer(cls.ollama_app).start()
+        cls.url_patch = patch.object(main, "OLLAMA_URL", cls.ollama.url)
+        cls.url_patch.start()
+        cls.jobs_patch = patch.object(main, "JOBS_PATH", ":memory:")
+        cls.jobs_patch.start()
+        cls.server = fake_ollama.BackgroundServer(main.app).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        cls.jobs_patch.stop()
+        cls.url_patch.stop()
+        cls.ollama.stop()
+
+    def test_closed_loop(self):
+        config = BenchConfig(url=self.server.url, concurrency=2, duration=30,
+                             max_requests=6, unique=True, seed=1)
+        report = asyncio.run(run_bench(config)).to_dict()
+        self.assertEqual(report["requests"], 6)
+        self.assertEqual(report["ok"], 6)
+        self.assertGreater(report["tokens_per_second"], 0)
+        self.assertGreater(report["time_to_first_token"]["p50"], 0)
+        self.assertLessEqual(report["time_to_first_token"]["p99"], report["latency"]["p99"])
+
+    def test_open_loop_rate(self):
+        config = BenchConfig(url=self.server.url, concurrency=4, duration=1.0, rate=5,
+                             unique=True)
+        report = asyncio.run(run_bench(config))
+        # five starts per second, the first one at t=0
+        self.assertIn(report.requests, (5, 6))
+
+    def test_server_errors_are_reported(self):
+        config = BenchConfig(url=self.server.url, model="llama3:70b", max_requests=3)
+        report = asyncio.run(run_bench(config))
+        self.assertEqual(report.errors, {"http_422": 3})
+
+    def test_cli_json(self):
+        result = CliRunner().invoke(cli, ["bench", "--url", self.server.url, "--requests", "2",
+                                          "--concurrency", "1", "--json", "--prompt", "hi"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('"ok": 2', result.output)
+
+
+class TestFakeOllama(unittest.TestCase):
+
+    def test_error_injection(self):
+        app = fake_ollama.create_app(error_rate=1.0)
+        with fake_ollama.BackgroundServer(app) as server:
+            response = httpx.post(f"{server.url}/api/generate",
+                                  json={"model": "qwen:0.5b", "prompt": "hi"})
+        self.assertEqual(response.status_code, 500)
+
+    def test_startup_and_first_token_delay(self):
+        app = fake_ollama.create_app(startup_delay=0.2, first_token_delay=0.1,
+                                     tokens_per_second=0)
+        started = time.perf_counter()
+        with fake_ollama.BackgroundServer(app) as server:
+            self.assertGreaterEqual(time.perf_counter() - started, 0.2)
+            started = time.perf_counter()
+            httpx.post(f"{server.url}/api/generate", json={"model": "qwen:0.5b", "prompt": "hi"})
+            self.assertGreaterEqual(time.perf_counter() - started, 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import json
+import os
+import tempfile
+import unittest
+
+from benchmarks import harness
+from benchmarks.__main__ import main
+
+
+class TestBenchmarks(unittest.TestCase):
+    """The micro-benchmark harness; timings themselves are not asserted"""
+
+    def test_every_benchmark_runs(self):
+        results = harness.run(min_time=0.001, repeat=1)
+        names = [r.name for r in results]
+        self.assertIn("client.chat[tokens=2048]", names)
+        self.assertIn("server.build_prompt[history=512]", names)
+        self.assertEqual(len(names), len(set(names)))
+        self.assertTrue(all(r.best > 0 for r in results))
+
+    def test_regressions_are_reported(self):
+        results = [harness.Result("fast", 1.0, 1.0, 1), harness.Result("slow", 2.0, 2.0, 1),
+                   harness.Result("new", 1.0, 1.0, 1)]
+        rows = harness.compare(results, {"fast": 1.1, "slow": 1.0}, threshold=0.25)
+        self.assertEqual([regressed for *_, regressed in rows], [False, True, False])
+        self.assertIn("REGRESSION", harness.format_rows(rows))
+
+    def test_save_then_compare(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.json")
+            args = ["-k", "events.emit[", "--baseline", path, "--min-time", "0.001", "--repeat", "1"]
+            self.assertEqual(main(args + ["--save"]), 0)
+            with open(path) as f:
+                stored = json.load(f)
+            self.assertEqual(len(stored["results"]), 3)
+            self.assertEqual(main(args + ["--threshold", "1000"]), 0)
+            # a baseline nothing can match
+            stored["results"] = {name: 1e-12 for name in stored["results"]}
+            with open(path, "w") as f:
+                json.dump(stored, f)
+            self.assertEqual(main(args), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
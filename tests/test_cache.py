@@ -0,0 +1,78 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from sdk.cache import ResponseCache, cache_key
+from sdk.client import HiClient
+
+
+class TestResponseCache(unittest.TestCase):
+    """LRU/TTL response cache and its use in HiClient"""
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put("a", ["1"])
+        cache.put("b", ["2"])
+        cache.get("a")
+        cache.put("c", ["3"])
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), ["1"])
+
+    def test_byte_cap(self):
+        cache = ResponseCache(max_bytes=10)
+        cache.put("a", ["12345"])
+        cache.put("b", ["678", "90"])
+        cache.put("c", ["abc"])
+        self.assertIsNone(cache.get("a"))
+        self.assertLessEqual(cache.stats()["bytes"], 10)
+        cache.put("huge", ["x" * 11])
+        self.assertIsNone(cache.get("huge"))
+
+    def test_ttl(self):
+        cache = ResponseCache(ttl=60)
+        cache.put("a", ["1"])
+        with patch("sdk.cache.time.time", return_value=time.time() + 61):
+            self.assertIsNone(cache.get("a"))
+
+    def test_disk_tier_survives_restart(self):
+        """Should answer from SQLite after the in-memory tier is gone"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.db")
+            cache = ResponseCache(path=path)
+            cache.put("a", ["Hello", " world"])
+            cache.close()
+
+            cache = ResponseCache(path=path)
+            self.assertEqual(cache.get("a"), ["Hello", " world"])
+            self.assertEqual(cache.stats()["disk_hits"], 1)
+            cache.close()
+
+    def test_key_covers_history(self):
+        base = cache_key("qwen:0.5b", {}, None, None, [], "hi")
+        self.assertNotEqual(base, cache_key("qwen:0.5b", {}, None, None,
+                                            [{"role": "user", "content": "x"}], "hi"))
+        self.assertNotEqual(base, cache_key("qwen:1.8b", {}, None, None, [], "hi"))
+        self.assertEqual(base, cache_key("qwen:0.5b", None, None, None, [], "hi"))
+
+    def test_client_replays_hits(self):
+        """A cache hit should stream through on_token without a request"""
+        cache = ResponseCache()
+        client = HiClient(cache=cache)
+        client.load_model("qwen:0.5b")
+        payload = client._build_payload("Hello")
+        cache.put(client._cache_key(payload), ["Hi", " there"])
+
+        on_token = MagicMock()
+        client.register_callback("on_token", on_token)
+        client._post_chat = MagicMock()
+
+        self.assertEqual(client.chat("Hello"), "Hi there")
+        self.assertEqual(on_token.call_count, 2)
+        client._post_chat.assert_not_called()
+        self.assertEqual(cache.stats()["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from sdk.cache import ResponseCache
+from sdk.client import HiClient
+from sdk.events import EventBus
+
+
+class TestEventBus(unittest.TestCase):
+
+    def test_multiple_subscribers(self):
+        bus = EventBus()
+        first, second = MagicMock(return_value=1), MagicMock(return_value=2)
+        bus.subscribe("on_token", first)
+        subscription = bus.subscribe("on_token", second)
+        self.assertEqual(bus.emit("on_token", "hi"), [1, 2])
+        bus.unsubscribe(subscription)
+        bus.emit("on_token", "there")
+        self.assertEqual(first.call_count, 2)
+        self.assertEqual(second.call_count, 1)
+        self.assertEqual(bus.emit("on_nothing"), [])
+
+    def test_threaded_delivery_does_not_block(self):
+        bus = EventBus()
+        received = []
+
+        def slow(token):
+            time.sleep(0.05)
+            received.append(token)
+
+        subscription = bus.subscribe("on_token", slow, threaded=True)
+        started = time.perf_counter()
+        for i in range(5):
+            bus.emit("on_token", str(i))
+        self.assertLess(time.perf_counter() - started, 0.05)
+        subscription.close()
+        self.assertEqual(received, ["0", "1", "2", "3", "4"])
+
+    def test_overflow_policies(self):
+        for policy, expected in (("drop_newest", ["0", "1"]), ("drop_oldest", ["0", "3"])):
+            bus = EventBus()
+            gate = threading.Event()
+            received = []
+
+            def blocked(token):
+                gate.wait(2)
+                received.append(token)
+
+            subscription = bus.subscribe("on_token", blocked, threaded=True, queue_size=1,
+                                         overflow=policy)
+            bus.emit("on_token", "0")
+            # "0" is being delivered, the queue has room for one more
+            time.sleep(0.05)
+            for token in ("1", "2", "3"):
+                bus.emit("on_token", token)
+            gate.set()
+            subscription.close()
+            self.assertEqual(received, expected, policy)
+            self.assertEqual(subscription.dropped, 2)
+
+    def test_batched_tokens(self):
+        bus = EventBus()
+        batches = []
+        bus.subscribe("on_token", batches.append, batch_size=3)
+        for token in "abcdefg":
+            bus.emit("on_token", token)
+        self.assertEqual(batches, ["abc", "def"])
+        bus.flush("on_token")
+        self.assertEqual(batches, ["abc", "def", "g"])
+
+    def test_batch_interval(self):
+        bus = EventBus()
+        batches = []
+        bus.subscribe("on_token", batches.append, batch_interval=0.05)
+        bus.emit("on_token", "a")
+        bus.emit("on_token", "b")
+        time.sleep(0.06)
+        bus.emit("on_token", "c")
+        self.assertEqual(batches, ["abc"])
+
+    def test_batch_interval_without_more_tokens(self):
+        """A threaded subscriber gets the last tokens of a pause without waiting for the next"""
+        bus = EventBus()
+        delivered = threading.Event()
+        batches = []
+
+        def receive(batch):
+            batches.append(batch)
+            delivered.set()
+        bus.subscribe("on_token", receive, threaded=True, batch_interval=0.05)
+        bus.emit("on_token", "a")
+        bus.emit("on_token", "b")
+        self.assertTrue(delivered.wait(1))
+        self.assertEqual(batches, ["ab"])
+        bus.close()
+
+
+class TestClientEvents(unittest.TestCase):
+
+    def client(self) -> HiClient:
+        cache = ResponseCache()
+        client = HiClient(cache=cache)
+        client.load_model("qwen:0.5b")
+        cache.put(client._cache_key(client._build_payload("Hello")), ["a ", "b ", "c ", "d ", "e "])
+        return client
+
+    def test_register_callback_replaces(self):
+        client = self.client()
+        first, second, extra = MagicMock(), MagicMock(), MagicMock()
+        client.register_callback("on_response", first)
+        client.register_callback("on_response", second)
+        client.subscribe("on_response", extra)
+        client.chat("Hello")
+        first.assert_not_called()
+        second.assert_called_once_with("a b c d e ")
+        extra.assert_called_once_with("a b c d e ")
+
+    def test_batched_and_threaded_token_subscribers(self):
+        client = self.client()
+        batches, tokens = [], []
+        client.subscribe("on_token", batches.append, batch_size=2)
+        threaded = client.subscribe("on_token", tokens.append, threaded=True)
+        client.chat("Hello")
+        # the odd token is flushed when the reply ends
+        self.assertEqual(batches, ["a b ", "c d ", "e "])
+        threaded.close()
+        self.assertEqual(tokens, ["a ", "b ", "c ", "d ", "e "])
+
+
+if __name__ == "__main__":
+    unittest.main()
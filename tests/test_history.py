@@ -0,0 +1,74 @@
+import unittest
+
+from sdk.client import Conversation, HiClient
+from sdk.history import ContextBudget, BackgroundCompactor, estimate_tokens, trim_history
+
+
+class TestConversationBudget(unittest.TestCase):
+    """Token budget and compaction of the conversation history"""
+
+    def test_unbounded_by_default(self):
+        conversation = Conversation()
+        for i in range(100):
+            conversation.add_message("user", "x" * 400)
+        self.assertEqual(len(conversation.messages), 100)
+
+    def test_evicts_oldest_over_budget(self):
+        """Should keep the running token total under the budget"""
+        budget = ContextBudget(max_tokens=500, reserve_tokens=100)
+        conversation = Conversation(budget)
+        for i in range(20):
+            conversation.add_message("user", f"{i} " + "x" * 100)
+
+        self.assertLessEqual(conversation.total_tokens, 400)
+        self.assertEqual(conversation.total_tokens, sum(
+            estimate_tokens(m["content"]) for m in conversation.messages))
+        self.assertTrue(conversation.messages[-1]["content"].startswith("19 "))
+
+    def test_system_prompt_is_pinned(self):
+        client = HiClient(track_conversation=True,
+                          context_budget=ContextBudget(max_tokens=300, reserve_tokens=0))
+        client.load_model("qwen:0.5b")
+        for _ in range(10):
+            client.conversation.add_message("user", "x" * 100)
+        without_prompt = len(client.conversation.messages)
+
+        client.set_system_prompt("y" * 400)
+        self.assertLess(len(client.conversation.messages), without_prompt)
+        self.assertLessEqual(client.conversation.total_tokens + client.conversation.pinned_tokens, 300)
+
+    def test_sliding_window(self):
+        conversation = Conversation(ContextBudget(max_messages=4))
+        for i in range(10):
+            conversation.add_message("user", str(i))
+        self.assertEqual([m["content"] for m in conversation.messages], ["6", "7", "8", "9"])
+
+    def test_background_compaction(self):
+        """Evicted turns should come back as a pinned summary"""
+        seen = []
+
+        def summarize(previous, messages):
+            seen.extend(messages)
+            return f"{len(seen)} messages summarized"
+
+        compactor = BackgroundCompactor(summarize)
+        conversation = Conversation(ContextBudget(max_messages=2), compactor)
+        for i in range(5):
+            conversation.add_message("user", str(i))
+        compactor.shutdown(wait=True)
+
+        self.assertEqual([m["content"] for m in seen], ["0", "1", "2"])
+        history = conversation.get_history()
+        self.assertEqual(history[0]["role"], "system")
+        self.assertIn("3 messages summarized", history[0]["content"])
+        self.assertEqual(len(history), 3)
+
+    def test_trim_history(self):
+        history = [{"role": "user", "content": "x" * 40} for _ in range(10)]
+        trimmed = trim_history(history, limit=estimate_tokens("x" * 40) * 3)
+        self.assertEqual(len(trimmed), 3)
+        self.assertEqual(trim_history(history, limit=0), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
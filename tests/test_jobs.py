@@ -0,0 +1,133 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+from sdk.exceptions import JobRestartedError
+from sdk.jobs import JobQueue, JobStore
+
+
+class TestJobQueue(unittest.IsolatedAsyncioTestCase):
+    """Background jobs persisted in SQLite"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "jobs.db")
+        self.calls = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    async def generate(self, request):
+        """Writes the words of request["message"]"""
+        self.calls.append(request["message"])
+        words = [w + " " for w in request["message"].split()]
+        for word in words:
+            if word == "STOP " and len(self.calls) == 1:
+                # stands in for a generation that hangs until the process dies
+                await asyncio.Event().wait()
+            await asyncio.sleep(0.005)
+            yield word, None
+        yield "", {"eval_count": len(words)}
+
+    async def queue(self, **kwargs) -> JobQueue:
+        queue = JobQueue(JobStore(self.path), self.generate, flush_interval=0.01, **kwargs)
+        await queue.start()
+        self.addAsyncCleanup(queue.stop)
+        return queue
+
+    async def wait(self, queue: JobQueue, job_id: str, offset: int = 0) -> str:
+        return "".join([text async for text, _ in queue.follow(job_id, offset)])
+
+    async def wait_attempt(self, queue: JobQueue, job_id: str, offset: int, attempt: int):
+        async for _ in queue.follow(job_id, offset, attempt):
+            pass
+
+    async def test_runs_job(self):
+        queue = await self.queue()
+        job_id = queue.submit({"message": "one two three"})
+        self.assertEqual(await self.wait(queue, job_id), "one two three ")
+        job = queue.get(job_id)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["usage"], {"eval_count": 3})
+        self.assertEqual(await self.wait(queue, job_id, offset=4), "two three ")
+
+    async def test_priority_order(self):
+        store = JobStore(self.path)
+        queue = JobQueue(store, self.generate)
+        low = queue.submit({"message": "low"})
+        high = queue.submit({"message": "high"}, priority=5)
+        store.close()
+        queue = await self.queue()
+        await self.wait(queue, low)
+        self.assertEqual(self.calls, ["high", "low"])
+        self.assertEqual(queue.get(high)["status"], "done")
+
+    async def test_starts_over_after_restart(self):
+        queue = await self.queue()
+        job_id = queue.submit({"message": "one two STOP three"})
+        seen = ""
+        async for text, attempt in queue.follow(job_id):
+            seen += text
+            if seen == "one two ":
+                break
+        await queue.stop()
+        queue.store.close()
+        self.assertEqual(JobStore(self.path).get(job_id)["status"], "running")
+
+        queue = await self.queue()
+        # a reader of the first attempt is told to start over
+        with self.assertRaises(JobRestartedError):
+            await self.wait_attempt(queue, job_id, len(seen), attempt)
+        self.assertEqual(await self.wait(queue, job_id), "one two STOP three ")
+        self.assertEqual(self.calls, ["one two STOP three"] * 2)
+        self.assertEqual(queue.get(job_id)["attempts"], 2)
+
+    async def test_retries_then_fails(self):
+        async def broken(request):
+            raise RuntimeError("upstream down")
+            yield
+
+        queue = JobQueue(JobStore(self.path), broken, max_attempts=2, retry_delay=0)
+        await queue.start()
+        self.addAsyncCleanup(queue.stop)
+        job_id = queue.submit({"message": "hi"})
+        await self.wait(queue, job_id)
+        job = queue.get(job_id)
+        self.assertEqual((job["status"], job["attempts"]), ("failed", 2))
+        self.assertIn("upstream down", job["error"])
+
+    async def test_retry_waits_with_idle_workers(self):
+        attempts = []
+
+        async def flaky(request):
+            if request["message"] == "hi":
+                attempts.append(time.perf_counter())
+                if len(attempts) == 1:
+                    raise RuntimeError("upstream down")
+            yield "ok", {}
+
+        queue = JobQueue(JobStore(self.path), flaky, workers=2, retry_delay=0.2)
+        await queue.start()
+        self.addAsyncCleanup(queue.stop)
+        job_id = queue.submit({"message": "hi"})
+        await asyncio.sleep(0.05)
+        # wakes the idle worker while the failed job waits for its retry
+        queue.submit({"message": "other"})
+        self.assertEqual(await self.wait(queue, job_id), "ok")
+        self.assertGreaterEqual(attempts[1] - attempts[0], 0.2)
+
+    async def test_cancel(self):
+        queue = await self.queue()
+        job_id = queue.submit({"message": "one STOP"})
+        await asyncio.sleep(0.05)
+        self.assertTrue(await queue.cancel(job_id))
+        self.assertEqual(await self.wait(queue, job_id), "one ")
+        self.assertEqual(queue.get(job_id)["status"], "cancelled")
+        self.assertFalse(await queue.cancel(job_id))
+        self.assertEqual(queue.stats()["active"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from sdk import fake_ollama
+from sdk.client import HiClient
+from sdk.async_client import AsyncHiClient
+from sdk.exceptions import InvalidConfigError
+from sdk.protocol import MEDIA_TYPE, token_frame, done_frame
+
+
+def slow_server(tokens: int = 10, delay: float = 0.05) -> FastAPI:
+    """Stand-in hi server that streams tokens slowly and records every message"""
+    app = FastAPI()
+    app.state.messages = []
+
+    @app.post("/chat")
+    async def chat(payload: dict):
+        app.state.messages.append(payload["message"])
+
+        async def frames():
+            for i in range(tokens):
+                await asyncio.sleep(delay)
+                yield token_frame(f"t{i} ")
+            yield done_frame({"eval_count": tokens})
+        return StreamingResponse(frames(), media_type=MEDIA_TYPE)
+
+    return app
+
+
+def wait_until(condition, timeout: float = 3.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestChatListener(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = slow_server()
+        cls.server = fake_ollama.BackgroundServer(cls.app).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.app.state.messages.clear()
+        self.client = HiClient(self.server.url)
+        self.client.load_model("qwen:0.5b")
+        self.responses = []
+        self.client.register_callback("on_response", self.responses.append)
+
+    def tearDown(self):
+        self.client.stop_continuous_chat()
+        self.client.close()
+
+    def test_pushed_input_is_answered_right_away(self):
+        """Input should not wait for the polling interval"""
+        self.client.start_continuous_chat(interval=10)
+        started = time.perf_counter()
+        self.client.push_input("Hello")
+        self.assertTrue(wait_until(lambda: self.responses))
+        self.assertLess(time.perf_counter() - started, 2)
+        self.assertEqual(self.app.state.messages, ["Hello"])
+
+    def test_on_listening_is_polled_every_interval(self):
+        """A non-blocking poll that always has input must not spin"""
+        calls = []
+
+        def listen():
+            calls.append(time.perf_counter())
+            return "Hello"
+
+        self.client.register_callback("on_listening", listen)
+        self.client.start_continuous_chat(interval=0.1, barge_in=False)
+        time.sleep(0.35)
+        self.client.stop_continuous_chat()
+        self.assertLessEqual(len(calls), 5)
+
+    def test_blocking_listener_is_polled_again_right_away(self):
+        inputs = ["Hello", "Again"]
+        answered = threading.Event()
+
+        def listen():
+            # like a recognizer that blocks until it hears the next utterance
+            if len(inputs) == 1:
+                answered.wait(3)
+            return inputs.pop(0) if inputs else None
+
+        def respond(text):
+            self.responses.append(text)
+            answered.set()
+
+        self.client.register_callback("on_listening", listen)
+        self.client.register_callback("on_response", respond)
+        self.client.start_continuous_chat(interval=10, barge_in=False, blocking_listener=True)
+        self.assertTrue(wait_until(lambda: len(self.responses) == 2))
+        self.assertEqual(self.app.state.messages, ["Hello", "Again"])
+
+    def test_inputs_during_a_reply_are_coalesced(self):
+        listener = self.client.start_continuous_chat(interval=10, barge_in=False)
+        self.client.push_input("first")
+        self.assertTrue(wait_until(lambda: self.app.state.messages))
+        self.client.push_input("second")
+        self.client.push_input("third")
+        self.assertTrue(wait_until(lambda: len(self.responses) == 2))
+        self.assertEqual(self.app.state.messages, ["first", "second third"])
+        self.assertEqual(listener.coalesced, 1)
+
+    def test_barge_in_stops_the_reply(self):
+        interrupted = []
+        first_token = threading.Event()
+        self.client.register_callback("on_interrupt", interrupted.append)
+        self.client.register_callback("on_token", lambda token: first_token.set())
+        listener = self.client.start_continuous_chat(interval=10)
+        self.client.push_input("tell me everything")
+        self.assertTrue(first_token.wait(3))
+        self.client.push_input("stop")
+        self.assertTrue(wait_until(lambda: listener.replies))
+        self.assertEqual(interrupted, ["tell me everything"])
+        self.assertEqual(self.app.state.messages, ["tell me everything", "stop"])
+        self.assertEqual((listener.interrupted, listener.replies), (1, 1))
+
+    def test_push_requires_start(self):
+        with self.assertRaises(InvalidConfigError):
+            self.client.push_input("Hello")
+
+    def test_async_barge_in(self):
+        async def run():
+            async with AsyncHiClient(self.server.url) as client:
+                client.load_model("qwen:0.5b")
+                interrupted, responses = [], []
+                client.register_callback("on_interrupt", interrupted.append)
+                client.register_callback("on_response", responses.append)
+                listener = client.start_continuous_chat()
+                client.push_input("long story")
+                await asyncio.sleep(0.1)
+                client.push_input("never mind")
+                for _ in range(300):
+                    if responses:
+                        break
+                    await asyncio.sleep(0.01)
+                return interrupted, responses, listener
+
+        interrupted, responses, listener = asyncio.run(run())
+        self.assertEqual(interrupted, ["long story"])
+        self.assertEqual(len(responses), 1)
+        self.assertEqual(self.app.state.messages[-1], "never mind")
+        self.assertEqual(listener.interrupted, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import random
+import threading
+import time
+import unittest
+
+from sdk.metrics import Histogram, Metrics
+from sdk.utils import Metrics as LegacyMetrics
+
+
+class TestHistogram(unittest.TestCase):
+    """Log-bucketed quantile sketch"""
+
+    def test_quantiles_within_relative_error(self):
+        values = [random.uniform(0.001, 10.0) for _ in range(10000)]
+        histogram = Histogram(relative_accuracy=0.01)
+        for value in values:
+            histogram.record(value)
+        values.sort()
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(histogram.quantile(q), exact, delta=exact * 0.02)
+        self.assertEqual(histogram.count, 10000)
+
+    def test_memory_is_bounded(self):
+        histogram = Histogram(relative_accuracy=0.01)
+        for i in range(100000):
+            histogram.record(0.5 + (i % 1000) / 1000)
+        # 0.5..1.5s at 1% accuracy fits into ~55 buckets
+        self.assertLess(len(histogram._buckets), 60)
+
+    def test_merge(self):
+        a, b = Histogram(), Histogram()
+        for i in range(100):
+            a.record(1.0)
+            b.record(3.0)
+        a.merge(b)
+        self.assertEqual(a.count, 200)
+        self.assertAlmostEqual(a.quantile(0.99), 3.0, delta=0.06)
+        self.assertEqual(Histogram().quantile(0.5), 0.0)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_request_timer(self):
+        """Should record latency, time to first token and throughput per model"""
+        metrics = Metrics()
+        timer = metrics.start_request("qwen:0.5b")
+        time.sleep(0.05)
+        for _ in range(5):
+            timer.token()
+            time.sleep(0.01)
+        latency = timer.finish(tokens=5)
+
+        snapshot = metrics.get_metrics()
+        self.assertEqual(snapshot["request_count"], 1)
+        self.assertEqual(snapshot["total_tokens"], 5)
+        self.assertAlmostEqual(snapshot["latency"]["p50"], latency, delta=latency * 0.02)
+        model = snapshot["models"]["qwen:0.5b"]
+        self.assertGreaterEqual(model["time_to_first_token"]["p50"], 0.04)
+        self.assertLess(model["time_to_first_token"]["p50"], latency)
+        self.assertGreater(model["inter_token_latency"]["p50"], 0.005)
+        self.assertGreater(model["tokens_per_second"]["p50"], 0)
+
+    def test_end_without_start(self):
+        self.assertEqual(Metrics().end_request(), 0.0)
+
+    def test_legacy_start_end(self):
+        metrics = LegacyMetrics()
+        metrics.start_request()
+        self.assertGreater(metrics.end_request(), 0.0)
+        self.assertEqual(metrics.end_request(), 0.0)
+        self.assertEqual(metrics.get_metrics()["request_count"], 1)
+
+    def test_concurrent_requests(self):
+        """Concurrent requests each keep their own start time"""
+        metrics = Metrics()
+
+        def run(delay):
+            timer = metrics.start_request("gemma2:2b")
+            time.sleep(delay)
+            timer.token()
+            timer.finish()
+
+        threads = [threading.Thread(target=run, args=(0.02 * (i % 2 + 1),)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        snapshot = metrics.get_metrics()["models"]["gemma2:2b"]
+        self.assertEqual(snapshot["requests"], 20)
+        self.assertGreaterEqual(snapshot["latency"]["p50"], 0.019)
+        self.assertGreaterEqual(snapshot["latency"]["p99"], 0.039)
+
+    def test_errors_are_counted(self):
+        metrics = Metrics()
+        metrics.start_request("qwen:1.8b").fail()
+        self.assertEqual(metrics.get_metrics()["models"]["qwen:1.8b"]["errors"], 1)
+        self.assertEqual(metrics.get_metrics()["request_count"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
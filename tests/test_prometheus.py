@@ -0,0 +1,46 @@
+import unittest
+
+from sdk.prometheus import Registry
+
+
+class TestPrometheus(unittest.TestCase):
+    """Text exposition of counters, gauges and histograms"""
+
+    def test_counter_and_gauge(self):
+        registry = Registry()
+        requests = registry.counter("requests_total", "Requests", ("model",))
+        in_flight = registry.gauge("in_flight", "In flight")
+        requests.labels("qwen:0.5b").inc()
+        requests.labels("qwen:0.5b").inc(2)
+        in_flight.inc()
+        in_flight.dec()
+
+        text = registry.render()
+        self.assertIn("# TYPE requests_total counter", text)
+        self.assertIn('requests_total{model="qwen:0.5b"} 3', text)
+        self.assertIn("in_flight 0", text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            latency.observe(value)
+
+        lines = registry.render().splitlines()
+        self.assertIn('latency_seconds_bucket{le="0.1"} 2', lines)
+        self.assertIn('latency_seconds_bucket{le="1"} 3', lines)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4', lines)
+        self.assertIn("latency_seconds_count 4", lines)
+        self.assertIn("latency_seconds_sum 2.65", lines)
+
+    def test_label_values_are_escaped(self):
+        registry = Registry()
+        errors = registry.counter("errors_total", "Errors", ("type",))
+        errors.labels('bad "quote"\n').inc()
+        self.assertIn('errors_total{type="bad \\"quote\\"\\n"} 1', registry.render())
+        with self.assertRaises(ValueError):
+            errors.labels("a", "b")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import asyncio
+import time
+import unittest
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from sdk import fake_ollama
+from sdk.client import HiClient
+from sdk.protocol import MEDIA_TYPE, token_frame, done_frame
+from sdk.routing import BackendPool
+
+
+def node(name: str, delay: float = 0.0, status: int = 200) -> FastAPI:
+    """Stand-in hi server that answers every chat with its own name, or with status"""
+    app = FastAPI()
+    app.state.chats = 0
+
+    @app.post("/chat")
+    async def chat(payload: dict):
+        app.state.chats += 1
+        await asyncio.sleep(delay)
+        if status != 200:
+            return JSONResponse({"detail": name}, status_code=status)
+
+        async def frames():
+            yield token_frame(name)
+            yield done_frame({"eval_count": 1})
+        return StreamingResponse(frames(), media_type=MEDIA_TYPE)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+
+class TestBackendPool(unittest.TestCase):
+
+    def test_least_outstanding(self):
+        pool = BackendPool(["http://a", "http://b"], health_interval=None)
+        a, b = pool.backends
+        self.assertIs(pool.pick(), a)
+        pool.acquire(a)
+        self.assertIs(pool.pick(), b)
+        self.assertIs(pool.pick(prefer=a), a)
+        pool.release(a)
+        self.assertEqual(a.outstanding, 0)
+
+    def test_eject_and_readmit(self):
+        pool = BackendPool(["http://a", "http://b"], failure_threshold=2, health_interval=None)
+        a, b = pool.backends
+        pool.failed(a)
+        self.assertIn(a, pool.available())
+        pool.failed(a)
+        self.assertEqual(pool.available(), [b])
+        pool.check(lambda url: url == "http://a")
+        self.assertIn(a, pool.available())
+        # b failed its check once, still below the threshold
+        self.assertIn(b, pool.available())
+
+    def test_fails_open(self):
+        pool = BackendPool(["http://a"], failure_threshold=1, health_interval=None)
+        pool.failed(pool.backends[0])
+        self.assertEqual(pool.available(), pool.backends)
+
+    def test_hedge_delay_needs_samples(self):
+        pool = BackendPool(["http://a", "http://b"], hedge=True, min_samples=5,
+                           health_interval=None)
+        self.assertIsNone(pool.hedge_delay())
+        for i in range(10):
+            pool.succeeded(pool.backends[0], 0.1 if i < 9 else 1.0)
+        self.assertAlmostEqual(pool.hedge_delay(), 0.1, delta=0.01)
+        self.assertIsNone(BackendPool(["http://a"], hedge=True).hedge_delay())
+
+
+class TestRouting(unittest.TestCase):
+    """HiClient over several stand-in servers"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.apps = [node("slow", delay=1.0), node("fast")]
+        cls.servers = [fake_ollama.BackgroundServer(app).start() for app in cls.apps]
+
+    @classmethod
+    def tearDownClass(cls):
+        for server in cls.servers:
+            server.stop()
+
+    def client(self, urls, **kwargs) -> HiClient:
+        client = HiClient(backends=BackendPool(urls, health_interval=None, **kwargs),
+                          track_conversation=True)
+        client.load_model("qwen:0.5b")
+        return client
+
+    def test_fails_over_to_live_backend(self):
+        with self.client(["http://127.0.0.1:9", self.servers[1].url]) as client:
+            self.assertEqual(client.chat("Hello"), "fast")
+            dead, live = client.backends.backends
+            self.assertEqual(dead.errors, 1)
+            self.assertEqual(live.outstanding, 0)
+
+    def test_session_affinity(self):
+        with self.client([self.servers[1].url, self.servers[0].url]) as client:
+            fast, slow = client.backends.backends
+            client.backends.acquire(fast)
+            self.assertEqual(client.chat("first"), "slow")
+            client.backends.release(fast)
+            client.backends.acquire(slow)
+            # the conversation stays where it started, although that node is busier
+            self.assertEqual(client.chat("second"), "slow")
+
+    def test_hedged_request(self):
+        with self.client([s.url for s in self.servers], hedge_after=0.1) as client:
+            started = time.perf_counter()
+            self.assertEqual(client.chat("Hurry", role="hedge"), "fast")
+            self.assertLess(time.perf_counter() - started, 0.8)
+            stats = client.backends.stats()
+            self.assertEqual(stats["hedged"], 1)
+            self.assertEqual(stats["hedge_wins"], 1)
+            # the slow answer is dropped once it arrives
+            deadline = time.monotonic() + 3
+            while client.backends.backends[0].outstanding and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(client.backends.backends[0].outstanding, 0)
+
+    def test_hedged_backend_counts_as_tried(self):
+        """When both hedged backends fail, the next attempt goes to a third one"""
+        apps = [node("down", delay=0.3, status=503), node("down", status=503)]
+        servers = [fake_ollama.BackgroundServer(app).start() for app in apps]
+        try:
+            urls = [s.url for s in servers] + [self.servers[1].url]
+            with self.client(urls, hedge_after=0.1) as client:
+                self.assertEqual(client.chat("Hello", role="hedge"), "fast")
+                self.assertEqual([app.state.chats for app in apps], [1, 1])
+                self.assertEqual(client.backends.stats()["hedged"], 1)
+        finally:
+            for server in servers:
+                server.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import asyncio
+import unittest
+
+from sdk.scheduler import ModelScheduler
+from sdk.exceptions import QueueFullError
+
+
+class TestModelScheduler(unittest.IsolatedAsyncioTestCase):
+    """Admission control and ordering of queued generations"""
+
+    async def run_queued(self, scheduler, requests):
+        """Hold the only slot, queue requests, then record the grant order"""
+        order = []
+        blocker = await scheduler.acquire("qwen:0.5b")
+
+        async def request(model, priority, name):
+            async with scheduler.slot(model, priority):
+                order.append(name)
+                await asyncio.sleep(0)
+
+        tasks = [asyncio.create_task(request(*r)) for r in requests]
+        await asyncio.sleep(0)
+        scheduler.release(blocker)
+        await asyncio.gather(*tasks)
+        return order
+
+    async def test_priority_order(self):
+        scheduler = ModelScheduler()
+        order = await self.run_queued(scheduler, [
+            ("qwen:0.5b", 0, "low"), ("qwen:0.5b", 5, "high"), ("qwen:0.5b", 0, "low2")])
+        self.assertEqual(order, ["high", "low", "low2"])
+
+    async def test_batches_loaded_model(self):
+        """Should drain the loaded model's queue before swapping models"""
+        scheduler = ModelScheduler()
+        order = await self.run_queued(scheduler, [
+            ("gemma2:2b", 0, "g1"), ("qwen:0.5b", 0, "q1"),
+            ("gemma2:2b", 0, "g2"), ("qwen:0.5b", 0, "q2")])
+        self.assertEqual(order, ["q1", "q2", "g1", "g2"])
+        self.assertEqual(scheduler.model_switches, 1)
+
+    async def test_max_consecutive_prevents_starvation(self):
+        scheduler = ModelScheduler(max_consecutive=2)
+        order = await self.run_queued(scheduler, [
+            ("qwen:0.5b", 0, "q1"), ("gemma2:2b", 0, "g1"),
+            ("qwen:0.5b", 0, "q2"), ("qwen:0.5b", 0, "q3")])
+        self.assertEqual(order[:2], ["q1", "g1"])
+
+    async def test_queue_full(self):
+        scheduler = ModelScheduler(max_queue_depth=1)
+        await scheduler.acquire("qwen:0.5b")
+        waiter = asyncio.create_task(scheduler.acquire("qwen:0.5b"))
+        await asyncio.sleep(0)
+        with self.assertRaises(QueueFullError):
+            await scheduler.acquire("qwen:0.5b")
+        self.assertEqual(scheduler.stats()["rejected"], 1)
+        waiter.cancel()
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        scheduler = ModelScheduler()
+        ticket = await scheduler.acquire("qwen:0.5b")
+        waiter = asyncio.create_task(scheduler.acquire("qwen:0.5b"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        self.assertEqual(scheduler.waiting, 0)
+        scheduler.release(ticket)
+        self.assertEqual(scheduler.running, 0)
+
+    async def test_queue_wait_is_measured(self):
+        scheduler = ModelScheduler()
+        ticket = await scheduler.acquire("qwen:0.5b")
+        waiter = asyncio.create_task(scheduler.acquire("qwen:0.5b"))
+        await asyncio.sleep(0.05)
+        scheduler.release(ticket)
+        queued = await waiter
+        self.assertGreaterEqual(queued.wait_time, 0.04)
+        self.assertLess(ticket.wait_time, 0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
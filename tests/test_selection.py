@@ -0,0 +1,102 @@
+import unittest
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from sdk import fake_ollama
+from sdk.client import HiClient
+from sdk.models import model_size
+from sdk.protocol import MEDIA_TYPE, token_frame, done_frame
+from sdk.selection import ModelSelector
+
+MODELS = ["gemma2:2b", "qwen:0.5b", "qwen:1.8b"]
+
+
+def usage(tokens_per_second: float, eval_count: int = 50, prompt_tokens: int = 100):
+    return {"eval_count": eval_count, "eval_duration": eval_count / tokens_per_second * 1e9,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": prompt_tokens / (tokens_per_second * 5) * 1e9}
+
+
+def node(speed: float) -> FastAPI:
+    """Stand-in hi server whose models generate speed / size tokens per second"""
+    app = FastAPI()
+    app.state.models = []
+
+    @app.post("/chat")
+    async def chat(payload: dict):
+        model = payload["model"]
+        app.state.models.append(model)
+
+        async def frames():
+            yield token_frame(model)
+            yield done_frame(usage(speed / model_size(model)))
+        return StreamingResponse(frames(), media_type=MEDIA_TYPE)
+
+    return app
+
+
+class TestModelSelector(unittest.TestCase):
+
+    def test_sizes(self):
+        self.assertEqual(model_size("qwen:1.8b"), 1.8)
+        self.assertIsNone(model_size("llama3:latest"))
+        self.assertEqual(ModelSelector(MODELS).models, ["qwen:0.5b", "qwen:1.8b", "gemma2:2b"])
+
+    def test_smallest_without_budget(self):
+        selector = ModelSelector(MODELS, latency_slo=0.1)
+        self.assertEqual(selector.select(10), "qwen:0.5b")
+
+    def test_largest_that_fits(self):
+        selector = ModelSelector(MODELS, latency_slo=2.0, reply_tokens=50)
+        selector.observe("qwen:0.5b", usage(400), ttft=0.15)
+        # unmeasured models are scaled from the one that was measured
+        self.assertAlmostEqual(selector.stats()["gemma2:2b"]["tokens_per_second"], 100)
+        self.assertEqual(selector.select(50), "gemma2:2b")
+        # reading a long history costs the large model too much
+        self.assertEqual(selector.select(750), "qwen:1.8b")
+        self.assertEqual(selector.select(5000), "qwen:0.5b")
+
+    def test_measurements_override_scaling(self):
+        selector = ModelSelector(MODELS, latency_slo=2.0, reply_tokens=50)
+        selector.observe("qwen:0.5b", usage(400), ttft=0.15)
+        # gemma2 turns out far slower than its size suggests
+        selector.observe("gemma2:2b", usage(10), ttft=0.5)
+        selector.observe("qwen:1.8b", usage(100), ttft=0.2)
+        self.assertEqual(selector.select(50), "qwen:1.8b")
+        self.assertLess(selector.predict("qwen:1.8b", 50), selector.predict("gemma2:2b", 50))
+
+
+class TestAutoModel(unittest.TestCase):
+    """load_model("auto") against servers of different speed"""
+
+    def chat_twice(self, speed: float):
+        app = node(speed)
+        server = fake_ollama.BackgroundServer(app).start()
+        try:
+            client = HiClient(server.url)
+            client.load_model("auto", latency_slo=2.0)
+            self.assertEqual(client.conversation.model, "qwen:0.5b")
+            replies = [client.chat("Hello"), client.chat("Hello")]
+            self.assertEqual(client.last_model, replies[-1])
+            self.assertEqual(app.state.models, replies)
+            return replies
+        finally:
+            server.stop()
+
+    def test_fast_hardware_moves_up(self):
+        self.assertEqual(self.chat_twice(200), ["qwen:0.5b", "gemma2:2b"])
+
+    def test_slow_hardware_stays_small(self):
+        self.assertEqual(self.chat_twice(5), ["qwen:0.5b", "qwen:0.5b"])
+
+    def test_fixed_model(self):
+        client = HiClient()
+        client.load_model("auto")
+        client.load_model("qwen:1.8b")
+        self.assertFalse(client.model_manager.auto)
+        self.assertEqual(client._build_payload("Hello")["model"], "qwen:1.8b")
+
+
+if __name__ == "__main__":
+    unittest.main()
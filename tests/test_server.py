@@ -0,0 +1,454 @@
+import asyncio
+import os
+import tempfile
+import time
+from collections import deque
+import unittest
+from unittest.mock import patch
+
+import httpx
+from fastapi import FastAPI
+
+import main
+from sdk import fake_ollama
+from sdk.client import HiClient
+from sdk.exceptions import DeadlineExceededError, JobNotFoundError, JobRestartedError
+from sdk.tracing import RecordingTracer
+from sdk.protocol import parse_frame
+
+
+def text_of(response: httpx.Response) -> str:
+    return "".join(f.get("token", "") for f in map(parse_frame, response.text.splitlines()))
+
+
+class TestServer(unittest.TestCase):
+    """Test suite for the FastAPI proxy in main.py, backed by a fake Ollama"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.ollama_app = fake_ollama.create_app(
+            reply="one two three four five six seven eight", tokens_per_second=20)
+        cls.ollama = fake_ollama.BackgroundServer(cls.ollama_app).start()
+        cls.url_patch = patch.object(main, "OLLAMA_URL", cls.ollama.url)
+        cls.url_patch.start()
+        cls.jobs_patch = patch.object(main, "JOBS_PATH", ":memory:")
+        cls.jobs_patch.start()
+        cls.server = fake_ollama.BackgroundServer(main.app).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        cls.jobs_patch.stop()
+        cls.url_patch.stop()
+        cls.ollama.stop()
+
+    def setUp(self):
+        self.ollama_app.state.requests.clear()
+        main.response_cache.clear()
+
+    def test_chat_streams_tokens(self):
+        """Should stream the upstream tokens and build the prompt"""
+        response = httpx.post(f"{self.server.url}/chat", json={
+            "message": "Hello", "system_prompt": "Be brief", "model": "qwen:0.5b"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(text_of(response), "one two three four five six seven eight ")
+        prompt = self.ollama_app.state.requests[0]["prompt"]
+        self.assertIn("System: Be brief", prompt)
+        self.assertIn("User: Hello", prompt)
+
+    def test_usage_frame(self):
+        """The client should count tokens with Ollama's eval_count"""
+        with HiClient(self.server.url) as client:
+            client.load_model("qwen:0.5b")
+            self.assertEqual(client.chat("Count me"), "one two three four five six seven eight ")
+            self.assertEqual(client.last_usage["eval_count"], 8)
+            self.assertIn("eval_duration", client.last_usage)
+            metrics = client.metrics.get_metrics()
+        self.assertEqual(metrics["total_tokens"], 8)
+        self.assertGreater(metrics["tokens_per_second"]["p50"], 0)
+
+    def test_stream_is_lazy(self):
+        """stream() should yield tokens as they arrive and join them only on request"""
+        with HiClient(self.server.url, track_conversation=True) as client:
+            client.load_model("qwen:0.5b")
+            reply = client.stream("Stream me")
+            self.assertEqual(self.ollama_app.state.requests, [])
+            first = next(reply)
+            self.assertEqual(first, "one ")
+            self.assertEqual(reply.text(), "one two three four five six seven eight ")
+            self.assertEqual(reply.usage["eval_count"], 8)
+            self.assertEqual(len(client.conversation.messages), 2)
+
+    def test_stream_closed_early(self):
+        """Stopping early should drop the connection and record nothing"""
+        tracer = RecordingTracer()
+        with HiClient(self.server.url, track_conversation=True, tracer=tracer) as client:
+            client.load_model("qwen:0.5b")
+            with client.stream("Stop early") as reply:
+                for token in reply:
+                    break
+            self.assertEqual(client.conversation.messages, deque())
+            self.assertEqual(client.metrics.get_metrics()["request_count"], 0)
+            self.assertTrue(tracer.spans()[-1].attributes["cancelled"])
+
+            opened = client.pool_stats()["connections_opened"]
+            client.chat("Next")
+            # the half-read connection was not put back into the pool
+            self.assertEqual(client.pool_stats()["connections_opened"], opened + 1)
+
+    def wait_for_cancelled(self, count: int):
+        deadline = time.monotonic() + 2
+        while self.ollama_app.state.cancelled < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.ollama_app.state.cancelled, count)
+
+    def test_deadline_aborts_generation(self):
+        """An expired timeout should fail the chat and stop the upstream generation"""
+        cancelled = self.ollama_app.state.cancelled
+        with HiClient(self.server.url) as client:
+            client.load_model("qwen:0.5b")
+            started = time.perf_counter()
+            with self.assertRaises(DeadlineExceededError):
+                client.chat("Too slow", timeout=0.15)
+            self.assertLess(time.perf_counter() - started, 0.35)
+            self.wait_for_cancelled(cancelled + 1)
+            self.assertEqual(client.metrics.get_metrics()["models"]["qwen:0.5b"]["errors"], 1)
+            # a generous budget still gets the whole answer
+            self.assertEqual(client.chat("Fast enough", timeout=5),
+                             "one two three four five six seven eight ")
+        metrics = httpx.get(f"{self.server.url}/metrics").text
+        self.assertIn('hi_cancellations_total{reason="deadline"}', metrics)
+        self.assertIn("hi_upstream_aborts_total", metrics)
+
+    def test_client_disconnect_aborts_upstream(self):
+        """Hanging up mid-stream should stop the upstream generation right away"""
+        cancelled = self.ollama_app.state.cancelled
+        with httpx.Client(timeout=10) as client:
+            with client.stream("POST", f"{self.server.url}/chat",
+                               json={"message": "Hang up", "model": "qwen:0.5b"}) as response:
+                next(response.iter_lines())
+        self.wait_for_cancelled(cancelled + 1)
+        metrics = httpx.get(f"{self.server.url}/metrics").text
+        self.assertIn('hi_cancellations_total{reason="client_disconnect"}', metrics)
+
+    def test_token_coalescing(self):
+        """A coalescing window should put several tokens into one frame"""
+        response = httpx.post(f"{self.server.url}/chat", json={
+            "message": "coalesce", "model": "qwen:0.5b", "coalesce_ms": 150})
+        frames = [parse_frame(line) for line in response.text.splitlines()]
+        tokens = [f for f in frames if "token" in f]
+        self.assertLess(len(tokens), 8)
+        self.assertEqual(text_of(response), "one two three four five six seven eight ")
+        self.assertTrue(frames[-1]["done"])
+        self.assertEqual(frames[-1]["usage"]["eval_count"], 8)
+
+    def test_concurrent_streams_interleave(self):
+        """Should serve a second /chat while the first is still generating"""
+        async def consume(client, i):
+            arrivals = []
+            async with client.stream("POST", f"{self.server.url}/chat",
+                                     json={"message": f"hi {i}"}) as response:
+                async for _ in response.aiter_bytes():
+                    arrivals.append(time.monotonic())
+            return arrivals
+
+        async def run():
+            async with httpx.AsyncClient(timeout=10) as client:
+                return await asyncio.gather(*(consume(client, i) for i in range(3)))
+
+        # allow parallel generations, the default of one would serialize them
+        with patch.object(main.scheduler, "max_concurrency", 3):
+            streams = asyncio.run(run())
+        first_bytes = [arrivals[0] for arrivals in streams]
+        last_bytes = [arrivals[-1] for arrivals in streams]
+        # every stream started before any of them finished
+        self.assertLess(max(first_bytes), min(last_bytes))
+
+    def test_pool_stats(self):
+        httpx.post(f"{self.server.url}/chat", json={"message": "Hello"})
+        stats = httpx.get(f"{self.server.url}/stats").json()
+        self.assertGreaterEqual(stats["upstream_pool"]["requests"], 1)
+
+    def test_chat_many(self):
+        """Should keep input order and report per-item errors"""
+        with HiClient(base_url=self.server.url) as client:
+            client.load_model("qwen:0.5b")
+            results = list(client.chat_many(["a", " ", "c"], concurrency=3))
+
+        self.assertEqual([r.index for r in results], [0, 1, 2])
+        self.assertTrue(results[0].ok and results[2].ok)
+        self.assertFalse(results[1].ok)
+        self.assertEqual(results[2].response, "one two three four five six seven eight ")
+
+    def test_chat_many_as_completed(self):
+        with HiClient(base_url=self.server.url) as client:
+            client.load_model("qwen:0.5b")
+            results = list(client.chat_many(
+                [f"q{i}" for i in range(4)], concurrency=2, as_completed=True))
+        self.assertEqual(sorted(r.index for r in results), [0, 1, 2, 3])
+
+    def test_chat_batch_endpoint(self):
+        """Should run a whole batch in one request"""
+        with HiClient(base_url=self.server.url) as client:
+            client.load_model("qwen:0.5b")
+            results = client.chat_batch(["a", "b", "c"], concurrency=2)
+
+        self.assertEqual([r.message for r in results], ["a", "b", "c"])
+        self.assertTrue(all(r.ok for r in results))
+        self.assertFalse(any(p["stream"] for p in self.ollama_app.state.requests))
+
+    def test_chat_batch_rejects_items_on_their_own(self):
+        """An invalid prompt fails its own result, the rest of the batch is sent"""
+        with HiClient(base_url=self.server.url) as client:
+            client.load_model("qwen:0.5b")
+            results = client.chat_batch(["a", "  ", "c"])
+
+        self.assertEqual([(r.index, r.message) for r in results], [(0, "a"), (1, "  "), (2, "c")])
+        self.assertEqual([r.ok for r in results], [True, False, True])
+        self.assertIn("empty", results[1].error)
+        self.assertEqual(len(self.ollama_app.state.requests), 2)
+
+    def test_job_resumes_after_disconnect(self):
+        """A job keeps generating without a client and is read on from an offset"""
+        with HiClient(base_url=self.server.url) as client:
+            client.load_model("qwen:0.5b")
+            job_id = client.submit_job("Write a long story")
+            stream = client.stream_job(job_id)
+            first = next(stream)
+            # the connection drops, the generation goes on
+            stream.close()
+            rest = "".join(client.stream_job(job_id, len(first)))
+            self.assertEqual(first + rest, "one two three four five six seven eight ")
+            self.assertEqual(client.wait_job(job_id, timeout=5), first + rest)
+            self.assertEqual(client.last_usage["eval_count"], 8)
+            job = client.get_job(job_id)
+            self.assertEqual(job["status"], "done")
+            with self.assertRaises(JobNotFoundError):
+                client.get_job("nope")
+        self.assertIn('hi_jobs{status="done"}', httpx.get(f"{self.server.url}/metrics").text)
+
+    def test_server_session_reuses_context(self):
+        """Follow-up turns should send only the new message plus Ollama's context"""
+        with HiClient(base_url=self.server.url, track_conversation=True,
+                      server_session=True) as client:
+            client.load_model("qwen:0.5b")
+            client.set_system_prompt("Be brief")
+            client.chat("first question")
+            session_id = client.session_id
+            client.chat("second question")
+
+            self.assertIsNotNone(session_id)
+            self.assertEqual(client.session_id, session_id)
+            first, second = self.ollama_app.state.requests
+            self.assertNotIn("context", first)
+            self.assertIn("context", second)
+            self.assertNotIn("first question", second["prompt"])
+            self.assertNotIn("System", second["prompt"])
+
+            history = httpx.get(f"{self.server.url}/sessions/{session_id}").json()["history"]
+            self.assertEqual(len(history), 4)
+
+            # an expired session falls back to resending the local history
+            main.sessions.delete(session_id)
+            client.chat("third question")
+            self.assertNotEqual(client.session_id, session_id)
+            self.assertIn("first question", self.ollama_app.state.requests[-1]["prompt"])
+
+    def test_response_cache(self):
+        """Repeated questions should be answered without calling Ollama"""
+        body = {"message": "What is a Pi?", "model": "qwen:0.5b"}
+        first = httpx.post(f"{self.server.url}/chat", json=body)
+        second = httpx.post(f"{self.server.url}/chat", json=body)
+
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+        self.assertEqual(second.headers["X-Cache"], "HIT")
+        self.assertEqual(text_of(first), text_of(second))
+        self.assertEqual(len(self.ollama_app.state.requests), 1)
+
+    def test_identical_requests_coalesce(self):
+        """Concurrent identical prompts should share one Ollama generation"""
+        saved_before = main.single_flight.stats()["generations_saved"]
+        counted_before = main.GENERATIONS_SAVED.labels().value
+
+        async def run():
+            async with httpx.AsyncClient(timeout=10) as client:
+                return await asyncio.gather(*(
+                    client.post(f"{self.server.url}/chat", json={"message": "same"})
+                    for _ in range(3)))
+
+        responses = asyncio.run(run())
+        self.assertEqual({text_of(r) for r in responses}, {"one two three four five six seven eight "})
+        self.assertEqual(len(self.ollama_app.state.requests), 1)
+        self.assertEqual(main.single_flight.stats()["generations_saved"] - saved_before, 2)
+        self.assertEqual(main.GENERATIONS_SAVED.labels().value - counted_before, 2)
+
+    def test_queue_full_is_rejected(self):
+        """Should answer 429 right away once the generation queue is full"""
+        async def run():
+            async with httpx.AsyncClient(timeout=10) as client:
+                async with client.stream("POST", f"{self.server.url}/chat",
+                                         json={"message": "long one"}) as first:
+                    self.assertIn("X-Queue-Wait-Ms", first.headers)
+                    rejected = await client.post(f"{self.server.url}/chat",
+                                                 json={"message": "second"})
+                    await first.aread()
+                return rejected
+
+        with patch.object(main.scheduler, "max_queue_depth", 0):
+            rejected = asyncio.run(run())
+        self.assertEqual(rejected.status_code, 429)
+        self.assertEqual(main.scheduler.running, 0)
+
+    def test_unknown_model_is_rejected(self):
+        response = httpx.post(f"{self.server.url}/chat", json={
+            "message": "Hello", "model": "llama3:70b"})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.ollama_app.state.requests, [])
+
+    def test_load_error_keeps_upstream_status(self):
+        """Ollama refusing a load is passed on, not turned into a 500"""
+        request = httpx.Request("POST", f"{self.ollama.url}/api/generate")
+        refused = httpx.HTTPStatusError("Bad Request", request=request,
+                                        response=httpx.Response(400, request=request,
+                                                                text="invalid keep_alive"))
+        with patch.object(main.ModelResidency, "load", side_effect=refused):
+            response = httpx.post(f"{self.server.url}/models/qwen:0.5b/load")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("invalid keep_alive", response.json()["detail"])
+
+    def test_warm_and_evict_model(self):
+        """Should load a model without generating and unload it again"""
+        with HiClient(self.server.url) as client:
+            client.load_model("gemma2:2b", warm=True, keep_alive="1h")
+            self.assertEqual(self.ollama_app.state.loaded["gemma2:2b"], "1h")
+            self.assertEqual(self.ollama_app.state.requests, [])
+
+            loaded = [m["name"] for m in client.refresh_models()["loaded"]]
+            self.assertIn("gemma2:2b", loaded)
+
+            # later chats keep the model resident for as long as requested
+            client.chat("Hello")
+            self.assertEqual(self.ollama_app.state.requests[0]["keep_alive"], "1h")
+
+            client.evict_model()
+            self.assertNotIn("gemma2:2b", self.ollama_app.state.loaded)
+
+    def test_discovers_pulled_models(self):
+        """load_model() should accept a model pulled after the client started"""
+        self.ollama_app.state.models.append("llama3:8b")
+        try:
+            with HiClient(self.server.url) as client:
+                client.load_model("llama3:8b")
+                self.assertIn("llama3:8b", client.model_manager.list_available_models())
+        finally:
+            self.ollama_app.state.models.remove("llama3:8b")
+            httpx.get(f"{self.server.url}/models", params={"refresh": "true"})
+
+    def test_unvalidated_model_is_not_a_label(self):
+        """Requests rejected before the model was checked never label a series with it"""
+        httpx.post(f"{self.server.url}/chat",
+                   json={"message": "hi", "model": "made-up:1b", "session_id": "nope"})
+        httpx.post(f"{self.server.url}/chat", json={"message": "hi", "model": "made-up:2b"},
+                   headers={"X-Request-Timeout": "soon"})
+        self.assertNotIn("made-up", httpx.get(f"{self.server.url}/metrics").text)
+
+    def test_metrics_endpoint(self):
+        """Should expose request, latency and throughput series in Prometheus format"""
+        httpx.post(f"{self.server.url}/chat", json={"message": "metrics", "model": "qwen:0.5b"})
+        httpx.post(f"{self.server.url}/chat", json={"message": "metrics", "model": "llama3:70b"})
+
+        response = httpx.get(f"{self.server.url}/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        text = response.text
+        self.assertIn('hi_requests_total{endpoint="/chat",model="qwen:0.5b",status="200"}', text)
+        self.assertIn('hi_requests_total{endpoint="/chat",model="unknown",status="422"}', text)
+        self.assertIn('hi_time_to_first_token_seconds_count{model="qwen:0.5b"}', text)
+        self.assertIn('hi_generation_tokens_per_second_bucket{model="qwen:0.5b",le="+Inf"}', text)
+        self.assertIn('hi_generated_tokens_total{model="qwen:0.5b"}', text)
+        self.assertIn('hi_requests_in_flight{endpoint="/chat"} 0', text)
+        self.assertIn("hi_upstream_connect_seconds_count", text)
+        self.assertIn("# TYPE hi_cache_misses_total counter", text)
+        self.assertIn("# TYPE hi_generations_saved_total counter", text)
+
+    def test_trace_follows_request_to_server(self):
+        """Client and server spans should share one trace id"""
+        tracer = RecordingTracer()
+        with HiClient(self.server.url, tracer=tracer) as client:
+            client.load_model("qwen:0.5b")
+            client.register_callback("on_token", lambda token: None)
+            client.chat("trace me")
+
+        names = [s.name for s in tracer.spans()]
+        for name in ("validate", "serialize", "connect", "request", "first_byte",
+                     "stream", "finalize", "chat"):
+            self.assertIn(name, names)
+        root = tracer.spans()[-1]
+        self.assertEqual(root.name, "chat")
+        stream = next(s for s in tracer.spans() if s.name == "stream")
+        self.assertGreater(stream.attributes["chunks"], 0)
+        self.assertIn("callback_time", stream.attributes)
+
+        response = httpx.get(f"{self.server.url}/traces/{root.trace_id}")
+        self.assertEqual(response.status_code, 200)
+        spans = {s["name"]: s for s in response.json()["spans"]}
+        self.assertEqual(set(spans), {"server.chat", "prompt_build", "queue_wait",
+                                      "upstream", "upstream_stream"})
+        self.assertEqual(spans["server.chat"]["parent_id"], root.span_id)
+        self.assertEqual(spans["upstream"]["parent_id"], spans["server.chat"]["span_id"])
+        self.assertEqual(httpx.get(f"{self.server.url}/traces/nope").status_code, 404)
+
+    def test_ollama_unreachable(self):
+        """Should answer 503 when Ollama cannot be reached"""
+        with patch.object(main, "OLLAMA_URL", "http://127.0.0.1:9"):
+            response = httpx.post(f"{self.server.url}/chat", json={"message": "Hello"})
+        self.assertEqual(response.status_code, 503)
+        metrics = httpx.get(f"{self.server.url}/metrics").text
+        self.assertIn('hi_errors_total{endpoint="/chat",type="upstream_unreachable"}', metrics)
+
+
+class TestJobRestart(unittest.IsolatedAsyncioTestCase):
+    """A job the server was generating when it stopped, against a fake Ollama"""
+
+    def setUp(self):
+        self.ollama_app = fake_ollama.create_app(
+            reply="one two three four five six seven eight", tokens_per_second=10)
+        self.ollama = fake_ollama.BackgroundServer(self.ollama_app).start()
+        self.addCleanup(self.ollama.stop)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for name, value in (("OLLAMA_URL", self.ollama.url),
+                            ("JOBS_PATH", os.path.join(tmp.name, "jobs.db"))):
+            patcher = patch.object(main, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_restarted_job_is_generated_again(self):
+        app = FastAPI()
+        async with main.lifespan(app):
+            job_id = app.state.jobs.submit({"message": "Write a long story", "model": "qwen:0.5b"})
+            follow = app.state.jobs.follow(job_id)
+            first, attempt = await follow.__anext__()
+            await follow.aclose()
+        # the server went down halfway through the reply
+
+        async with main.lifespan(app):
+            with self.assertRaises(JobRestartedError):
+                async for _ in app.state.jobs.follow(job_id, len(first), attempt):
+                    pass
+            output = "".join([text async for text, _ in app.state.jobs.follow(job_id)])
+            job = app.state.jobs.get(job_id)
+
+        self.assertTrue(first)
+        self.assertEqual(output, "one two three four five six seven eight ")
+        self.assertEqual((job["status"], job["attempts"]), ("done", 2))
+        self.assertEqual(job["usage"]["eval_count"], 8)
+        # the same prompt both times, without the partial reply in it
+        prompts = [r["prompt"] for r in self.ollama_app.state.requests]
+        self.assertEqual(len(prompts), 2)
+        self.assertEqual(prompts[0], prompts[1])
+        self.assertNotIn(first.strip(), prompts[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import asyncio
+import unittest
+
+from sdk.exceptions import StreamingError
+from sdk.singleflight import SingleFlight
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    """Sharing one upstream stream between identical requests"""
+
+    def setUp(self):
+        self.opened = 0
+
+    async def open_stream(self):
+        self.opened += 1
+        generation = self.opened
+
+        async def items():
+            for i in range(3):
+                await asyncio.sleep(0.01)
+                yield (generation, i)
+        return items()
+
+    async def test_identical_requests_share(self):
+        flights = SingleFlight()
+        a = flights.join("key", self.open_stream)
+        b = flights.join("key", self.open_stream)
+        self.assertIs(a, b)
+        await a.wait_started()
+        first = [item async for item in a.subscribe()]
+        second = [item async for item in b.subscribe()]
+        self.assertEqual(first, second)
+        self.assertEqual(self.opened, 1)
+
+    async def test_join_after_last_subscriber_left(self):
+        """A request arriving while the abandoned flight unwinds gets a fresh one"""
+        flights = SingleFlight()
+        a = flights.join("key", self.open_stream)
+        await asyncio.sleep(0)
+        a.leave()
+        b = flights.join("key", self.open_stream)
+        self.assertIsNot(a, b)
+        await b.wait_started()
+        items = [item async for item in b.subscribe()]
+        self.assertEqual(items, [(2, 0), (2, 1), (2, 2)])
+        # the dying flight did not take the new one's entry with it
+        self.assertEqual(flights.in_flight(), 0)
+        self.assertTrue(a.cancelled)
+
+    async def test_cancelled_flight_is_an_error(self):
+        """Anyone still attached when a generation is cancelled sees an error"""
+        flights = SingleFlight()
+        flight = flights.join("key", self.open_stream)
+        await flight.wait_started()
+        subscriber = flight.subscribe()
+        await subscriber.__anext__()
+        flight.task.cancel()
+        with self.assertRaises(StreamingError):
+            async for _ in subscriber:
+                pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# microseconds `import sdk.cli` may take, including click; raise it on slow boards
+IMPORT_BUDGET_US = int(os.environ.get("HI_IMPORT_BUDGET_MS", "150")) * 1000
+
+# what the lightweight commands must not pull in
+HEAVY_MODULES = ("requests", "httpx", "sdk.client", "colorama", "fastapi")
+
+
+def import_times(code: str):
+    """Run code with -X importtime, return ({module: cumulative us}, stdout)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times, result.stdout
+
+
+class TestStartup(unittest.TestCase):
+    """The hi CLI should start without importing the client stack"""
+
+    def test_cli_import_is_light(self):
+        times, _ = import_times("import sdk.cli")
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, times)
+        self.assertLess(times["sdk.cli"], IMPORT_BUDGET_US,
+                        f"import sdk.cli took {times['sdk.cli'] / 1000:.0f}ms")
+
+    def test_models_command_stays_light(self):
+        times, out = import_times(
+            "from sdk.cli import cli; cli(['models'], standalone_mode=False)")
+        self.assertIn("qwen:0.5b", out)
+        for module in ("requests", "httpx", "sdk.client"):
+            self.assertNotIn(module, times)
+
+    def test_package_exports_load_on_demand(self):
+        _, out = import_times("import sdk, sys; print('sdk.client' in sys.modules); "
+                              "print(sdk.HiClient.__name__)")
+        self.assertEqual(out.split(), ["False", "HiClient"])
+
+
+if __name__ == "__main__":
+    unittest.main()
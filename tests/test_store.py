@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from sdk.client import Conversation, HiClient
+from sdk.history import estimate_tokens
+from sdk.store import Message, SQLiteStore
+
+
+class TestConversationStore(unittest.TestCase):
+    """Compact message records and the SQLite conversation log"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "conversations.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_message_record(self):
+        a = Message("".join(["us", "er"]), "hi", 5)
+        b = Message("".join(["us", "er"]), "there", 6)
+        self.assertIs(a.role, b.role)
+        self.assertFalse(hasattr(a, "__dict__"))
+        self.assertEqual(a["content"], "hi")
+        self.assertEqual(a, {"role": "user", "content": "hi"})
+
+    def test_survives_restart(self):
+        store = SQLiteStore(self.path)
+        conversation = Conversation(store=store)
+        conversation.add_message("user", "Hello")
+        conversation.add_message("assistant", "Hi there")
+        store.close()
+
+        store = SQLiteStore(self.path)
+        resumed = Conversation(store=store, conversation_id=conversation.conversation_id)
+        self.assertEqual(resumed.get_history(), [{"role": "user", "content": "Hello"},
+                                                 {"role": "assistant", "content": "Hi there"}])
+        self.assertEqual(resumed.total_tokens, estimate_tokens("Hello") + estimate_tokens("Hi there"))
+        self.assertEqual(store.conversations(), [conversation.conversation_id])
+        store.close()
+
+    def test_only_the_recent_window_is_in_memory(self):
+        store = SQLiteStore(self.path, window=10)
+        conversation = Conversation(store=store)
+        for i in range(50):
+            conversation.add_message("user", str(i))
+        self.assertEqual(len(conversation.messages), 10)
+
+        resumed = Conversation(store=store, conversation_id=conversation.conversation_id)
+        self.assertEqual([m.content for m in resumed.messages], [str(i) for i in range(40, 50)])
+        # the full log is still there for export
+        self.assertEqual(len(list(store.iter_messages(conversation.conversation_id))), 50)
+        store.close()
+
+    def test_client_resumes_and_clears(self):
+        store = SQLiteStore(self.path)
+        client = HiClient(track_conversation=True, conversation_store=store)
+        client.load_model("qwen:0.5b")
+        client.conversation.add_message("user", "Remember me")
+        conversation_id = client.conversation.conversation_id
+
+        resumed = HiClient(track_conversation=True, conversation_store=store,
+                           conversation_id=conversation_id)
+        resumed.load_model("qwen:0.5b")
+        payload = resumed._build_payload("Do you?")
+        self.assertEqual(payload["conversation_history"], [{"role": "user", "content": "Remember me"}])
+
+        resumed.clear_conversation()
+        self.assertNotEqual(resumed.conversation.conversation_id, conversation_id)
+        self.assertEqual(len(resumed.conversation.messages), 0)
+        # the log is append-only, clearing starts a new conversation
+        self.assertEqual(len(store.load(conversation_id)), 1)
+        store.delete(conversation_id)
+        self.assertEqual(store.load(conversation_id), [])
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import time
+import unittest
+
+from sdk.tracing import RecordingTracer, Tracer
+
+
+class TestTracing(unittest.TestCase):
+    """Spans and tracers"""
+
+    def test_child_spans_share_the_trace(self):
+        tracer = RecordingTracer()
+        with tracer.span("chat") as root:
+            with tracer.span("validate", root):
+                time.sleep(0.01)
+        validate, chat = tracer.spans()
+        self.assertEqual(validate.trace_id, chat.trace_id)
+        self.assertEqual(validate.parent_id, chat.span_id)
+        self.assertGreaterEqual(validate.duration, 0.01)
+        self.assertGreaterEqual(chat.duration, validate.duration)
+
+    def test_errors_are_recorded(self):
+        tracer = RecordingTracer()
+        with self.assertRaises(ValueError):
+            with tracer.span("chat"):
+                raise ValueError()
+        self.assertEqual(tracer.spans()[0].attributes["error"], "ValueError")
+
+    def test_record_measured_interval(self):
+        tracer = RecordingTracer(max_spans=2)
+        root = tracer.span("chat", trace_id="abc")
+        start = time.perf_counter()
+        span = tracer.record("connect", root, start, start + 0.5, new=True)
+        self.assertAlmostEqual(span.duration, 0.5)
+        self.assertEqual(tracer.spans("abc"), [span])
+        root.finish()
+        root.finish()
+        self.assertEqual(len(tracer.spans("abc")), 2)
+        self.assertEqual(tracer.spans("other"), [])
+
+    def test_base_tracer_drops_spans(self):
+        with Tracer().span("chat") as span:
+            pass
+        self.assertIsNotNone(span.end)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sdk.client import HiClient
+from sdk.async_client import AsyncHiClient
+from sdk.transport import PoolConfig
+from sdk.protocol import token_frame, done_frame
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = (token_frame("pong") + done_frame({})).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Connection reuse across chat() calls"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_session_reuses_connection(self):
+        """Should send every chat over one keep-alive connection"""
+        with HiClient(base_url=self.base_url) as client:
+            client.load_model("qwen:0.5b")
+            for _ in range(3):
+                self.assertEqual(client.chat("ping"), "pong")
+            stats = client.pool_stats()
+
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["connections_opened"], 1)
+        self.assertEqual(stats["reused_requests"], 2)
+
+    def test_keep_alive_disabled(self):
+        with HiClient(base_url=self.base_url,
+                      pool_config=PoolConfig(keep_alive=False)) as client:
+            client.load_model("qwen:0.5b")
+            for _ in range(2):
+                client.chat("ping")
+            self.assertEqual(client.pool_stats()["connections_opened"], 2)
+
+    def test_async_client_reuses_connection(self):
+        async def run():
+            async with AsyncHiClient(base_url=self.base_url) as client:
+                client.load_model("qwen:0.5b")
+                for _ in range(3):
+                    await client.chat("ping")
+                return client.pool_stats()
+
+        stats = asyncio.run(run())
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["connections_opened"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()